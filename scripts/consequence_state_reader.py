@@ -9,11 +9,12 @@ Emily Sheetz, NSTGRO VTE 2024
 import rospy
 
 import os
-import yaml
 
 from yaml_formatting_checks import YAMLStateSpaceChecks as YAMLChecks
+from yaml_io import YAMLConfigCache
 
 from consequence_state import ConsequenceState
+from interned_space import InternedSpace
 
 class ConsequenceStateReader:
     def __init__(self, robot="val", environment="lunar_habitat"):
@@ -31,6 +32,11 @@ class ConsequenceStateReader:
         # initialize list of consequence states
         self.consequence_states = []
 
+        # initialize consequence state names and indices of names to states and to integer ids (position in list)
+        self.consequence_state_names = []
+        self.consequence_states_by_name = {}
+        self.consequence_state_idxs = {}
+
         # initialize flag for valid consequence states
         self.valid_states = False
 
@@ -51,16 +57,22 @@ class ConsequenceStateReader:
         return self.consequence_states
 
     def get_consequence_state_names(self):
-        return [state.get_consequence_name() for state in self.consequence_states]
+        return list(self.consequence_state_names)
+
+    def get_consequence_state_space(self):
+        return InternedSpace(self.get_consequence_state_names())
 
     def get_consequence_state_with_name(self, state_name):
-        # look through states
-        for state in self.consequence_states:
-            # check name
-            if state.get_consequence_name() == state_name:
-                return state
-        # if we get here, no state in list has given name
-        return None
+        return self.consequence_states_by_name.get(state_name)
+
+    def get_consequence_states_with_names(self, state_names):
+        return [self.consequence_states_by_name.get(name) for name in state_names]
+
+    def get_consequence_state_id(self, state_name):
+        return self.consequence_state_idxs.get(state_name)
+
+    def get_consequence_state_ids(self, state_names):
+        return [self.consequence_state_idxs.get(name) for name in state_names]
 
     def get_num_consequence_states(self):
         return len(self.consequence_states)
@@ -70,8 +82,11 @@ class ConsequenceStateReader:
     ##################################
 
     def process_consequence_states(self):
-        # clear out consequence states list
+        # clear out consequence states list and indices
         self.consequence_states = []
+        self.consequence_state_names = []
+        self.consequence_states_by_name = {}
+        self.consequence_state_idxs = {}
 
         # verify YAML file exists
         valid_path = YAMLChecks.check_yaml_existence(self.consequence_state_full_path)
@@ -80,9 +95,8 @@ class ConsequenceStateReader:
             self.valid_states = False
             return
 
-        # open YAML file and load dict
-        fo = open(self.consequence_state_full_path)
-        yaml_dict = yaml.load(fo, Loader=yaml.FullLoader)
+        # load dict from YAML file, parsing file only if not already cached
+        yaml_dict = YAMLConfigCache.load(self.consequence_state_full_path)
 
         # error check YAML file formatting
         valid_yaml = YAMLChecks.check_consequence_state_yaml_formatting(yaml_dict, self.environment_name)
@@ -112,8 +126,11 @@ class ConsequenceStateReader:
             # add consequence state to list
             self.consequence_states.append(conseq_state)
 
-        # close file
-        fo.close()
+            # index consequence state by name and id, keeping first consequence state with each name
+            name = conseq_state.get_consequence_name()
+            self.consequence_state_names.append(name)
+            self.consequence_states_by_name.setdefault(name, conseq_state)
+            self.consequence_state_idxs.setdefault(name, len(self.consequence_states) - 1)
 
         return
 
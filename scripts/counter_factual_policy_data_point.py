@@ -9,9 +9,13 @@ class CounterFactualPolicyDataPoint(PolicyDataPoint):
     def __init__(self, conditions=[],
                        consequences_before_action=[],
                        action="unnamed_action",
-                       consequences_after_action=[]):
+                       consequences_after_action=[],
+                       condition_space=None,
+                       consequence_space=None):
         # initialize super class
         super(CounterFactualPolicyDataPoint, self).__init__(conditions,
                                                             consequences_before_action,
                                                             action,
-                                                            consequences_after_action)
+                                                            consequences_after_action,
+                                                            condition_space,
+                                                            consequence_space)
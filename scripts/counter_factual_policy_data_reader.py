@@ -9,18 +9,21 @@ Emily Sheetz, NSTGRO VTE 2024
 import rospy
 
 import os
-import yaml
 
 from yaml_formatting_checks import YAMLPolicyDataChecks as YAMLChecks
+from yaml_io import YAMLConfigCache
 
 from counter_factual_policy_data_point import CounterFactualPolicyDataPoint
 
 class CounterFactualPolicyDataReader:
-    def __init__(self, robot="val", environment="lunar_habitat"):
+    def __init__(self, robot="val", environment="lunar_habitat", condition_space=None, consequence_space=None):
         # set internal parameters
         self.robot_name = robot
         self.environment_name = environment
 
+        # set interned spaces for compact policy data points (optional)
+        self.set_interned_spaces(condition_space, consequence_space)
+
         # get path of this script
         script_path = os.path.abspath(os.path.dirname( __file__ ))
 
@@ -54,6 +57,10 @@ class CounterFactualPolicyDataReader:
     def get_num_counter_factual_policy_data(self):
         return len(self.counter_factual_policy)
 
+    def set_interned_spaces(self, condition_space, consequence_space):
+        self.condition_space = condition_space
+        self.consequence_space = consequence_space
+
     ###########################################
     ### PROCESS COUNTER FACTUAL POLICY DATA ###
     ###########################################
@@ -70,10 +77,9 @@ class CounterFactualPolicyDataReader:
             self.valid_policy = True
             return
 
-        # open YAML file and load dict
+        # load dict from YAML file, parsing file only if not already cached
         self.policy_file_exists = True
-        fo = open(self.counter_factual_policy_data_full_path)
-        yaml_dict = yaml.load(fo, Loader=yaml.FullLoader)
+        yaml_dict = YAMLConfigCache.load(self.counter_factual_policy_data_full_path)
 
         # verify non-empty dict
         if yaml_dict is None:
@@ -113,14 +119,13 @@ class CounterFactualPolicyDataReader:
             cf_pol = CounterFactualPolicyDataPoint(conditions=pol['conditions'],
                                                    consequences_before_action=pol['consequences_before_action'],
                                                    action=pol['action'],
-                                                   consequences_after_action=pol['consequences_after_action'])
+                                                   consequences_after_action=pol['consequences_after_action'],
+                                                   condition_space=self.condition_space,
+                                                   consequence_space=self.consequence_space)
 
             # add policy data to list
             self.counter_factual_policy.append(cf_pol)
 
-        # close file
-        fo.close()
-
         return
 
     def check_valid_policy(self):
@@ -0,0 +1,91 @@
+"""
+Counter-Factual Sampler Class
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import random
+
+#####################################
+### COUNTER-FACTUAL SAMPLER CLASS ###
+#####################################
+
+class CounterFactualSampler:
+    """
+    Draws counter-factual (scenario, action) pairs not yet covered by counter-factual policy data, stratified
+    by scenario: a random factual policy data point with uncovered counter-factual actions is drawn, then one of
+    its uncovered actions; drawn pairs are swap-removed from persistent arrays, so each draw takes constant time
+    and every pair of the counter-factual space is drawn once
+    """
+
+    def __init__(self, policy_store, check_covered, seed=None):
+        # set internal parameters
+        self.policy_store = policy_store
+        self.rng = random.Random(seed)
+
+        # rows of factual policy data points with uncovered counter-factual actions, and position of each row
+        self.rows = []
+        self.row_positions = {}
+
+        # uncovered counter-factual action indices of each row
+        self.uncovered_actions = {}
+
+        # find uncovered counter-factual actions of each factual policy data point
+        num_actions = policy_store.action_space.get_space_size()
+        for row in range(policy_store.num_points):
+            conds = int(policy_store.conditions[row])
+            factual_action = int(policy_store.actions[row])
+            actions = [action for action in range(num_actions)
+                       if (action != factual_action) and not check_covered(conds, action)]
+            if len(actions) > 0:
+                self.row_positions[row] = len(self.rows)
+                self.rows.append(row)
+                self.uncovered_actions[row] = actions
+
+    #######################
+    ### GETTERS/SETTERS ###
+    #######################
+
+    def get_num_uncovered_pairs(self):
+        return sum([len(actions) for actions in self.uncovered_actions.values()])
+
+    def check_empty(self):
+        return len(self.rows) == 0
+
+    ################
+    ### SAMPLING ###
+    ################
+
+    def draw(self):
+        # no pairs left
+        if self.check_empty():
+            return None
+
+        # draw random row, then random uncovered action of row
+        row = self.rows[self.rng.randrange(len(self.rows))]
+        actions = self.uncovered_actions[row]
+        action = CounterFactualSampler.swap_remove(actions, self.rng.randrange(len(actions)))
+
+        # remove row once all of its counter-factual actions are drawn
+        if len(actions) == 0:
+            self.__remove_row(row)
+
+        return row, action
+
+    def __remove_row(self, row):
+        # move last row into position of removed row
+        position = self.row_positions.pop(row)
+        CounterFactualSampler.swap_remove(self.rows, position)
+        if position < len(self.rows):
+            self.row_positions[self.rows[position]] = position
+        del self.uncovered_actions[row]
+
+        return
+
+    @staticmethod
+    def swap_remove(items, idx):
+        # remove item in constant time by moving last item into its place (order is not kept)
+        item = items[idx]
+        items[idx] = items[-1]
+        items.pop()
+
+        return item
@@ -0,0 +1,213 @@
+"""
+Coverage Index Class
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import math
+
+import numpy as np
+
+############################
+### COVERAGE INDEX CLASS ###
+############################
+
+class CoverageIndex:
+    """
+    Bitmaps of which risky scenarios (condition bitmasks over an interned state space) and which
+    counter-factual (scenario, action) pairs are covered by policy data; points are marked as covered in
+    constant time when added, and uncovered scenarios and pairs are found without scanning the policy
+    """
+
+    # largest state space with coverage bitmaps; bitmaps take (6 + number of actions) bytes per scenario,
+    # about 16 MB for 10 actions at 20 conditions (and 16 times that for each 4 more conditions)
+    max_bitmap_conditions = 20
+
+    def __init__(self, num_conditions, num_actions):
+        # set internal parameters
+        self.num_conditions = num_conditions
+        self.num_actions = num_actions
+        self.num_bitmasks = 1 << num_conditions
+
+        # number of conditions in each scenario, indexed by condition bitmask
+        self.cardinalities = np.zeros(self.num_bitmasks, dtype=np.uint8)
+        for i in range(num_conditions):
+            self.cardinalities[(1 << i):(2 << i)] = self.cardinalities[:(1 << i)] + 1
+
+        # bitmap of covered risky scenarios, with factual action of each covered scenario (-1 if not covered)
+        self.scenario_bitmap = np.zeros(self.num_bitmasks, dtype=bool)
+        self.factual_actions = np.full(self.num_bitmasks, -1, dtype=np.int32)
+
+        # bitmap of covered counter-factual scenarios for each action
+        self.cf_bitmaps = np.zeros((num_actions, self.num_bitmasks), dtype=bool)
+
+        # count covered scenarios and counter-factual pairs with each number of conditions
+        self.num_scenarios_covered = np.zeros(num_conditions + 1, dtype=np.int64)
+        self.num_cf_covered = np.zeros(num_conditions + 1, dtype=np.int64)
+
+    @staticmethod
+    def check_bitmap_size(num_conditions):
+        return num_conditions <= CoverageIndex.max_bitmap_conditions
+
+    @staticmethod
+    def from_policy_stores(policy_store, cf_policy_store, num_conditions, num_actions):
+        # create index and mark data points of both policy stores as covered
+        coverage_index = CoverageIndex(num_conditions, num_actions)
+        coverage_index.add_scenarios(policy_store.conditions[:policy_store.num_points],
+                                     policy_store.actions[:policy_store.num_points])
+        coverage_index.add_counter_factual_pairs(cf_policy_store.conditions[:cf_policy_store.num_points],
+                                                 cf_policy_store.actions[:cf_policy_store.num_points])
+
+        return coverage_index
+
+    #######################
+    ### GETTERS/SETTERS ###
+    #######################
+
+    def get_num_possible_scenarios(self):
+        return self.num_bitmasks - 1
+
+    def get_num_possible_counter_factual_pairs(self):
+        # every action except factual action of each scenario
+        return self.get_num_possible_scenarios() * max(self.num_actions - 1, 0)
+
+    def get_num_scenarios_covered(self):
+        return int(self.num_scenarios_covered.sum())
+
+    def get_num_counter_factual_pairs_covered(self):
+        return int(self.num_cf_covered.sum())
+
+    def check_scenarios_covered(self):
+        return self.get_num_scenarios_covered() >= self.get_num_possible_scenarios()
+
+    def check_counter_factual_pairs_covered(self):
+        return self.get_num_counter_factual_pairs_covered() >= self.get_num_possible_counter_factual_pairs()
+
+    def check_scenario_covered(self, bitmask):
+        return bool(self.scenario_bitmap[bitmask])
+
+    def check_counter_factual_pair_covered(self, bitmask, action):
+        return bool(self.cf_bitmaps[action, bitmask])
+
+    def get_factual_action(self, bitmask):
+        return int(self.factual_actions[bitmask])
+
+    ################
+    ### UPDATING ###
+    ################
+
+    def check_in_index(self, bitmask, action):
+        # conditions and actions outside state and action spaces are not indexed
+        return ((bitmask >> self.num_conditions) == 0) and (0 <= action < self.num_actions)
+
+    def add_scenario(self, bitmask, action):
+        if not self.check_in_index(bitmask, action):
+            return False
+
+        # factual action of scenario may be replaced
+        self.factual_actions[bitmask] = action
+
+        # mark scenario as covered
+        if self.scenario_bitmap[bitmask]:
+            return False
+        self.scenario_bitmap[bitmask] = True
+        self.num_scenarios_covered[self.cardinalities[bitmask]] += 1
+
+        return True
+
+    def add_counter_factual_pair(self, bitmask, action):
+        if not self.check_in_index(bitmask, action):
+            return False
+
+        # mark scenario as covered for counter factual action
+        if self.cf_bitmaps[action, bitmask]:
+            return False
+        self.cf_bitmaps[action, bitmask] = True
+        self.num_cf_covered[self.cardinalities[bitmask]] += 1
+
+        return True
+
+    def add_scenarios(self, bitmasks, actions):
+        # mark scenarios as covered at once
+        bitmasks, actions = self.__get_indexed_bitmasks(bitmasks, actions)
+        self.factual_actions[bitmasks] = actions
+        self.scenario_bitmap[bitmasks] = True
+
+        # recount covered scenarios with each number of conditions
+        self.num_scenarios_covered = np.bincount(self.cardinalities[self.scenario_bitmap],
+                                                 minlength=self.num_conditions + 1).astype(np.int64)
+
+        return
+
+    def add_counter_factual_pairs(self, bitmasks, actions):
+        # mark counter factual pairs as covered at once
+        bitmasks, actions = self.__get_indexed_bitmasks(bitmasks, actions)
+        self.cf_bitmaps[actions, bitmasks] = True
+
+        # recount covered counter factual pairs with each number of conditions
+        self.num_cf_covered = np.zeros(self.num_conditions + 1, dtype=np.int64)
+        for cf_bitmap in self.cf_bitmaps:
+            self.num_cf_covered += np.bincount(self.cardinalities[cf_bitmap], minlength=self.num_conditions + 1)
+
+        return
+
+    def __get_indexed_bitmasks(self, bitmasks, actions):
+        # drop bitmasks and actions outside state and action spaces
+        bitmasks = np.asarray(bitmasks)
+        actions = np.asarray(actions, dtype=np.int64)
+        if bitmasks.dtype == object:
+            # Python int bitmasks may not fit in uint64
+            in_space = np.array([(int(bitmask) >> self.num_conditions) == 0 for bitmask in bitmasks], dtype=bool)
+        else:
+            in_space = (bitmasks.astype(np.uint64) >> np.uint64(self.num_conditions)) == 0
+        in_index = in_space & (actions >= 0) & (actions < self.num_actions)
+
+        return bitmasks[in_index].astype(np.int64), actions[in_index]
+
+    ###############
+    ### QUERIES ###
+    ###############
+
+    def get_uncovered_scenarios(self, num_conds=None, max_conds=-1):
+        # get condition bitmasks of uncovered scenarios, optionally with a given or limited number of conditions
+        uncovered = ~self.scenario_bitmap
+        uncovered[0] = False
+        if num_conds is not None:
+            uncovered &= (self.cardinalities == num_conds)
+        if max_conds != -1:
+            uncovered &= (self.cardinalities <= max_conds)
+
+        return np.flatnonzero(uncovered)
+
+    def get_uncovered_counter_factual_pairs(self, num_conds=None, max_conds=-1):
+        # only covered scenarios have factual actions to be counter factual to
+        uncovered = ~self.cf_bitmaps & self.scenario_bitmap[np.newaxis, :]
+
+        # remove factual actions
+        uncovered &= (np.arange(self.num_actions)[:, np.newaxis] != self.factual_actions[np.newaxis, :])
+
+        # optionally filter by number of conditions
+        if num_conds is not None:
+            uncovered &= (self.cardinalities == num_conds)[np.newaxis, :]
+        if max_conds != -1:
+            uncovered &= (self.cardinalities <= max_conds)[np.newaxis, :]
+
+        # get condition bitmasks and actions of uncovered pairs
+        actions, bitmasks = np.nonzero(uncovered)
+
+        return bitmasks, actions
+
+    ##################
+    ### STATISTICS ###
+    ##################
+
+    def get_coverage_by_num_conds(self):
+        # covered and possible scenarios and counter factual pairs for each number of conditions
+        coverage = {}
+        for k in range(1, self.num_conditions + 1):
+            num_possible = math.comb(self.num_conditions, k)
+            coverage[k] = {'scenarios_covered' : int(self.num_scenarios_covered[k]),
+                           'scenarios_possible' : num_possible,
+                           'counter_factual_covered' : int(self.num_cf_covered[k]),
+                           'counter_factual_possible' : num_possible * max(self.num_actions - 1, 0)}
+
+        return coverage
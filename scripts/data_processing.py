@@ -6,7 +6,8 @@ Emily Sheetz, NSTGRO VTE 2024
 
 import rospy
 
-import os, yaml
+import os
+import warnings
 from copy import deepcopy
 import pandas as pd
 import numpy as np
@@ -17,6 +18,7 @@ from risky_condition_reader import RiskyConditionReader
 from consequence_state_reader import ConsequenceStateReader
 from risk_mitigating_action_reader import RiskMitigatingActionReader
 from risk_mitigating_policy_data_reader import RiskMitigatingPolicyDataReader
+from yaml_io import YAMLConfigCache
 
 # logistic regression
 from sklearn.model_selection import train_test_split
@@ -33,6 +35,18 @@ from sklearn.preprocessing import PolynomialFeatures
 # save model
 import pickle
 
+# parallel data processing
+import time, traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# feature combination search
+from feature_combination_search import FeatureCombinationSearch
+from model_fit_cache import ModelFitCache
+from weighted_mnlogit import WeightedMNLogit
+
+# dataset storage
+from dataset_storage import DatasetStorage
+
 ##########################
 ### DATASET INFO CLASS ###
 ##########################
@@ -81,6 +95,12 @@ class DatasetInfo:
         # models file ending
         self.model_file_end = "_model.sav"
 
+        # model lookup table file ending
+        self.lookup_table_file_end = "_lookup_table.bin"
+
+        # model fit cache directory
+        self.fit_cache_dir = script_path + "/../fit_cache/"
+
         return
 
     def initialize_action_space_encodings(self):
@@ -129,23 +149,24 @@ class DatasetInfo:
         file_name = path + self.cfa_match_factual_dataset_file_name
         return path, file_name
 
-    def get_combined_dataset_full_path(self, robot, env, limited_cfa=False, weight=None):
+    def get_combined_dataset_full_path(self, robot, env, limited_cfa=False):
         path = self.data_dir + robot + "/" + env + "/"
         file_name = None
         if limited_cfa:
             file_name_limited = path + self.data_limited_file_name
             file_name_match_factual = path + self.data_match_factual_file_name
-            if weight is not None:
-                file_name_limited = file_name_limited.replace(".csv","_weighted_{}x.csv".format(weight))
-                file_name_match_factual = file_name_match_factual.replace(".csv","_weighted_{}x.csv".format(weight))
             file_name = (file_name_limited, file_name_match_factual)
         else:
             file_name = path + self.data_file_name
-            if weight is not None:
-                file_name = file_name.replace(".csv","_weighted_{}x.csv".format(weight))
 
         return path, file_name
 
+    def get_model_full_path(self, robot, env, model_name):
+        return "{0}{1}_{2}_{3}{4}".format(self.models_dir, robot, env, model_name, self.model_file_end)
+
+    def get_lookup_table_full_path(self, robot, env, model_name):
+        return "{0}{1}_{2}_{3}{4}".format(self.models_dir, robot, env, model_name, self.lookup_table_file_end)
+
     def get_action_encoding_for_robot_env(self, robot, env):
         # create reader and process data
         action_space_reader = RiskMitigatingActionReader(robot=robot, environment=env)
@@ -387,6 +408,17 @@ class DatasetColumns:
     def get_col_name_for_action_encoded(self):
         return "RISK_MITIGATING_ACTION_ENCODED"
 
+    def get_col_name_for_sample_weight(self):
+        return "SAMPLE_WEIGHT"
+
+    def get_feature_col_names(self):
+        # all columns except the action columns, in dataset order
+        action_col_names = [self.get_col_name_for_action(), self.get_col_name_for_action_encoded()]
+        return [col for col in self.column_names if col not in action_col_names]
+
+    def get_non_feature_col_names(self):
+        return [self.get_col_name_for_action(), self.get_col_name_for_action_encoded(), self.get_col_name_for_sample_weight()]
+
     def check_col_name_for_condition(self, col_name):
         return "COND_NAME_" in col_name
 
@@ -470,6 +502,25 @@ class DatasetColumns:
     def get_all_cond_auto_col_names(self):
         return [i for i in self.column_names if "COND_AUTO_LEVEL_" in i]
 
+    ############################
+    ### COLUMN INDEX HELPERS ###
+    ############################
+
+    def get_storage_dtypes(self):
+        # compact types for stored datasets: indicators as int8, scores as float32, and actions as categories
+        action_names = sorted(self.action_encoding.keys(), key=lambda a: self.action_encoding[a])
+        storage_types = {int : "int8", float : "float32", str : pd.CategoricalDtype(categories=action_names)}
+
+        return {col : storage_types[col_type] for col, col_type in self.column_types.items()}
+
+    def get_condition_index_map(self):
+        # map each risky condition to its position in the condition column blocks
+        return {cond : i for i, cond in enumerate(self.risky_conditions.keys())}
+
+    def get_consequence_index_map(self):
+        # map each consequence to its position in the consequence column blocks
+        return {conseq : i for i, conseq in enumerate(self.consequence_space)}
+
 
 
 ################################
@@ -481,10 +532,11 @@ class DataPreprocessing:
     Pre-processes red teamed data (YAML files) into CSV files
     """
 
-    def __init__(self, robot="val_clr", environment="lunar_habitat"):
+    def __init__(self, robot="val_clr", environment="lunar_habitat", data_format="csv"):
         # set internal paramters
         self.robot_name = robot
         self.environment_name = environment
+        self.data_format = DatasetStorage.check_format(data_format)
 
         # initialize data info
         self.info = DatasetInfo()
@@ -499,6 +551,28 @@ class DataPreprocessing:
         self.risky_conditions = self.info.get_risky_conditions_for_robot_env(self.robot_name, self.environment_name)
         self.policy_starters = self.info.get_policy_starter_for_robot_env(self.robot_name, self.environment_name)
 
+        # initialize per-condition attribute vectors
+        self.initialize_condition_attribute_vectors()
+
+    ######################
+    ### INITIALIZATION ###
+    ######################
+
+    def initialize_condition_attribute_vectors(self):
+        # get condition names in column order
+        cond_names = list(self.risky_conditions.keys())
+
+        # set attribute vectors for each condition
+        self.cond_likelihoods = np.array([self.risky_conditions[cond]['likelihood'] for cond in cond_names], dtype=float)
+        self.cond_consequences = np.array([self.risky_conditions[cond]['consequence'] for cond in cond_names], dtype=float)
+        self.cond_risks = np.array([self.risky_conditions[cond]['risk'] for cond in cond_names], dtype=float)
+        self.cond_safeties = np.array([self.risky_conditions[cond]['safety'] for cond in cond_names], dtype=float)
+
+        # autonomy level of each condition comes from the action taken in the policy starter
+        self.cond_autonomy_levels = np.array([self.action_autonomy_space[self.policy_starters[tuple([cond])]['action']] for cond in cond_names], dtype=float)
+
+        return
+
     ######################
     ### CREATE DATASET ###
     ######################
@@ -522,20 +596,6 @@ class DataPreprocessing:
 
         return df_rrs, df_cfa_match_factual
 
-    def create_weighted_limited_datasets(self, df1, df2, max_df1_weight=9):
-        # create initial combined dataset with 1:1 ratio
-        df = pd.concat([df1, df2], ignore_index=True)
-
-        # create additional weights
-        for weight in range(2,max_df1_weight+1):
-            # add additional copy of df1
-            df = pd.concat([df1, df], ignore_index=True)
-            # save data frame to file
-            path, (_, weighted_file_name) = self.info.get_combined_dataset_full_path(self.robot_name, self.environment_name, limited_cfa=True, weight=weight)
-            self.save_pandas_as_csv(df, path, weighted_file_name)
-
-        return df
-
     def convert_rrs_yaml_to_dataset_csv(self):
         # create data frame
         df_rrs = self.convert_yaml_to_pandas(self.info.get_rrs_policy_full_path(self.robot_name))
@@ -578,13 +638,8 @@ class DataPreprocessing:
         return df
 
     def save_pandas_as_csv(self, df, csv_path, csv_file):
-        # check if path exists:
-        if not os.path.exists(csv_path):
-            # create directory
-            os.mkdir(csv_path)
-
-        # save data frame to csv file
-        df.to_csv(csv_file, index=False) # encoding='utf-8'
+        # save data frame to csv file, and to columnar file with dataset schema if using columnar format
+        DatasetStorage.save_dataset(df, csv_path, csv_file, self.data_format, self.col_info.get_storage_dtypes())
         return
 
     def limit_cfa_dataset_to_improvement_examples(self, df_cfa):
@@ -592,172 +647,117 @@ class DataPreprocessing:
         pre_act_idxs = self.col_info.get_all_conseq_col_idxs(pre_action=True)
         post_act_idxs = self.col_info.get_all_conseq_col_idxs(pre_action=False)
 
-        # initialize list of rows
-        pos_row_idxs = []
-        fact_row_idxs = []
+        # get number of pre-action consequences and post-action consequences for every row
+        num_pre_act_conseq = df_cfa.iloc[:,pre_act_idxs].to_numpy().sum(axis=1)
+        num_post_act_conseq = df_cfa.iloc[:,post_act_idxs].to_numpy().sum(axis=1)
 
-        # look through every row
-        for i in range(df_cfa.shape[0]):
-            # get number of pre-action consequences and post-action consequences
-            num_pre_act_conseq = sum(df_cfa.iloc[i,pre_act_idxs])
-            num_post_act_conseq = sum(df_cfa.iloc[i,post_act_idxs])
-
-            # check for improvement
-            if num_post_act_conseq < num_pre_act_conseq:
-                pos_row_idxs.append(i)
-                # check for matching factual action
-                if num_post_act_conseq == 0:
-                    fact_row_idxs.append(i)
+        # check for improvement
+        pos_rows = num_post_act_conseq < num_pre_act_conseq
+        # check for matching factual action
+        fact_rows = pos_rows & (num_post_act_conseq == 0)
 
         # select only the positive rows
-        df_cfa_pos = df_cfa.iloc[pos_row_idxs,:]
-        df_cfa_fact = df_cfa.iloc[fact_row_idxs,:]
+        df_cfa_pos = df_cfa.iloc[pos_rows,:]
+        df_cfa_fact = df_cfa.iloc[fact_rows,:]
 
         return df_cfa_pos, df_cfa_fact
 
     def convert_yaml_to_pandas(self, yaml_file):
-        # open yaml file
-        fo = open(yaml_file)
-        yaml_dict = yaml.load(fo, Loader=yaml.FullLoader)
-        fo.close()
+        # load yaml file, parsing file only if not already cached
+        yaml_dict = YAMLConfigCache.load(yaml_file)
 
         # get policy data
         policy_data = yaml_dict[self.environment_name]['policy_data']
 
-        # initialize dictionary with column names as keys
-        dataset_dict = {}
-        for col_name in self.col_info.column_names:
-            dataset_dict[col_name] = []
+        # encode conditions and consequences of all policy data points as indicator matrices
+        cond_ind, pre_conseq_ind, post_conseq_ind = self.encode_policy_data_indicators(policy_data)
+
+        # get actions of all policy data points
+        actions = [str(pol_point['action']) for pol_point in policy_data]
+
+        # create data frame from indicator matrices
+        df = self.convert_indicators_to_pandas(cond_ind, pre_conseq_ind, post_conseq_ind, actions)
+
+        return df
+
+    def encode_policy_data_indicators(self, policy_data):
+        # get column positions of conditions and consequences
+        cond_idxs = self.col_info.get_condition_index_map()
+        conseq_idxs = self.col_info.get_consequence_index_map()
 
-        # compute column indices that include condition risks
-        cond_conseq_cols = self.col_info.get_all_cond_conseq_col_names()
-        cond_risk_cols = self.col_info.get_all_cond_risk_col_names()
-        cond_auto_cols = self.col_info.get_all_cond_auto_col_names()
+        # initialize (row, column) coordinates of present conditions and consequences
+        cond_rows, cond_cols = [], []
+        pre_rows, pre_cols = [], []
+        post_rows, post_cols = [], []
 
         # look through list of policy data points
-        for pol_point in policy_data:
-            # set data for each column
-            for col_name in self.col_info.column_names:
-                # get column type
-                col_type = self.col_info.column_types[col_name]
-
-                # set data for this column
-                if self.col_info.check_col_name_for_condition(col_name):
-                    # get condition name from current column
-                    cond_name = self.col_info.get_condition_name_from_col_name(col_name)
-                    # check if condition is present in policy data point
-                    if cond_name in pol_point['conditions']:
-                        # condition is present in this data point, set to True
-                        dataset_dict[col_name].append( col_type(1) )
-                    else:
-                        # condition is not present in this data point, set to False
-                        dataset_dict[col_name].append( col_type(0) )
-                elif self.col_info.check_col_name_for_condition_likelihood(col_name):
-                    # get condition name from current column
-                    cond_name = self.col_info.get_condition_name_from_col_name(col_name)
-                    # check if condition is present in policy data point
-                    if cond_name in pol_point['conditions']:
-                        # condition is present in this data point, set likelihood
-                        dataset_dict[col_name].append( col_type(self.risky_conditions[cond_name]['likelihood']) )
-                    else:
-                        # condition is not present in this data point, set likelihood
-                        dataset_dict[col_name].append( col_type(0.0) )
-                elif self.col_info.check_col_name_for_condition_consequence(col_name):
-                    # get condition name from current column
-                    cond_name = self.col_info.get_condition_name_from_col_name(col_name)
-                    # check if condition is present in policy data point
-                    if cond_name in pol_point['conditions']:
-                        # condition is present in this data point, set consequence
-                        dataset_dict[col_name].append( col_type(self.risky_conditions[cond_name]['consequence']) )
-                    else:
-                        # condition is not present in this data point, set consequence
-                        dataset_dict[col_name].append( col_type(0.0) )
-                elif self.col_info.check_col_name_for_condition_risk(col_name):
-                    # get condition name from current column
-                    cond_name = self.col_info.get_condition_name_from_col_name(col_name)
-                    # check if condition is present in policy data point
-                    if cond_name in pol_point['conditions']:
-                        # condition is present in this data point, set risk
-                        dataset_dict[col_name].append( col_type(self.risky_conditions[cond_name]['risk']) )
-                    else:
-                        # condition is not present in this data point, set risk to 0
-                        dataset_dict[col_name].append( col_type(0.0) )
-                elif self.col_info.check_col_name_for_condition_safety(col_name):
-                    # get condition name from current column
-                    cond_name = self.col_info.get_condition_name_from_col_name(col_name)
-                    # check if condition is present in policy data point
-                    if cond_name in pol_point['conditions']:
-                        # condition is present in this data point, set safety
-                        dataset_dict[col_name].append( col_type(self.risky_conditions[cond_name]['safety']) )
-                    else:
-                        # condition is not present in this data point, set safety to 1
-                        dataset_dict[col_name].append( col_type(1.0) )
-                elif self.col_info.check_col_name_for_condition_autonomy(col_name):
-                    # get condition name from current column
-                    cond_name = self.col_info.get_condition_name_from_col_name(col_name)
-                    # check if condition is present in policy data point
-                    if cond_name in pol_point['conditions']:
-                        # condition is present in this data point, get action from policy starter
-                        action = self.policy_starters[ tuple([cond_name]) ]['action']
-                        # set autonomy level
-                        dataset_dict[col_name].append( col_type(self.action_autonomy_space[action]) )
-                    else:
-                        # condition is not present in this data point, set autonomy level to 1
-                        dataset_dict[col_name].append ( col_type(1.0) )
-                elif self.col_info.check_col_name_for_consequence(col_name, pre_action=True):
-                    # get consequence name from current column
-                    conseq_name = self.col_info.get_consequence_name_from_col_name(col_name)
-                    # check if consequence is present in policy data point
-                    if conseq_name in pol_point['consequences_before_action']:
-                        # consequence is present in this data point, set to True
-                        dataset_dict[col_name].append( col_type(1) )
-                    else:
-                        # consequence is not present in this data point, set to False
-                        dataset_dict[col_name].append( col_type(0) )
-                elif self.col_info.check_col_name_for_consequence(col_name, pre_action=False):
-                    # get consequence name from current column
-                    conseq_name = self.col_info.get_consequence_name_from_col_name(col_name)
-                    # check if consequence is present in policy data point
-                    if conseq_name in pol_point['consequences_after_action']:
-                        # consequence is present in this data point, set to True
-                        dataset_dict[col_name].append( col_type(1) )
-                    else:
-                        # consequence is not present in this data point, set to False
-                        dataset_dict[col_name].append( col_type(0) )
-                elif self.col_info.check_col_name_for_state_conseq(col_name):
-                    # get consequences from all conditions
-                    conseqs = [dataset_dict[col][-1] for col in cond_conseq_cols]
-                    # state consequence is maximum of all consequences
-                    dataset_dict[col_name].append( col_type(max(conseqs)) )
-                elif self.col_info.check_col_name_for_state_risk(col_name):
-                    # get risks from all conditions
-                    risks = [dataset_dict[col][-1] for col in cond_risk_cols]
-                    # state risk is maximum of all risks
-                    dataset_dict[col_name].append( col_type(max(risks)) )
-                elif self.col_info.check_col_name_for_state_safety(col_name):
-                    # get state risk
-                    risk = dataset_dict[self.col_info.get_col_name_for_state_risk()][-1]
-                    # state safety is 1 - state risk
-                    dataset_dict[col_name].append( col_type(1 - risk) )
-                elif self.col_info.check_col_name_for_state_autonomy(col_name):
-                    # get autonomy levels from all conditions
-                    autos = [dataset_dict[col][-1] for col in cond_auto_cols]
-                    # state autonomy level is minimum of all autonomy levels
-                    dataset_dict[col_name].append( col_type(min(autos)) )
-                elif self.col_info.check_col_name_for_action(col_name):
-                    # set action name
-                    dataset_dict[col_name].append( col_type(pol_point['action']) )
-                elif self.col_info.check_col_name_for_action_encoded(col_name):
-                    # set encoded action name
-                    dataset_dict[col_name].append( col_type(self.action_encoding[pol_point['action']]) )
-                else:
-                    # should never happen
-                    continue
-            # end processing column name
-        # end processing data points
-
-        # create data frame from dictionary
-        df = pd.DataFrame(dataset_dict)
+        for i, pol_point in enumerate(policy_data):
+            # record conditions present in policy data point
+            for cond_name in pol_point['conditions']:
+                if cond_name in cond_idxs:
+                    cond_rows.append(i)
+                    cond_cols.append(cond_idxs[cond_name])
+            # record consequences present before action
+            for conseq_name in pol_point['consequences_before_action']:
+                if conseq_name in conseq_idxs:
+                    pre_rows.append(i)
+                    pre_cols.append(conseq_idxs[conseq_name])
+            # record consequences present after action
+            for conseq_name in pol_point['consequences_after_action']:
+                if conseq_name in conseq_idxs:
+                    post_rows.append(i)
+                    post_cols.append(conseq_idxs[conseq_name])
+
+        # create indicator matrices
+        cond_ind = np.zeros((len(policy_data), len(cond_idxs)), dtype=int)
+        cond_ind[cond_rows, cond_cols] = 1
+        pre_conseq_ind = np.zeros((len(policy_data), len(conseq_idxs)), dtype=int)
+        pre_conseq_ind[pre_rows, pre_cols] = 1
+        post_conseq_ind = np.zeros((len(policy_data), len(conseq_idxs)), dtype=int)
+        post_conseq_ind[post_rows, post_cols] = 1
+
+        return cond_ind, pre_conseq_ind, post_conseq_ind
+
+    def compute_feature_matrix(self, cond_ind, pre_conseq_ind, post_conseq_ind):
+        # get mask of conditions present in each row
+        present = cond_ind.astype(bool)
+
+        # compute condition attribute blocks; absent conditions have zero likelihood, consequence, and risk
+        likelihoods = np.where(present, self.cond_likelihoods, 0.0)
+        consequences = np.where(present, self.cond_consequences, 0.0)
+        risks = np.where(present, self.cond_risks, 0.0)
+        # absent conditions are fully safe and allow full autonomy
+        safeties = np.where(present, self.cond_safeties, 1.0)
+        autonomy_levels = np.where(present, self.cond_autonomy_levels, 1.0)
+
+        # state consequence and risk are maximum over all conditions, state autonomy level is minimum
+        state_conseq = consequences.max(axis=1)
+        state_risk = risks.max(axis=1)
+        state_safety = 1 - state_risk
+        state_auto = autonomy_levels.min(axis=1)
+
+        # interleave condition blocks so each condition's columns are adjacent, as in dataset formatting
+        cond_blocks = np.stack([cond_ind, likelihoods, consequences, risks, safeties, autonomy_levels], axis=2)
+        cond_blocks = cond_blocks.reshape(cond_ind.shape[0], 6 * cond_ind.shape[1])
+
+        # combine blocks in order of feature columns
+        state_blocks = np.stack([state_conseq, state_risk, state_safety, state_auto], axis=1)
+        feature_matrix = np.hstack([cond_blocks, pre_conseq_ind, state_blocks, post_conseq_ind])
+
+        return feature_matrix
+
+    def convert_indicators_to_pandas(self, cond_ind, pre_conseq_ind, post_conseq_ind, actions):
+        # compute feature values for all rows
+        feature_matrix = self.compute_feature_matrix(cond_ind, pre_conseq_ind, post_conseq_ind)
+
+        # create data frame from feature values, restoring column types
+        feature_col_names = self.col_info.get_feature_col_names()
+        df = pd.DataFrame(feature_matrix, columns=feature_col_names)
+        df = df.astype({col : self.col_info.column_types[col] for col in feature_col_names})
+
+        # set action columns
+        df[self.col_info.get_col_name_for_action()] = actions
+        df[self.col_info.get_col_name_for_action_encoded()] = np.array([self.action_encoding[act] for act in actions], dtype=int)
 
         return df
 
@@ -772,10 +772,12 @@ class DataProcessing:
     Process red teamed data
     """
 
-    def __init__(self, robot="val_clr", environment="lunar_habitat", initialize_weighted_datasets=False, weighted=[]):
+    def __init__(self, robot="val_clr", environment="lunar_habitat", initialize_weighted_datasets=False, weighted=[], use_fit_cache=False, warm_start=False,
+                 data_format="csv"):
         # set internal paramters
         self.robot_name = robot
         self.environment_name = environment
+        self.data_format = DatasetStorage.check_format(data_format)
 
         # initialize data info
         self.info = DatasetInfo()
@@ -786,6 +788,9 @@ class DataProcessing:
         # initialize data frame
         self.initialize_data_frame(initialize_weighted_datasets, weighted)
 
+        # initialize model fitting
+        self.initialize_model_fitting(use_fit_cache, warm_start)
+
     ######################
     ### INITIALIZATION ###
     ######################
@@ -798,10 +803,11 @@ class DataProcessing:
         _, (_, self.data_limited_file_name) = self.info.get_combined_dataset_full_path(self.robot_name, self.environment_name, limited_cfa=True)
 
         # create data frame
-        self.df_full = pd.read_csv(self.data_file_name)
-        self.df_rrs = pd.read_csv(self.rrs_data_file_name)
-        self.df_cfa = pd.read_csv(self.cfa_data_file_name)
-        self.df = pd.read_csv(self.data_limited_file_name)
+        dtypes = self.col_info.get_storage_dtypes()
+        self.df_full = DatasetStorage.load_dataset(self.data_file_name, self.data_format, dtypes)
+        self.df_rrs = DatasetStorage.load_dataset(self.rrs_data_file_name, self.data_format, dtypes)
+        self.df_cfa = DatasetStorage.load_dataset(self.cfa_data_file_name, self.data_format, dtypes)
+        self.df = DatasetStorage.load_dataset(self.data_limited_file_name, self.data_format, dtypes)
 
         if initialize_weighted_datasets:
             # check if weights given
@@ -812,9 +818,26 @@ class DataProcessing:
             # create dictionary for weighted datasets
             self.weighted_dfs = {}
             for i in weighted:
-                # get file name
-                _, (_, weighted_file_name) = self.info.get_combined_dataset_full_path(self.robot_name, self.environment_name, limited_cfa=True, weight=i)
-                self.weighted_dfs[i] = pd.read_csv(weighted_file_name)
+                self.weighted_dfs[i] = self.get_weighted_data(i)
+
+    def initialize_model_fitting(self, use_fit_cache=False, warm_start=False):
+        # options that determine a fitted model
+        self.fit_options = {
+            "method" : "newton",
+            "maxiter" : 150,
+            "test_split_random_state" : 0,
+            "warm_start" : warm_start
+        }
+
+        # parameters of fitted models used to warm start later fits, keyed by sorted feature names
+        self.warm_start_params = {}
+
+        # initialize cache of previously fitted models
+        self.fit_cache = None
+        if use_fit_cache:
+            self.fit_cache = ModelFitCache(self.info.fit_cache_dir)
+
+        return
 
     #######################
     ### DATASET HELPERS ###
@@ -832,6 +855,31 @@ class DataProcessing:
 
         return X, Y, X_train, X_test, y_train, y_test
 
+    def get_weighted_data(self, weight, df=None):
+        if df is None:
+            df = self.df
+
+        # dataset starts with risky scenario rows followed by counter-factual rows; weight risky scenario rows
+        sample_weights = np.ones(df.shape[0])
+        sample_weights[:self.df_rrs.shape[0]] = weight
+
+        # add sample weights as column
+        df_weighted = df.copy()
+        df_weighted[self.col_info.get_col_name_for_sample_weight()] = sample_weights
+
+        return df_weighted
+
+    def get_data_weights(self, df=None):
+        if df is None:
+            df = self.df
+
+        # check for sample weights
+        weight_col = self.col_info.get_col_name_for_sample_weight()
+        if weight_col not in df.columns:
+            return None
+
+        return df[weight_col]
+
     def get_data_X_Y(self, df=None, feature_indices=None):
         if df is None:
             df = self.df
@@ -840,7 +888,7 @@ class DataProcessing:
         X = None
         if feature_indices is None:
             # use all features
-            X = df.drop([self.col_info.get_col_name_for_action(), self.col_info.get_col_name_for_action_encoded()], axis=1)
+            X = df.drop([col for col in self.col_info.get_non_feature_col_names() if col in df.columns], axis=1)
         else:
             # use given features
             X = df.iloc[:,feature_indices]
@@ -852,7 +900,7 @@ class DataProcessing:
 
     def train_test_split_data(self, X, Y):
         # perform train test split
-        X_train, X_test, y_train, y_test = train_test_split(X, Y, random_state=0)
+        X_train, X_test, y_train, y_test = train_test_split(X, Y, random_state=self.fit_options["test_split_random_state"])
 
         return X_train, X_test, y_train, y_test
 
@@ -860,8 +908,9 @@ class DataProcessing:
         if df is None:
             df = self.df
 
-        # drop out categorical variable
+        # drop out categorical variable and sample weights
         df_quant = df.drop([self.col_info.get_col_name_for_action()], axis=1)
+        df_quant = df_quant.drop([self.col_info.get_col_name_for_sample_weight()], axis=1, errors='ignore')
 
         # compute correlation matrix
         corr_matrix = df_quant.corr()
@@ -912,6 +961,11 @@ class DataProcessing:
                                        df[target_col].reset_index(drop=True)], axis=1)
         # some weird things happening with additional rows being added, so reset index to fix this
 
+        # keep sample weights with interactions
+        weights = self.get_data_weights(df)
+        if weights is not None:
+            data_interactions = pd.concat([data_interactions, weights.reset_index(drop=True)], axis=1)
+
         # print out info about interactions dataframe
         print("Interactions dataset head:")
         print(data_interactions.head())
@@ -988,13 +1042,9 @@ class DataProcessing:
     ### MODEL HELPERS ###
     #####################
 
-    def create_feature_combos(self, data, num_cols=None):
-        # get target column names
-        target_col_names = self.col_info.get_col_name_for_action()
-        target_col = self.col_info.get_col_name_for_action_encoded()
-
-        # ensure data columns do not include targets
-        data_cols = [i for i in data.columns if (i != target_col) and (i != target_col_names)]
+    def create_feature_combos(self, data, num_cols=None, max_cols=None):
+        # ensure data columns do not include targets or sample weights
+        data_cols = [i for i in data.columns if i not in self.col_info.get_non_feature_col_names()]
 
         # create all combinations of features
         feature_combos = []
@@ -1004,20 +1054,30 @@ class DataProcessing:
             feature_combos = list(combinations(range(0,len(data_cols)),num_cols))
             return feature_combos
 
-        # otherwise, find all columns
-        for r in range(1,len(data.columns)+1):
+        # otherwise, find all columns, optionally up to maximum number of columns
+        if max_cols is None:
+            max_cols = len(data_cols)
+        for r in range(1,max_cols+1):
             for c in combinations(range(0,len(data_cols)),r):
                 feature_combos.append(c)
         print("Found " + str(len(feature_combos)) + " feature combinations over " + str(len(data_cols)) + " features")
 
         return feature_combos
 
-    def train_and_evaluate_model(self, X, Y, X_train, X_test, y_train, y_test):
+    def train_and_evaluate_model(self, X, Y, X_train, X_test, y_train, y_test, weights=None):
         # create formula string
-        formula, training_data = self.prep_formula_and_training_data(X_train, y_train, X.columns)
-
-        # build model
-        logit_model = self.build_and_train_model(formula, training_data)
+        formula, training_data = self.prep_formula_and_training_data(X_train, y_train, X.columns, weights=weights)
+
+        # check for previously fitted model
+        cache_key, cache_entry = self.load_cached_fit(X, Y, weights)
+        if cache_entry is not None:
+            # rebuild model from cached fit
+            print("Loaded model from fit cache")
+            logit_model = self.rebuild_cached_model(formula, training_data, cache_entry)
+        else:
+            # build model
+            logit_model = self.build_and_train_model(formula, training_data)
+            self.store_cached_fit(cache_key, logit_model, self.get_model_metrics(logit_model, X_test, y_test, weights))
         if logit_model is None:
             return False, None
 
@@ -1026,11 +1086,11 @@ class DataProcessing:
 
         # if good model, validate
         if good_model:
-            self.evaluate_model(logit_model, X_test, y_test)
+            self.evaluate_model(logit_model, X_test, y_test, weights)
 
         return good_model, logit_model
 
-    def prep_formula_and_training_data(self, X_train, y_train, col_names):
+    def prep_formula_and_training_data(self, X_train, y_train, col_names, verbose=True, weights=None):
         # get all columns in dataset
         all_columns = None
         if len(col_names) == 1:
@@ -1043,25 +1103,68 @@ class DataProcessing:
 
         # create the formula string
         formula = target_col + " ~ " + all_columns
-        print("formula: ", formula)
-        print()
+        if verbose:
+            print("formula: ", formula)
+            print()
 
-        # combine training predictors and targets into one dataframe
+        # combine training predictors, targets, and any sample weights into one dataframe
         training_data = pd.concat([X_train, y_train], axis=1)
-        print("training data shape:",training_data.shape)
+        if weights is not None:
+            training_data = pd.concat([training_data, weights.loc[X_train.index]], axis=1)
+        if verbose:
+            print("training data shape:",training_data.shape)
 
         return formula, training_data
 
-    def build_and_train_model(self, formula, training_data):
+    def build_and_train_model(self, formula, training_data, verbose=True, start_params=None):
+        # seed fit with closest previously fitted model
+        if (start_params is None) and self.fit_options["warm_start"]:
+            start_params = self.get_warm_start_params(self.create_model(formula, training_data))
+
+        # try warm started fit first; fall back to default start if it breaks down
+        logit_model = None
+        if start_params is not None:
+            logit_model = self.fit_model(formula, training_data, start_params, verbose=False)
+            if (logit_model is None) or (not self.check_model_training(logit_model)):
+                start_params = None
+        if start_params is None:
+            logit_model = self.fit_model(formula, training_data, None, verbose)
+        if logit_model is None:
+            return None
+
+        # record whether fit was warm started and remember parameters for later fits
+        logit_model.mle_retvals['warm_started'] = start_params is not None
+        if self.fit_options["warm_start"]:
+            self.store_warm_start_params(logit_model)
+
+        return logit_model
+
+    def create_model(self, formula, training_data):
+        # check for sample weights
+        weight_col = self.col_info.get_col_name_for_sample_weight()
+        if weight_col in training_data.columns:
+            # create multinomial logistic regression model with frequency weights
+            return WeightedMNLogit.from_formula(formula, data=training_data, freq_weights=training_data[weight_col].to_numpy())
+
+        # create multinomial logistic regression model
+        return smf.mnlogit(formula, data=training_data)
+
+    def fit_model(self, formula, training_data, start_params=None, verbose=True):
         try:
             # create multinomial logistic regression modelodel
-            logit_model = smf.mnlogit(formula, data=training_data).fit(maxiter=150)
+            logit_model = self.create_model(formula, training_data).fit(start_params=start_params, method=self.fit_options["method"],
+                                                                        maxiter=self.fit_options["maxiter"], disp=verbose)
         except LinAlgError as ex:
-            print("*** ERROR: singular matrix")
+            if verbose:
+                print("*** ERROR: singular matrix")
             return None
 
         return logit_model
 
+    def check_model_training(self, logit_model):
+        # same criteria as validate_model_training: promising models have non-nan function value
+        return not np.isnan(logit_model.mle_retvals['fopt'])
+
     def validate_model_training(self, logit_model, col_names):
         # check convergence or non-nan function value
         if logit_model.mle_retvals['converged'] or not np.isnan(logit_model.mle_retvals['fopt']):
@@ -1077,49 +1180,206 @@ class DataProcessing:
 
         return False
 
-    def evaluate_model(self, logit_model, X_test, y_test):
+    def predict_model(self, logit_model, X):
+        # compute predictions
+        y_pred_prob = logit_model.predict(X)
+        y_pred = np.argmax(np.array(y_pred_prob), axis=1)
+
+        return y_pred
+
+    def fit_feature_combination(self, data, feature_indices):
+        # get feature names
+        feature_names = [data.columns[i] for i in feature_indices]
+
+        # initialize structured result for this combination of features
+        result = {
+            "features" : FeatureCombinationSearch.format_feature_names(feature_names),
+            "num_features" : len(feature_names)
+        }
+
+        # get training and testing data
+        X, Y = self.get_data_X_Y(data, feature_indices)
+        weights = self.get_data_weights(data)
+
+        # check for previously fitted model
+        cache_key, cache_entry = self.load_cached_fit(X, Y, weights)
+        if cache_entry is not None:
+            result.update(cache_entry["metrics"])
+            return result
+
+        # create formula string and build model
+        X_train, X_test, y_train, y_test = self.train_test_split_data(X, Y)
+        formula, training_data = self.prep_formula_and_training_data(X_train, y_train, X.columns, verbose=False, weights=weights)
+        logit_model = self.build_and_train_model(formula, training_data, verbose=False)
+
+        # record how training went
+        metrics = self.get_model_metrics(logit_model, X_test, y_test, weights)
+        self.store_cached_fit(cache_key, logit_model, metrics)
+        result.update(metrics)
+
+        return result
+
+    def get_model_metrics(self, logit_model, X_test, y_test, weights=None):
+        # initialize metrics for model that could not be trained
+        metrics = {
+            "converged" : False,
+            "promising" : False,
+            "iterations" : np.nan,
+            "warm_started" : False,
+            "llf" : np.nan,
+            "aic" : np.nan,
+            "bic" : np.nan,
+            "test_accuracy" : np.nan
+        }
+        if logit_model is None:
+            return metrics
+
+        # record how training went
+        metrics["converged"] = bool(logit_model.mle_retvals['converged'])
+        metrics["iterations"] = int(logit_model.mle_retvals['iterations'])
+        metrics["warm_started"] = bool(logit_model.mle_retvals.get('warm_started', False))
+        metrics["promising"] = bool(self.check_model_training(logit_model))
+        metrics["llf"] = float(logit_model.llf)
+        metrics["aic"] = float(logit_model.aic)
+        metrics["bic"] = float(logit_model.bic)
+
+        # evaluate model
+        metrics["test_accuracy"] = float(accuracy_score(y_test, self.predict_model(logit_model, X_test), sample_weight=self.get_test_weights(X_test, weights)))
+
+        return metrics
+
+    def get_test_weights(self, X_test, weights=None):
+        # weight test examples the same way as training examples
+        if weights is None:
+            return None
+
+        return weights.loc[X_test.index].to_numpy()
+
+    def evaluate_model(self, logit_model, X_test, y_test, weights=None):
         # compute predictions
-        y_test_pred_prob = logit_model.predict(X_test)
-        y_test_pred = np.argmax(np.array(y_test_pred_prob), axis=1)
+        y_test_pred = self.predict_model(logit_model, X_test)
+        test_weights = self.get_test_weights(X_test, weights)
 
         # compute accuracy
-        print("Test accuracy:", accuracy_score(y_test, y_test_pred))
+        print("Test accuracy:", accuracy_score(y_test, y_test_pred, sample_weight=test_weights))
 
         # look at confusion matrix to evaluate model more closely
-        cm = confusion_matrix(y_test, y_test_pred)
+        cm = confusion_matrix(y_test, y_test_pred, sample_weight=test_weights)
         print("Confusion matrix:")
         print(cm)
         # ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=None).plot()
 
         return
 
+    ##########################
+    ### WARM START HELPERS ###
+    ##########################
+
+    def get_warm_start_params(self, model):
+        # look for same features fitted on another dataset (e.g., neighbouring weight), then for parent subsets
+        features = tuple(sorted(model.exog_names[1:]))
+        candidate_keys = [features] + [tuple(f for f in features if f != g) for g in features]
+
+        # use first previously fitted model with matching number of classes
+        num_classes = model.J - 1
+        for key in candidate_keys:
+            if (key in self.warm_start_params) and (self.warm_start_params[key].shape[1] == num_classes):
+                # features not in previous model start at zero
+                params = self.warm_start_params[key].reindex(index=model.exog_names).fillna(0.0)
+                return params.to_numpy().flatten(order='F')
+
+        return None
+
+    def store_warm_start_params(self, logit_model):
+        # only keep usable parameters
+        params = logit_model.params
+        if not np.all(np.isfinite(params.to_numpy())):
+            return
+
+        key = tuple(sorted(logit_model.model.exog_names[1:]))
+        self.warm_start_params[key] = pd.DataFrame(params.to_numpy(), index=params.index)
+
+        return
+
+    ###############################
+    ### MODEL FIT CACHE HELPERS ###
+    ###############################
+
+    def load_cached_fit(self, X, Y, weights=None):
+        # check if caching fitted models
+        if self.fit_cache is None:
+            return None, None
+
+        # cache key covers full dataset since train test split is determined by fit options
+        cache_key = self.fit_cache.get_key(pd.concat([X, Y] + ([] if weights is None else [weights]), axis=1), list(X.columns), self.fit_options)
+
+        return cache_key, self.fit_cache.load(cache_key)
+
+    def store_cached_fit(self, cache_key, logit_model, metrics):
+        # check if caching fitted models
+        if self.fit_cache is None:
+            return
+
+        self.fit_cache.store(cache_key, ModelFitCache.create_entry(logit_model, metrics))
+
+        return
+
+    def rebuild_cached_model(self, formula, training_data, cache_entry):
+        # cached model could not be trained
+        if cache_entry["params"] is None:
+            return None
+
+        # create model and order cached parameters to match
+        model = self.create_model(formula, training_data)
+        start_params = ModelFitCache.get_entry_params(cache_entry, model.exog_names).flatten(order='F')
+
+        # create results at cached parameters without further iterations
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            logit_model = model.fit(start_params=start_params, method=self.fit_options["method"], maxiter=0, disp=False)
+
+        # restore optimizer results from original fit
+        logit_model.mle_retvals.update(cache_entry["mle_retvals"])
+
+        return logit_model
+
     ###################################
     ### LOGISTIC REGRESSION HELPERS ###
     ###################################
 
-    def explore_possible_models(self, df=None, feature_indices=None, explore_weights=None):
+    def explore_possible_models(self, df=None, feature_indices=None, explore_weights=None, workers=1, results_file=None,
+                                search="exhaustive", beam_width=5, max_features=None):
         if explore_weights is not None:
-            self.__explore_possible_models_with_weights(feature_indices, explore_weights)
+            self.__explore_possible_models_with_weights(feature_indices, explore_weights, workers, results_file, search, beam_width, max_features)
         else:
-            self.__explore_possible_models(df, feature_indices)
+            self.__explore_possible_models(df, feature_indices, workers, results_file, search, beam_width, max_features)
         return
 
-    def __explore_possible_models(self, df=None, feature_indices=None):
+    def __explore_possible_models(self, df=None, feature_indices=None, workers=1, results_file=None,
+                                  search="exhaustive", beam_width=5, max_features=None):
         if df is None:
             df = self.df
 
         if feature_indices is not None:
-            df = df.iloc[:,feature_indices]
+            # select given features, keeping target columns and sample weights for model training
+            target_idxs = [df.columns.get_loc(col) for col in self.col_info.get_non_feature_col_names() if col in df.columns]
+            df = df.iloc[:,[i for i in feature_indices if i not in target_idxs] + target_idxs]
+
+        # check if searching combinations of features
+        if search != "exhaustive":
+            self.search_feature_combinations(df, search, beam_width, max_features, workers, results_file)
+            return
 
         # create all combinations of features
-        feature_combos = self.create_feature_combos(df)
+        feature_combos = self.create_feature_combos(df, max_cols=max_features)
 
         # explore combinations
-        self.explore_feature_combinations(df, feature_combos)
+        self.explore_feature_combinations(df, feature_combos, workers, results_file)
 
         return
 
-    def __explore_possible_models_with_weights(self, feature_indices=None, explore_weights=[]):
+    def __explore_possible_models_with_weights(self, feature_indices=None, explore_weights=[], workers=1, results_file=None,
+                                               search="exhaustive", beam_width=5, max_features=None):
         # set weights
         if len(explore_weights) == 0:
             # set all possible weights
@@ -1127,32 +1387,49 @@ class DataProcessing:
 
         # loop through all possible weights
         for i in explore_weights:
-            # get dataset
-            weighted_df = self.weighted_dfs[i]
+            # get dataset, weighting samples for weights that were not initialized
+            weighted_df = self.weighted_dfs[i] if i in self.weighted_dfs else self.get_weighted_data(i)
             print("\n\n\n==============================")
             print("***** EXPLORING WEIGHTED DATASET *****")
             print("RRS : CFA = {} : 1".format(i))
+            # keep separate results table for each weight
+            weighted_results_file = None
+            if results_file is not None:
+                weighted_results_file = results_file.replace(".csv","_weighted_{}x.csv".format(i))
             # explore models over this dataset
-            self.__explore_possible_models(weighted_df, feature_indices)
+            self.__explore_possible_models(weighted_df, feature_indices, workers, weighted_results_file, search, beam_width, max_features)
             print("\n\n\n==============================\n\n\n")
 
         return
 
-    def explore_possible_models_with_interactions(self, df=None, feature_indices=None, limit_interactions=False):
+    def explore_possible_models_with_interactions(self, df=None, feature_indices=None, limit_interactions=False, workers=1, results_file=None,
+                                                  search="exhaustive", beam_width=5, max_features=None):
         if df is None:
             df = self.df
 
         data_interactions, Xt = self.get_interaction_data(df, feature_indices, limit_interactions)
 
+        # check if searching combinations of features
+        if search != "exhaustive":
+            self.search_feature_combinations(data_interactions, search, beam_width, max_features, workers, results_file)
+            return
+
         # create all combinations of features
-        feature_combos = self.create_feature_combos(Xt)
+        feature_combos = self.create_feature_combos(Xt, max_cols=max_features)
 
         # explore combinations
-        self.explore_feature_combinations(data_interactions, feature_combos)
+        self.explore_feature_combinations(data_interactions, feature_combos, workers, results_file)
 
         return
 
-    def explore_feature_combinations(self, data, feature_combos):
+    def explore_feature_combinations(self, data, feature_combos, workers=1, results_file=None):
+        # check if exploring with search engine
+        if (workers != 1) or (results_file is not None):
+            search = FeatureCombinationSearch(self, data, results_file=results_file, workers=workers)
+            results = search.run(feature_combos)
+            search.print_best_results(results)
+            return
+
         # explore combinations
         for combo in feature_combos:
             print("==========")
@@ -1164,15 +1441,36 @@ class DataProcessing:
 
         return
 
+    def search_feature_combinations(self, data, search, beam_width=5, max_features=None, workers=1, results_file=None):
+        # get indices of candidate features
+        candidates = [i for i, col in enumerate(data.columns) if col not in self.col_info.get_non_feature_col_names()]
+
+        # search combinations of candidate features
+        search_engine = FeatureCombinationSearch(self, data, results_file=results_file, workers=workers)
+        best_combo, results = search_engine.run_search(search, candidates, beam_width, max_features)
+        if results is None:
+            return
+
+        # print best combination found
+        if best_combo is None:
+            print("*** No promising model found by {} search".format(search))
+        else:
+            print("*** Best model found by {} search with features: ".format(search), [data.columns[i] for i in best_combo])
+        print()
+        search_engine.print_best_results(results)
+
+        return
+
     def run_logistic_regression_analysis(self, df=None, feature_indices=None):
         if df is None:
             df = self.df
 
         # get training and testing data
         X, Y, X_train, X_test, y_train, y_test = self.prep_data_for_model_training(df, feature_indices)
+        weights = self.get_data_weights(df)
 
         # create, train, and evaluate logistic regression model
-        promising_model, logit_model = self.train_and_evaluate_model(X, Y, X_train, X_test, y_train, y_test)
+        promising_model, logit_model = self.train_and_evaluate_model(X, Y, X_train, X_test, y_train, y_test, weights)
 
         return promising_model, logit_model
 
@@ -1184,13 +1482,7 @@ class DataProcessing:
         print("Saving model to file...")
 
         # get file name
-        model_file_name = "{0}{1}_{2}_{3}{4}".format(
-            self.info.models_dir,
-            self.robot_name,
-            self.environment_name,
-            model_name,
-            self.info.model_file_end
-        )
+        model_file_name = self.info.get_model_full_path(self.robot_name, self.environment_name, model_name)
 
         # save model
         pickle.dump(model, open(model_file_name, 'wb'))
@@ -1272,6 +1564,85 @@ class DataProcessing:
 
 
 
+###############################
+### DATA PROCESSING HELPERS ###
+###############################
+
+def process_robot_env_data(robot, env, data_format="csv"):
+    # create all datasets for one robot/environment pair; runs in its own process when processing in parallel
+    # start timer
+    start_time = time.time()
+
+    try:
+        # create data pre-processing object
+        data_preprocess = DataPreprocessing(robot, env, data_format)
+
+        # create dataset csvs
+        rospy.loginfo("[SAR Data Processing Node] Processing data for robot %s in %s environment",
+                      robot.upper(), env.upper())
+        data_preprocess.convert_yamls_to_dataset_csv()
+        rospy.loginfo("[SAR Data Processing Node] Created datasets for robot %s in %s environment",
+                      robot.upper(), env.upper())
+    except Exception:
+        # isolate failure to this robot/environment pair
+        rospy.logerr("[SAR Data Processing Node] Failed to process data for robot %s in %s environment:\n%s",
+                     robot.upper(), env.upper(), traceback.format_exc())
+        return robot, env, False, time.time() - start_time
+
+    return robot, env, True, time.time() - start_time
+
+def process_all_robot_env_data(robots, envs, workers=1, data_format="csv"):
+    # create jobs for every robot/environment pair
+    jobs = [(robot, env) for robot in robots for env in envs]
+
+    # initialize results
+    results = []
+
+    if workers == 1:
+        # process all data serially
+        for robot, env in jobs:
+            results.append(process_robot_env_data(robot, env, data_format))
+    else:
+        # process all data across pool of worker processes
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_robot_env_data, robot, env, data_format) for robot, env in jobs]
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception:
+                    # worker process died before returning a result
+                    rospy.logerr("[SAR Data Processing Node] Worker process failed:\n%s", traceback.format_exc())
+
+    return results
+
+def print_data_processing_summary(robots, envs, results):
+    # map each job to its result
+    job_results = {(robot, env) : (succ, elapsed) for robot, env, succ, elapsed in results}
+
+    # report every job in order
+    num_succ = 0
+    for robot in robots:
+        for env in envs:
+            if (robot, env) not in job_results:
+                rospy.logerr("[SAR Data Processing Node]     robot %s in %s environment: FAILED (no result)",
+                             robot.upper(), env.upper())
+                continue
+            succ, elapsed = job_results[(robot, env)]
+            if succ:
+                num_succ += 1
+                rospy.loginfo("[SAR Data Processing Node]     robot %s in %s environment: succeeded in %.2f seconds",
+                              robot.upper(), env.upper(), elapsed)
+            else:
+                rospy.logerr("[SAR Data Processing Node]     robot %s in %s environment: FAILED after %.2f seconds",
+                             robot.upper(), env.upper(), elapsed)
+
+    rospy.loginfo("[SAR Data Processing Node] Processed %d of %d robot/environment pairs successfully",
+                  num_succ, len(robots) * len(envs))
+
+    return num_succ == len(robots) * len(envs)
+
+
+
 #####################
 ### MAIN FUNCTION ###
 #####################
@@ -1284,6 +1655,8 @@ if __name__ == '__main__':
     # get ROS parameters
     robot_name = rospy.get_param(param_prefix + 'robot', "all")
     env_name = rospy.get_param(param_prefix + 'environment', "all")
+    workers = rospy.get_param(param_prefix + 'workers', 1)
+    data_format = rospy.get_param(param_prefix + 'format', "csv")
 
     # initialize node
     rospy.init_node(node_name)
@@ -1313,22 +1686,22 @@ if __name__ == '__main__':
     else:
         rospy.logwarn("[SAR Data Processing Node] Unrecognized environment %e, defaulting to 'all'", env_name)
 
+    # check number of workers; non-positive means one worker per core, never more than number of jobs
+    if workers <= 0:
+        workers = os.cpu_count()
+    workers = max(1, min(workers, len(robots) * len(envs)))
+    rospy.loginfo("[SAR Data Processing Node] Processing %d robot/environment pairs with %d worker(s)",
+                  len(robots) * len(envs), workers)
+
     # process all data
-    for robot in robots:
-        for env in envs:
-            # create data pre-processing object
-            data_preprocess = DataPreprocessing(robot, env)
-
-            # create dataset csvs
-            rospy.loginfo("[SAR Data Processing Node] Processing data for robot %s in %s environment",
-                          robot.upper(), env.upper())
-            df_rrs, df_cfa = data_preprocess.convert_yamls_to_dataset_csv()
-            rospy.loginfo("[SAR Data Processing Node] Created datasets for robot %s in %s environment",
-                          robot.upper(), env.upper())
-            data_preprocess.create_weighted_limited_datasets(df1=df_rrs, df2=df_cfa)
-            rospy.loginfo("[SAR Data Processing Node] Created weighted datasets for robot %s in %s environment",
-                          robot.upper(), env.upper())
-
-    rospy.loginfo("[SAR Data Processing Node] Completed data processing!")
+    rospy.loginfo("[SAR Data Processing Node] Saving datasets in %s format", data_format)
+    results = process_all_robot_env_data(robots, envs, workers, data_format)
+
+    # report results
+    all_succ = print_data_processing_summary(robots, envs, results)
+    if all_succ:
+        rospy.loginfo("[SAR Data Processing Node] Completed data processing!")
+    else:
+        rospy.logwarn("[SAR Data Processing Node] Completed data processing with failures; please review errors to fix.")
 
     rospy.loginfo("[SAR Data Processing Node] Node stopped, all done!")
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Data Processing Benchmarks
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import os, time, tempfile, shutil
+
+import numpy as np
+import yaml
+
+# dataset classes
+from data_processing import DatasetInfo, DataPreprocessing
+from risk_mitigating_action_model import RiskMitigatingActionModel
+from yaml_io import YAMLFileIO
+
+###########################################
+### DATA PROCESSING BENCHMARK FUNCTIONS ###
+###########################################
+
+class DataProcessingBenchmarks:
+
+    # TIMING HELPERS
+
+    @staticmethod
+    def time_function(func, *args, repeats=3):
+        # run function several times and keep best time
+        best_time = float('inf')
+        output = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            output = func(*args)
+            best_time = min(best_time, time.perf_counter() - start)
+
+        return best_time, output
+
+    # LEGACY IMPLEMENTATIONS
+
+    @staticmethod
+    def legacy_limit_cfa_dataset_to_improvement_examples(data_preprocess, df_cfa):
+        # row-by-row implementation previously used by DataPreprocessing, kept for comparison
+        pre_act_idxs = data_preprocess.col_info.get_all_conseq_col_idxs(pre_action=True)
+        post_act_idxs = data_preprocess.col_info.get_all_conseq_col_idxs(pre_action=False)
+
+        pos_row_idxs = []
+        fact_row_idxs = []
+
+        for i in range(df_cfa.shape[0]):
+            num_pre_act_conseq = sum(df_cfa.iloc[i,pre_act_idxs])
+            num_post_act_conseq = sum(df_cfa.iloc[i,post_act_idxs])
+
+            if num_post_act_conseq < num_pre_act_conseq:
+                pos_row_idxs.append(i)
+                if num_post_act_conseq == 0:
+                    fact_row_idxs.append(i)
+
+        return df_cfa.iloc[pos_row_idxs,:], df_cfa.iloc[fact_row_idxs,:]
+
+    # SYNTHETIC DATA
+
+    @staticmethod
+    def create_synthetic_cfa_dataset(df_cfa, num_rows, seed=0):
+        # resample rows of real counter-factual dataset up to requested size
+        return df_cfa.sample(n=num_rows, replace=True, random_state=seed).reset_index(drop=True)
+
+    # IMPROVEMENT FILTER BENCHMARK
+
+    @staticmethod
+    def benchmark_improvement_filter(data_preprocess, df_cfa, name, legacy_max_rows=None):
+        # time vectorized filter over full dataset
+        vec_time, (df_pos, df_fact) = DataProcessingBenchmarks.time_function(data_preprocess.limit_cfa_dataset_to_improvement_examples, df_cfa)
+
+        # time legacy filter, optionally over a prefix of the dataset to keep run time reasonable
+        df_legacy = df_cfa
+        if (legacy_max_rows is not None) and (df_cfa.shape[0] > legacy_max_rows):
+            df_legacy = df_cfa.iloc[:legacy_max_rows,:]
+        legacy_time, (df_legacy_pos, df_legacy_fact) = DataProcessingBenchmarks.time_function(DataProcessingBenchmarks.legacy_limit_cfa_dataset_to_improvement_examples,
+                                                                                             data_preprocess, df_legacy, repeats=1)
+
+        # extrapolate legacy time to full dataset
+        legacy_time_full = legacy_time * (df_cfa.shape[0] / max(df_legacy.shape[0], 1))
+
+        # verify both implementations agree on rows they both processed
+        vec_pos, vec_fact = data_preprocess.limit_cfa_dataset_to_improvement_examples(df_legacy)
+        agree = vec_pos.equals(df_legacy_pos) and vec_fact.equals(df_legacy_fact)
+
+        print("{:<40} rows={:>9}  improvement={:>9}  matches_factual={:>9}  legacy={:>10.4f}s{}  vectorized={:>8.4f}s  speedup={:>9.1f}x  agree={}".format(
+            name, df_cfa.shape[0], df_pos.shape[0], df_fact.shape[0],
+            legacy_time_full, "*" if df_legacy is not df_cfa else " ",
+            vec_time, legacy_time_full / vec_time, agree))
+
+        return
+
+    @staticmethod
+    def run_improvement_filter_benchmarks(synthetic_rows=1000000, legacy_max_rows=2000):
+        print("IMPROVEMENT FILTER BENCHMARK (* = legacy time extrapolated from first {} rows)".format(legacy_max_rows))
+
+        # loop through robot/environment combinations
+        info = DatasetInfo()
+        df_synthetic_source = None
+        data_preprocess_synthetic = None
+        for robot in info.supported_robots:
+            for env in info.supported_envs:
+                # create counter-factual dataset from shipped policy data
+                data_preprocess = DataPreprocessing(robot, env)
+                df_cfa = data_preprocess.convert_yaml_to_pandas(info.get_cfa_policy_full_path(robot))
+                DataProcessingBenchmarks.benchmark_improvement_filter(data_preprocess, df_cfa, robot + "/" + env, legacy_max_rows)
+
+                # remember a dataset to build synthetic data from
+                df_synthetic_source = df_cfa
+                data_preprocess_synthetic = data_preprocess
+
+        # benchmark large synthetic dataset
+        df_synthetic = DataProcessingBenchmarks.create_synthetic_cfa_dataset(df_synthetic_source, synthetic_rows)
+        DataProcessingBenchmarks.benchmark_improvement_filter(data_preprocess_synthetic, df_synthetic, "synthetic", legacy_max_rows)
+        print()
+
+        return
+
+    # PREDICTION LATENCY BENCHMARK
+
+    @staticmethod
+    def benchmark_prediction_latency(robot, env, model_name, num_queries=10000, max_conds=3, seed=0):
+        # load model once, as prediction node does
+        model = RiskMitigatingActionModel(robot, env, model_name)
+        if not model.model_loaded:
+            return
+
+        # create random queries of one to max_conds conditions
+        rng = np.random.default_rng(seed)
+        cond_names = list(model.cond_idxs.keys())
+        queries = []
+        for _ in range(num_queries):
+            num_conds = rng.integers(1, min(max_conds, len(cond_names)) + 1)
+            queries.append(list(rng.choice(cond_names, num_conds, replace=False)))
+
+        # time each query
+        latencies = np.zeros(num_queries)
+        for i, query in enumerate(queries):
+            start = time.perf_counter()
+            model.predict_ranked_actions(query)
+            latencies[i] = time.perf_counter() - start
+
+        # report latency percentiles in microseconds
+        p50, p99, p_max = np.percentile(latencies, [50, 99, 100]) * 1e6
+        print("{:<60} queries={:>7}  p50={:>8.1f}us  p99={:>8.1f}us  max={:>9.1f}us".format(
+            robot + "/" + env + "/" + model_name, num_queries, p50, p99, p_max))
+
+        return
+
+    @staticmethod
+    def run_prediction_latency_benchmarks(num_queries=10000):
+        print("PREDICTION LATENCY BENCHMARK")
+
+        # loop through saved models
+        info = DatasetInfo()
+        for robot in info.supported_robots:
+            for env in info.supported_envs:
+                model_prefix = robot + "_" + env + "_"
+                for file_name in sorted(os.listdir(info.models_dir)):
+                    if file_name.startswith(model_prefix) and file_name.endswith(info.model_file_end):
+                        model_name = file_name[len(model_prefix):-len(info.model_file_end)]
+                        DataProcessingBenchmarks.benchmark_prediction_latency(robot, env, model_name, num_queries)
+        print()
+
+        return
+
+    # DATASET CONVERSION CHECK
+
+    @staticmethod
+    def check_dataset_conversion(data_preprocess, yaml_file, csv_file, name):
+        # time conversion of policy data to dataset
+        convert_time, df = DataProcessingBenchmarks.time_function(data_preprocess.convert_yaml_to_pandas, yaml_file)
+
+        # verify converted dataset is identical to saved dataset
+        fo = open(csv_file)
+        saved_csv = fo.read()
+        fo.close()
+        identical = (df.to_csv(index=False) == saved_csv)
+
+        print("{:<40} rows={:>7}  convert={:>8.4f}s  identical={}".format(name, df.shape[0], convert_time, identical))
+
+        return
+
+    @staticmethod
+    def check_empty_dataset_conversion(data_preprocess, csv_file, name):
+        # write policy data file with no data points
+        tmp_dir = tempfile.mkdtemp()
+        yaml_file = os.path.join(tmp_dir, "empty_policy_data.yaml")
+        YAMLFileIO.dump_file({data_preprocess.environment_name : {'policy_data' : []}}, yaml_file)
+
+        # convert empty policy data to dataset
+        df = data_preprocess.convert_yaml_to_pandas(yaml_file)
+        shutil.rmtree(tmp_dir)
+
+        # verify empty dataset has same columns as saved dataset
+        fo = open(csv_file)
+        saved_header = fo.readline()
+        fo.close()
+        identical = (df.shape[0] == 0) and (df.to_csv(index=False) == saved_header)
+
+        print("{:<40} rows={:>7}  columns={:>5}  identical={}".format(name, df.shape[0], df.shape[1], identical))
+
+        return
+
+    @staticmethod
+    def run_dataset_conversion_checks():
+        print("DATASET CONVERSION CHECK (converted policy data against saved datasets)")
+
+        # loop through robot/environment combinations
+        info = DatasetInfo()
+        for robot in info.supported_robots:
+            for env in info.supported_envs:
+                data_preprocess = DataPreprocessing(robot, env)
+                _, rrs_csv_file = info.get_rrs_dataset_full_path(robot, env)
+                _, cfa_csv_file = info.get_cfa_dataset_full_path(robot, env)
+                DataProcessingBenchmarks.check_dataset_conversion(data_preprocess, info.get_rrs_policy_full_path(robot), rrs_csv_file, robot + "/" + env + "/rrs")
+                DataProcessingBenchmarks.check_dataset_conversion(data_preprocess, info.get_cfa_policy_full_path(robot), cfa_csv_file, robot + "/" + env + "/cfa")
+                DataProcessingBenchmarks.check_empty_dataset_conversion(data_preprocess, rrs_csv_file, robot + "/" + env + "/empty")
+        print()
+
+        return
+
+    # YAML IO BENCHMARK
+
+    @staticmethod
+    def benchmark_yaml_io(yaml_file, name):
+        # get file size
+        fo = open(yaml_file)
+        num_lines = len(fo.readlines())
+        fo.close()
+
+        # time pure-Python loader and central loader
+        py_load_time, py_dict = DataProcessingBenchmarks.time_function(YAMLFileIO.load_file, yaml_file, yaml.FullLoader)
+        io_load_time, io_dict = DataProcessingBenchmarks.time_function(YAMLFileIO.load_file, yaml_file)
+
+        # time pure-Python dumper and central dumper
+        py_dump_time, py_str = DataProcessingBenchmarks.time_function(YAMLFileIO.dump, py_dict, None, yaml.Dumper)
+        io_dump_time, io_str = DataProcessingBenchmarks.time_function(YAMLFileIO.dump, io_dict)
+
+        # verify both paths read and write the same data
+        agree = (py_dict == io_dict) and (py_str == io_str)
+
+        print("{:<40} lines={:>7}  load={:>8.4f}s -> {:>8.4f}s ({:>5.1f}x)  dump={:>8.4f}s -> {:>8.4f}s ({:>5.1f}x)  agree={}".format(
+            name, num_lines, py_load_time, io_load_time, py_load_time / io_load_time,
+            py_dump_time, io_dump_time, py_dump_time / io_dump_time, agree))
+
+        return
+
+    @staticmethod
+    def run_yaml_io_benchmarks():
+        print("YAML IO BENCHMARK (pure Python -> {})".format("libyaml" if YAMLFileIO.libyaml_available else "pure Python fallback"))
+
+        # loop through counter-factual policy data files
+        info = DatasetInfo()
+        for robot in info.supported_robots:
+            DataProcessingBenchmarks.benchmark_yaml_io(info.get_cfa_policy_full_path(robot), robot + "/counter_factual_policy_data.yaml")
+        print()
+
+        return
+
+
+
+######################
+### RUN BENCHMARKS ###
+######################
+
+if __name__ == '__main__':
+    # initialize flags for run
+    dataset_conversion = True
+    improvement_filter = True
+    prediction_latency = True
+    yaml_io = True
+
+    # number of rows in synthetic datasets
+    synthetic_rows = 1000000
+    # maximum number of rows processed by slow legacy implementations
+    legacy_max_rows = 2000
+    # number of queries timed per saved model
+    num_queries = 10000
+
+    if dataset_conversion:
+        DataProcessingBenchmarks.run_dataset_conversion_checks()
+
+    if improvement_filter:
+        DataProcessingBenchmarks.run_improvement_filter_benchmarks(synthetic_rows, legacy_max_rows)
+
+    if prediction_latency:
+        DataProcessingBenchmarks.run_prediction_latency_benchmarks(num_queries)
+
+    if yaml_io:
+        DataProcessingBenchmarks.run_yaml_io_benchmarks()
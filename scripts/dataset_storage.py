@@ -0,0 +1,108 @@
+"""
+Dataset Storage Class
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import os
+
+import pandas as pd
+
+# columnar formats need pyarrow; CSV is used when it is not installed
+try:
+    import pyarrow
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+#############################
+### DATASET STORAGE CLASS ###
+#############################
+
+class DatasetStorage:
+    """
+    Saves and loads datasets as CSV or as columnar binary files (Feather/Parquet) that keep the
+    dataset schema, so datasets load without re-parsing text or re-inferring column types
+    """
+
+    # supported formats and file endings
+    format_file_ends = {
+        "csv" : ".csv",
+        "feather" : ".feather",
+        "parquet" : ".parquet"
+    }
+
+    ###############
+    ### HELPERS ###
+    ###############
+
+    @staticmethod
+    def check_format(data_format):
+        # check format is recognized
+        if data_format not in DatasetStorage.format_file_ends:
+            print("ERROR: unrecognized dataset format " + str(data_format) + "; expected one of: ", list(DatasetStorage.format_file_ends.keys()))
+            return "csv"
+
+        # check columnar formats can be used
+        if (data_format != "csv") and (not PYARROW_AVAILABLE):
+            print("WARNING: dataset format " + data_format + " requires pyarrow, which is not installed; using csv")
+            return "csv"
+
+        return data_format
+
+    @staticmethod
+    def get_file_name_for_format(csv_file, data_format):
+        # dataset file names are defined with csv endings
+        return os.path.splitext(csv_file)[0] + DatasetStorage.format_file_ends[data_format]
+
+    @staticmethod
+    def apply_schema(df, dtypes):
+        # only convert columns in dataset (e.g., sample weights are not part of schema)
+        return df.astype({col : dtype for col, dtype in dtypes.items() if col in df.columns})
+
+    ###################
+    ### SAVE / LOAD ###
+    ###################
+
+    @staticmethod
+    def save_dataset(df, csv_path, csv_file, data_format="csv", dtypes=None, export_csv=True):
+        # check if path exists:
+        if not os.path.exists(csv_path):
+            # create directory
+            os.mkdir(csv_path)
+
+        # save data frame to csv file
+        if export_csv or (data_format == "csv"):
+            df.to_csv(csv_file, index=False)
+
+        # save data frame to columnar file with schema
+        if data_format != "csv":
+            df_typed = df if dtypes is None else DatasetStorage.apply_schema(df, dtypes)
+            file_name = DatasetStorage.get_file_name_for_format(csv_file, data_format)
+            if data_format == "feather":
+                df_typed.to_feather(file_name)
+            elif data_format == "parquet":
+                df_typed.to_parquet(file_name, index=False)
+
+        return
+
+    @staticmethod
+    def load_dataset(csv_file, data_format="csv", dtypes=None):
+        # load csv file as before
+        if data_format == "csv":
+            return pd.read_csv(csv_file)
+
+        # load columnar file if it exists
+        file_name = DatasetStorage.get_file_name_for_format(csv_file, data_format)
+        if os.path.exists(file_name):
+            if data_format == "feather":
+                return pd.read_feather(file_name)
+            elif data_format == "parquet":
+                return pd.read_parquet(file_name)
+
+        # otherwise fall back to csv file, applying schema so columns match columnar files
+        print("WARNING: dataset file " + file_name + " does not exist; loading " + csv_file)
+        df = pd.read_csv(csv_file)
+        if dtypes is not None:
+            df = DatasetStorage.apply_schema(df, dtypes)
+
+        return df
@@ -13,7 +13,7 @@ from safety_aware_reasoning.srv import CounterFactualDataGeneration, CounterFact
 ############################################
 
 class DomainSpecificKnowledge:
-    def __init__(self, node_name=None, service_name_stub=None):
+    def __init__(self, node_name=None, service_name_stub=None, advertise_services=True):
         # set node name
         if node_name is None:
             self.node_name = "Generic Domain-Specific Knowledge"
@@ -27,8 +27,9 @@ class DomainSpecificKnowledge:
             self.risky_scenario_service_name  = service_name_stub + "_" + self.risky_scenario_service_name
             self.counter_factual_service_name = service_name_stub + "_" + self.counter_factual_service_name
     
-        # advertise services
-        self.advertise_services()
+        # advertise services (not needed if knowledge is used in-process, without ROS master)
+        if advertise_services:
+            self.advertise_services()
 
     ##########################
     ### ADVERTISE SERVICES ###
@@ -0,0 +1,455 @@
+"""
+Feature Combination Search Class
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import os, io, csv
+import warnings
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+#############################
+### SEARCH WORKER HELPERS ###
+#############################
+
+# data processing object and dataset used by each worker process
+search_worker_data_processing = None
+search_worker_data = None
+
+def initialize_search_worker(data_processing, data):
+    # set data for this worker process
+    global search_worker_data_processing, search_worker_data
+    search_worker_data_processing = data_processing
+    search_worker_data = data
+
+    # fitting many models produces many convergence warnings; convergence is recorded in results instead
+    warnings.simplefilter("ignore")
+
+    return
+
+def fit_search_feature_combination(combo):
+    # fit model for given combination of features in this worker process
+    return search_worker_data_processing.fit_feature_combination(search_worker_data, list(combo))
+
+
+
+########################################
+### FEATURE COMBINATION SEARCH CLASS ###
+########################################
+
+class FeatureCombinationSearch:
+    """
+    Fits models for combinations of features across a pool of processes, either exhaustively or
+    with a stepwise, beam, or branch-and-bound search strategy, streaming structured results into
+    a results table that can be resumed after interruption
+    """
+
+    result_columns = ["features", "num_features", "converged", "promising", "iterations", "warm_started", "llf", "aic", "bic", "test_accuracy"]
+    feature_separator = " + "
+    search_strategies = ["exhaustive", "forward", "backward", "beam", "branch_and_bound"]
+
+    def __init__(self, data_processing, data, results_file=None, workers=1, chunksize=4, progress_interval=100):
+        # set internal parameters
+        self.data_processing = data_processing
+        self.data = data
+        self.results_file = results_file
+        self.workers = workers if workers > 0 else os.cpu_count()
+        self.chunksize = chunksize
+        self.progress_interval = progress_interval
+
+        # results of fitted combinations, keyed by feature names
+        self.fitted_results = None
+        self.num_fitted = 0
+
+        # pool of worker processes, created once per search (set while search runs)
+        self.executor = None
+
+    ###############
+    ### HELPERS ###
+    ###############
+
+    @staticmethod
+    def format_feature_names(feature_names):
+        return FeatureCombinationSearch.feature_separator.join(feature_names)
+
+    @staticmethod
+    def parse_feature_names(features):
+        return features.split(FeatureCombinationSearch.feature_separator)
+
+    def get_feature_combo_key(self, combo):
+        return FeatureCombinationSearch.format_feature_names([self.data.columns[i] for i in combo])
+
+    #####################
+    ### RESULTS TABLE ###
+    #####################
+
+    def load_results(self):
+        # check for existing results
+        if (self.results_file is None) or (not os.path.exists(self.results_file)):
+            return pd.DataFrame(columns=FeatureCombinationSearch.result_columns)
+
+        # read results table
+        fo = open(self.results_file, newline='')
+        table = fo.read()
+        fo.close()
+
+        # last row may have been cut off (even inside its last field) if previous search was interrupted; keep complete lines
+        if not table.endswith("\n"):
+            table = table[:table.rfind("\n") + 1]
+        rows = [row for row in csv.DictReader(io.StringIO(table, newline='')) if None not in row.values()]
+
+        # rewrite results table with only complete rows so new rows can be appended; write to temporary file and
+        # move into place so an interrupted rewrite never loses stored results
+        tmp_file = "{}.{}.tmp".format(self.results_file, os.getpid())
+        fo = open(tmp_file, 'w', newline='')
+        writer = csv.DictWriter(fo, fieldnames=FeatureCombinationSearch.result_columns)
+        writer.writeheader()
+        writer.writerows(rows)
+        fo.flush()
+        os.fsync(fo.fileno())
+        fo.close()
+        os.replace(tmp_file, self.results_file)
+
+        return pd.read_csv(self.results_file)
+
+    def open_results_table(self):
+        # no results table to write
+        if self.results_file is None:
+            return None, None
+
+        # check if path exists
+        results_path = os.path.dirname(self.results_file)
+        if (results_path != "") and (not os.path.exists(results_path)):
+            # create directory
+            os.makedirs(results_path)
+
+        # open results table in append mode, writing header to new tables
+        new_table = (not os.path.exists(self.results_file)) or (os.path.getsize(self.results_file) == 0)
+        fo = open(self.results_file, 'a', newline='')
+        writer = csv.DictWriter(fo, fieldnames=FeatureCombinationSearch.result_columns)
+        if new_table:
+            writer.writeheader()
+
+        return fo, writer
+
+    ##############
+    ### SEARCH ###
+    ##############
+
+    def run(self, feature_combos):
+        # load previous results and skip combinations that were already fitted
+        self.load_fitted_results()
+        num_fitted = sum(1 for combo in feature_combos if self.get_feature_combo_key(combo) in self.fitted_results)
+
+        # fit all combinations
+        print("Feature combination search: {} of {} combinations already fitted".format(num_fitted, len(feature_combos)))
+        with self.worker_pool():
+            self.fit_combos(feature_combos)
+
+        return self.get_results()
+
+    def run_search(self, search, candidates, beam_width=5, max_features=None):
+        # check search strategy
+        if search not in FeatureCombinationSearch.search_strategies:
+            print("ERROR: unrecognized search strategy " + str(search) + "; expected one of: ", FeatureCombinationSearch.search_strategies)
+            return None, None
+
+        # load previous results so already fitted combinations are reused
+        self.load_fitted_results()
+        print("Feature combination search: {} search over {} features with {} worker(s)".format(search, len(candidates), self.workers))
+
+        # maximum number of features in any combination
+        candidates = list(candidates)
+        if max_features is None:
+            max_features = len(candidates)
+
+        # run search strategy, fitting every batch of combinations in same pool of worker processes
+        best_combo = None
+        with self.worker_pool():
+            if search == "exhaustive":
+                feature_combos = []
+                for r in range(1, max_features+1):
+                    feature_combos.extend(combinations(candidates, r))
+                best_combo = self.best_combo(feature_combos, self.fit_combos(feature_combos))
+            elif search == "forward":
+                best_combo = self.forward_stepwise_search(candidates, max_features)
+            elif search == "backward":
+                best_combo = self.backward_stepwise_search(candidates, max_features)
+            elif search == "beam":
+                best_combo = self.beam_search(candidates, beam_width, max_features)
+            elif search == "branch_and_bound":
+                best_combo = self.branch_and_bound_search(candidates, max_features)
+
+        print("Feature combination search: fitted {} combinations in {} search".format(self.num_fitted, search))
+
+        return best_combo, self.get_results()
+
+    def forward_stepwise_search(self, candidates, max_features):
+        # start from empty combination and add the feature that best improves score
+        selected = ()
+        selected_score = np.inf
+        while len(selected) < max_features:
+            # fit every combination with one more feature
+            feature_combos = [tuple(sorted(selected + (i,))) for i in candidates if i not in selected]
+            if len(feature_combos) == 0:
+                break
+            combo = self.best_combo(feature_combos, self.fit_combos(feature_combos))
+
+            # stop when no added feature improves score
+            if (combo is None) or (self.get_score(combo) >= selected_score):
+                break
+            selected = combo
+            selected_score = self.get_score(combo)
+            self.print_search_step("forward", selected)
+
+        return selected if len(selected) > 0 else None
+
+    def backward_stepwise_search(self, candidates, max_features):
+        # start from full combination and remove the feature that best improves score
+        selected = tuple(sorted(candidates))
+        self.fit_combos([selected])
+        selected_score = self.get_score(selected)
+        while len(selected) > 1:
+            # fit every combination with one less feature
+            feature_combos = [tuple(i for i in selected if i != j) for j in selected]
+            combo = self.best_combo(feature_combos, self.fit_combos(feature_combos))
+
+            # keep removing features while combination is larger than allowed; otherwise stop when score does not improve
+            if (combo is None) or ((len(selected) <= max_features) and (self.get_score(combo) >= selected_score)):
+                break
+            selected = combo
+            selected_score = self.get_score(combo)
+            self.print_search_step("backward", selected)
+
+        return selected if len(selected) <= max_features else None
+
+    def beam_search(self, candidates, beam_width, max_features):
+        # start from best single features
+        feature_combos = [(i,) for i in candidates]
+        results = self.fit_combos(feature_combos)
+        beam = self.rank_combos(feature_combos, results)[:beam_width]
+        best_combo = beam[0] if len(beam) > 0 else None
+
+        # grow each combination in beam by one feature at a time
+        for _ in range(1, max_features):
+            # expand beam, ignoring duplicate combinations reached from different parents
+            feature_combos = sorted(set(tuple(sorted(combo + (i,))) for combo in beam for i in candidates if i not in combo))
+            if len(feature_combos) == 0:
+                break
+            beam = self.rank_combos(feature_combos, self.fit_combos(feature_combos))[:beam_width]
+
+            # stop when larger combinations no longer improve best score
+            if (len(beam) == 0) or (self.get_score(beam[0]) >= self.get_score(best_combo)):
+                break
+            best_combo = beam[0]
+            self.print_search_step("beam", best_combo)
+
+        return best_combo
+
+    def branch_and_bound_search(self, candidates, max_features):
+        # subsets are enumerated in canonical order, so a combination only grows with candidates after its last feature;
+        # aic of any larger combination in a subtree is bounded below by its minimum number of parameters and the
+        # log-likelihood of the largest combination in the subtree (log-likelihood never decreases as features are added)
+        candidates = sorted(candidates)
+        self.best_bnb_combo = None
+        self.fit_combos([tuple(candidates)])
+        self.full_llf = self.get_llf(tuple(candidates))
+        self.params_per_feature = self.get_params_per_feature(tuple(candidates))
+        self.branch_and_bound_expand((), candidates, max_features)
+
+        return self.best_bnb_combo
+
+    def branch_and_bound_expand(self, combo, remaining, max_features):
+        # fit each child combination and the largest combination in each child's subtree in one batch
+        children = [combo + (i,) for i in remaining]
+        subtrees = [combo + tuple(remaining[j:]) for j in range(len(remaining))]
+        self.fit_combos(children + subtrees)
+
+        # update best combination
+        for child in children:
+            if self.get_score(child) < self.get_score(self.best_bnb_combo):
+                self.best_bnb_combo = child
+                self.print_search_step("branch and bound", child)
+
+        # only explore subtrees that could contain a better combination, most promising first
+        if len(combo) + 1 >= max_features:
+            return
+        order = sorted(range(len(children)), key=lambda j: self.get_score(children[j]))
+        for j in order:
+            # skip children without any larger combinations
+            if j == len(remaining) - 1:
+                continue
+            # compute lower bound on aic of larger combinations in subtree
+            bound = 2 * self.params_per_feature * (len(children[j]) + 2) - 2 * self.get_bound_llf(subtrees[j])
+            if bound < self.get_score(self.best_bnb_combo):
+                self.branch_and_bound_expand(children[j], remaining[j+1:], max_features)
+
+        return
+
+    ########################
+    ### SEARCH UTILITIES ###
+    ########################
+
+    def fit_combos(self, feature_combos):
+        # find combinations that have not been fitted yet
+        new_combos = []
+        new_keys = set()
+        for combo in feature_combos:
+            key = self.get_feature_combo_key(combo)
+            if (key not in self.fitted_results) and (key not in new_keys):
+                new_combos.append(combo)
+                new_keys.add(key)
+
+        # stream results into results table
+        if len(new_combos) > 0:
+            fo, writer = self.open_results_table()
+            try:
+                for result in self.fit_feature_combinations(new_combos):
+                    self.fitted_results[result["features"]] = result
+                    self.num_fitted += 1
+                    if writer is not None:
+                        writer.writerow(result)
+                        fo.flush()
+                    # report progress
+                    if (self.num_fitted % self.progress_interval) == 0:
+                        print("Feature combination search: fitted {} combinations".format(self.num_fitted))
+            finally:
+                if fo is not None:
+                    fo.close()
+
+        return [self.fitted_results[self.get_feature_combo_key(combo)] for combo in feature_combos]
+
+    def fit_feature_combinations(self, feature_combos):
+        # check number of workers
+        if self.workers == 1:
+            # fit models in this process
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                for combo in feature_combos:
+                    yield self.data_processing.fit_feature_combination(self.data, list(combo))
+        else:
+            # fit models across pool of worker processes, yielding results in chunks
+            with self.worker_pool():
+                for result in self.executor.map(fit_search_feature_combination, feature_combos, chunksize=self.chunksize):
+                    yield result
+
+        return
+
+    @contextmanager
+    def worker_pool(self):
+        # reuse pool of worker processes if already created (e.g., by search or caller), or if fitting in this process
+        if (self.workers == 1) or (self.executor is not None):
+            yield self.executor
+            return
+
+        # create pool once (same pool API as data processing), so data processing and dataset are sent to each worker once
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=initialize_search_worker,
+                                 initargs=(self.data_processing, self.data)) as executor:
+            self.executor = executor
+            try:
+                yield executor
+            finally:
+                self.executor = None
+
+        return
+
+    def load_fitted_results(self):
+        # load previous results once per search
+        if self.fitted_results is None:
+            previous_results = self.load_results()
+            self.fitted_results = {row["features"] : row for row in previous_results.to_dict('records')}
+            self.num_fitted = 0
+
+        return
+
+    def get_results(self):
+        return pd.DataFrame(list(self.fitted_results.values()), columns=FeatureCombinationSearch.result_columns)
+
+    def get_score(self, combo):
+        # models that did not train have infinite score
+        if combo is None:
+            return np.inf
+        result = self.fitted_results[self.get_feature_combo_key(combo)]
+        if (not result["promising"]) or np.isnan(result["aic"]):
+            return np.inf
+
+        return result["aic"]
+
+    def get_llf(self, combo):
+        result = self.fitted_results[self.get_feature_combo_key(combo)]
+        if (not result["promising"]) or np.isnan(result["llf"]):
+            return np.nan
+
+        return result["llf"]
+
+    def get_bound_llf(self, combo):
+        # use log-likelihood of combination, falling back to full model and then to zero (upper bound on any log-likelihood)
+        llf = self.get_llf(combo)
+        if np.isnan(llf):
+            llf = self.full_llf
+        if np.isnan(llf):
+            llf = 0.0
+
+        return llf
+
+    def get_params_per_feature(self, combo):
+        # multinomial model has one parameter per non-baseline class for the intercept and each feature;
+        # recover this from a fitted model since training data may not contain every class
+        result = self.fitted_results[self.get_feature_combo_key(combo)]
+        if not (np.isnan(result["aic"]) or np.isnan(result["llf"])):
+            return (result["aic"] + 2 * result["llf"]) / (2 * (len(combo) + 1))
+
+        # otherwise count classes in dataset
+        target_col = self.data_processing.col_info.get_col_name_for_action_encoded()
+        return max(self.data[target_col].nunique() - 1, 1)
+
+    def rank_combos(self, feature_combos, results):
+        # order combinations that trained by score
+        ranked = [combo for combo, result in zip(feature_combos, results) if not np.isinf(self.get_score(combo))]
+        return sorted(ranked, key=self.get_score)
+
+    def best_combo(self, feature_combos, results):
+        ranked = self.rank_combos(feature_combos, results)
+        return ranked[0] if len(ranked) > 0 else None
+
+    ################
+    ### PRINTING ###
+    ################
+
+    def print_search_step(self, search, combo):
+        print("Feature combination search: {} step selected {} features with aic {:.4f}: {}".format(
+              search, len(combo), self.get_score(combo), self.get_feature_combo_key(combo)))
+
+        return
+
+    def print_convergence_stats(self, results):
+        # results loaded from older tables may not record iterations
+        iterations = pd.to_numeric(results["iterations"], errors='coerce').dropna()
+        if iterations.shape[0] == 0:
+            return
+
+        # summarize optimizer iterations across fits
+        maxiter = self.data_processing.fit_options["maxiter"]
+        print("*** {} of {} models converged; {} warm started; mean {:.1f} iterations; {} reached maxiter={}".format(
+              int(results["converged"].astype(bool).sum()), results.shape[0], int(results["warm_started"].fillna(False).astype(bool).sum()),
+              iterations.mean(), int((iterations >= maxiter).sum()), maxiter))
+
+        return
+
+    def print_best_results(self, results, num_results=10, sort_by="aic"):
+        # rank promising models
+        promising = results[results["promising"].astype(bool)].sort_values(by=sort_by)
+
+        print("FEATURE COMBINATION SEARCH RESULTS")
+        self.print_convergence_stats(results)
+        print("*** {} of {} models promising; best {} by {}:".format(promising.shape[0], results.shape[0], min(num_results, promising.shape[0]), sort_by))
+        with pd.option_context('display.max_colwidth', None, 'display.width', None):
+            print(promising.head(num_results).to_string(index=False))
+        print()
+
+        return
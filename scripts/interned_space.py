@@ -0,0 +1,105 @@
+"""
+Interned Space Class
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+############################
+### INTERNED SPACE CLASS ###
+############################
+
+class InternedSpace:
+    """
+    Interns the names of a space (e.g., risky conditions or consequences) into integer indices so a set
+    of names can be held as an int bitmask (bit i set if name i is in the set); names outside the space
+    are interned after the space so sets containing them can still be represented and reported; lookups
+    (find_bitmask) do not intern names
+    """
+
+    def __init__(self, names=[]):
+        # initialize interned names and indices
+        self.names = []
+        self.name_idxs = {}
+
+        # initialize cache of decoded sets of names
+        self.decoded_sets = {}
+
+        # intern names of space in sorted order, so decoded sets are sorted like policy data point names
+        for name in sorted(set([str(i) for i in names])):
+            self.intern(name)
+
+        # set bitmask of all names in space
+        self.space_bitmask = (1 << len(self.names)) - 1
+
+    def __deepcopy__(self, memo):
+        # spaces are shared by all data points that use them
+        return self
+
+    #######################
+    ### GETTERS/SETTERS ###
+    #######################
+
+    def get_space_names(self):
+        return self.names[:self.space_bitmask.bit_length()]
+
+    def get_space_size(self):
+        return self.space_bitmask.bit_length()
+
+    ################
+    ### ENCODING ###
+    ################
+
+    def intern(self, name):
+        # add name if not yet interned
+        idx = self.name_idxs.get(name)
+        if idx is None:
+            idx = len(self.names)
+            self.names.append(name)
+            self.name_idxs[name] = idx
+
+        return idx
+
+    def get_bitmask(self, names):
+        # set bit of each name
+        bitmask = 0
+        for name in names:
+            bitmask |= 1 << self.intern(str(name))
+
+        return bitmask
+
+    def get_idx(self, name):
+        # index of name without interning it (None if not interned)
+        return self.name_idxs.get(name)
+
+    def find_bitmask(self, names):
+        # set bit of each name without interning names, for lookups (None if a name is not interned, so no set has it)
+        bitmask = 0
+        for name in names:
+            idx = self.name_idxs.get(str(name))
+            if idx is None:
+                return None
+            bitmask |= 1 << idx
+
+        return bitmask
+
+    def get_names(self, bitmask):
+        # get names of set bits in sorted order, decoding each set once
+        names = self.decoded_sets.get(bitmask)
+        if names is None:
+            names = tuple(sorted([name for i, name in enumerate(self.names) if (bitmask >> i) & 1]))
+            self.decoded_sets[bitmask] = names
+
+        return names
+
+    ##############
+    ### CHECKS ###
+    ##############
+
+    def check_in_space(self, bitmask):
+        return (bitmask & ~self.space_bitmask) == 0
+
+    def get_names_not_in_space(self, bitmask):
+        return self.get_names(bitmask & ~self.space_bitmask)
+
+    @staticmethod
+    def check_subset(bitmask, other_bitmask):
+        return (bitmask & ~other_bitmask) == 0
@@ -23,14 +23,26 @@ if __name__ == '__main__':
     explore_models = False
     # explore interactions flag (for exploring interactions over features of interest)
     explore_interactions = False
+    # feature search strategy for exploring models/interactions
+    # (exhaustive, forward, backward, beam, or branch_and_bound)
+    explore_search = "exhaustive"
     # build best model
     build_promising_model = True
+    # reuse previously fitted models across runs
+    use_fit_cache = True
+    # seed each fit with parameters of closest previously fitted model
+    warm_start = False
+    # dataset storage format (csv, feather, or parquet)
+    data_format = "csv"
 
     # create data class
     data = DataProcessing(robot="val_clr",
                           environment="household",
                           initialize_weighted_datasets=True,
-                          weighted=[9])
+                          weighted=[9],
+                          use_fit_cache=use_fit_cache,
+                          warm_start=warm_start,
+                          data_format=data_format)
 
     # # print summary info for whole dataset
     data.print_summary_info()
@@ -53,14 +65,14 @@ if __name__ == '__main__':
 
     # explore possible models
     if explore_models:
-        data.explore_possible_models(feature_indices=feature_idxs, explore_weights=[7,8,9])
+        data.explore_possible_models(feature_indices=feature_idxs, explore_weights=[7,8,9], search=explore_search)
 
     # explore possible interactions
     if explore_interactions:
         # limit interactions in household environment since we have more features
         limit_interactions = (data.environment_name == "household")
         data.explore_possible_models_with_interactions(df=data.weighted_dfs[9], feature_indices=feature_idxs,
-                                                       limit_interactions=limit_interactions)
+                                                       limit_interactions=limit_interactions, search=explore_search)
 
     # logistic regression analysis and final training
     if build_promising_model:
@@ -0,0 +1,177 @@
+"""
+Model Fit Cache Class
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import os, json, hashlib
+
+import numpy as np
+import pandas as pd
+
+#############################
+### MODEL FIT CACHE CLASS ###
+#############################
+
+class ModelFitCache:
+    """
+    On-disk cache of fitted models keyed by a content hash of the training data, the sorted features,
+    and the fit options, storing fitted parameters, optimizer results, and evaluation metrics with
+    least-recently-used eviction once the cache grows past its entry or size limits
+    """
+
+    cache_file_end = ".json"
+
+    def __init__(self, cache_dir, max_entries=100000, max_size_mb=512, eviction_interval=1000):
+        # set internal parameters
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.eviction_interval = eviction_interval
+
+        # number of entries stored by this cache
+        self.stores = 0
+
+        # check if path exists
+        if not os.path.exists(self.cache_dir):
+            # create directory
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        # enforce limits on existing cache
+        self.evict()
+
+    ############
+    ### KEYS ###
+    ############
+
+    @staticmethod
+    def get_dataset_hash(data):
+        # order columns so hash does not depend on feature order
+        data = data[sorted(data.columns)]
+
+        # hash column names and types along with row contents
+        dataset_hash = hashlib.sha256()
+        dataset_hash.update(json.dumps([[col, str(dtype)] for col, dtype in data.dtypes.items()]).encode())
+        dataset_hash.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+
+        return dataset_hash.hexdigest()
+
+    def get_key(self, data, feature_names, fit_options):
+        # combine dataset contents, sorted features, and fit options into one key
+        key_info = {
+            "dataset" : ModelFitCache.get_dataset_hash(data),
+            "features" : sorted(feature_names),
+            "fit_options" : fit_options
+        }
+
+        return hashlib.sha256(json.dumps(key_info, sort_keys=True).encode()).hexdigest()
+
+    def get_entry_full_path(self, key):
+        return os.path.join(self.cache_dir, key + ModelFitCache.cache_file_end)
+
+    ###############
+    ### ENTRIES ###
+    ###############
+
+    @staticmethod
+    def create_entry(logit_model, metrics):
+        # model could not be trained, so only metrics are stored
+        if logit_model is None:
+            return {"params" : None, "mle_retvals" : None, "metrics" : metrics}
+
+        # store parameters by exogenous variable name so they can be matched to any feature order
+        params = {
+            "exog_names" : list(logit_model.params.index),
+            "values" : logit_model.params.to_numpy().tolist()
+        }
+
+        # keep scalar optimizer results; arrays like the score and Hessian are recomputed from the parameters
+        mle_retvals = {}
+        for key, value in logit_model.mle_retvals.items():
+            if isinstance(value, (bool, np.bool_)):
+                mle_retvals[key] = bool(value)
+            elif isinstance(value, (int, np.integer)):
+                mle_retvals[key] = int(value)
+            elif isinstance(value, (float, np.floating)):
+                mle_retvals[key] = float(value)
+
+        return {"params" : params, "mle_retvals" : mle_retvals, "metrics" : metrics}
+
+    @staticmethod
+    def get_entry_params(entry, exog_names):
+        # get fitted parameters ordered by given exogenous variable names
+        if entry["params"] is None:
+            return None
+        params = pd.DataFrame(entry["params"]["values"], index=entry["params"]["exog_names"])
+
+        return params.reindex(index=exog_names).to_numpy()
+
+    ############################
+    ### LOAD / STORE / EVICT ###
+    ############################
+
+    def load(self, key):
+        # check for entry
+        entry_file = self.get_entry_full_path(key)
+        if not os.path.exists(entry_file):
+            return None
+
+        # read entry; treat unreadable entries as missing
+        try:
+            fo = open(entry_file)
+            entry = json.load(fo)
+            fo.close()
+        except (OSError, ValueError):
+            return None
+
+        # mark entry as recently used
+        try:
+            os.utime(entry_file)
+        except OSError:
+            pass
+
+        return entry
+
+    def store(self, key, entry):
+        # write entry to temporary file and move into place so readers never see partial entries
+        entry_file = self.get_entry_full_path(key)
+        tmp_file = "{}.{}.tmp".format(entry_file, os.getpid())
+        fo = open(tmp_file, 'w')
+        json.dump(entry, fo)
+        fo.close()
+        os.replace(tmp_file, entry_file)
+
+        # periodically enforce cache limits
+        self.stores += 1
+        if (self.stores % self.eviction_interval) == 0:
+            self.evict()
+
+        return
+
+    def evict(self):
+        # get entries with last use time and size
+        entries = []
+        total_size = 0
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(ModelFitCache.cache_file_end):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, file_name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file_name))
+            total_size += stat.st_size
+
+        # remove least recently used entries until cache is within limits
+        entries.sort()
+        num_entries = len(entries)
+        for _, size, file_name in entries:
+            if (num_entries <= self.max_entries) and (total_size <= self.max_size_bytes):
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, file_name))
+            except OSError:
+                pass
+            num_entries -= 1
+            total_size -= size
+
+        return
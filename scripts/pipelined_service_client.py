@@ -0,0 +1,76 @@
+"""
+Pipelined Service Client Class
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import rospy
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+######################################
+### PIPELINED SERVICE CLIENT CLASS ###
+######################################
+
+class PipelinedServiceClient:
+    """
+    Calls a ROS service from a thread pool, keeping up to a number of requests outstanding so the latency of a
+    remote service server is overlapped with preparing and processing other requests; responses are returned
+    in the order requests were made
+    """
+
+    def __init__(self, service_name, service_class, num_outstanding_requests):
+        # set internal parameters
+        self.service_name = service_name
+        self.service_class = service_class
+        self.num_outstanding_requests = num_outstanding_requests
+
+        # one worker thread per outstanding request, each with its own service proxy
+        self.executor = ThreadPoolExecutor(max_workers=num_outstanding_requests)
+        self.thread_data = threading.local()
+
+    #####################
+    ### SERVICE CALLS ###
+    #####################
+
+    def call(self, *args):
+        # create service proxy for this worker thread if needed
+        proxy = getattr(self.thread_data, 'proxy', None)
+        if proxy is None:
+            proxy = rospy.ServiceProxy(self.service_name, self.service_class)
+            self.thread_data.proxy = proxy
+
+        return proxy(*args)
+
+    def call_pipelined(self, items, get_request_args):
+        # request service for each item, yielding (item, response, error) in order of items
+        items = iter(items)
+        pending = deque()
+        try:
+            while True:
+                # fill pipeline with outstanding requests
+                while len(pending) < self.num_outstanding_requests:
+                    item = next(items, None)
+                    if item is None:
+                        break
+                    pending.append((item, self.executor.submit(self.call, *get_request_args(item))))
+
+                # stop once all requests are answered
+                if len(pending) == 0:
+                    return
+
+                # wait for oldest request
+                item, future = pending.popleft()
+                try:
+                    yield item, future.result(), None
+                except rospy.ServiceException as e:
+                    yield item, None, e
+        finally:
+            # requests not yet started are no longer needed if caller stops early
+            for _, future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+        return
@@ -3,39 +3,105 @@ Policy Data Point Class
 Emily Sheetz, NSTGRO VTE 2024
 """
 
+from interned_space import InternedSpace
+
 class PolicyDataPoint:
     def __init__(self, conditions=[],
                        consequences_before_action=[],
                        action="unnamed_action",
-                       consequences_after_action=[]):
+                       consequences_after_action=[],
+                       condition_space=None,
+                       consequence_space=None):
+        # set interned spaces; when both are given, sets of names are held as bitmasks
+        self.condition_space = condition_space
+        self.consequence_space = consequence_space
+        self.interned = (condition_space is not None) and (consequence_space is not None)
+
         # set internal parameters
-        self.conditions = tuple(sorted([str(i) for i in conditions]))
-        self.consequences_before_action = tuple(sorted([str(i) for i in consequences_before_action]))
+        if self.interned:
+            self.condition_bitmask = self.condition_space.get_bitmask(conditions)
+            self.consequences_before_action_bitmask = self.consequence_space.get_bitmask(consequences_before_action)
+            self.consequences_after_action_bitmask = self.consequence_space.get_bitmask(consequences_after_action)
+        else:
+            self.conditions = tuple(sorted([str(i) for i in conditions]))
+            self.consequences_before_action = tuple(sorted([str(i) for i in consequences_before_action]))
+            self.consequences_after_action = tuple(sorted([str(i) for i in consequences_after_action]))
         self.action = str(action)
-        self.consequences_after_action = tuple(sorted([str(i) for i in consequences_after_action]))
 
     #######################
     ### GETTERS/SETTERS ###
     #######################
 
+    def check_interned(self):
+        return self.interned
+
     def get_policy_data_point_condition_names(self):
+        if self.interned:
+            return self.condition_space.get_names(self.condition_bitmask)
         return self.conditions
 
     def get_policy_data_point_action_name(self):
         return self.action
 
     def get_policy_data_point_consequences_before_action_names(self):
+        if self.interned:
+            return self.consequence_space.get_names(self.consequences_before_action_bitmask)
         return self.consequences_before_action
 
     def get_policy_data_point_consequences_after_action_names(self):
+        if self.interned:
+            return self.consequence_space.get_names(self.consequences_after_action_bitmask)
         return self.consequences_after_action
 
     def get_policy_data_point_consequence_names(self):
-        return (self.consequences_before_action, self.consequences_after_action)
+        return (self.get_policy_data_point_consequences_before_action_names(),
+                self.get_policy_data_point_consequences_after_action_names())
 
     def get_policy_data_point_dictionary_key(self):
+        if self.interned:
+            return (self.condition_bitmask, self.consequences_before_action_bitmask)
         return (self.conditions, self.consequences_before_action)
 
+    def get_policy_data_point_consequences_after_action_key(self):
+        if self.interned:
+            return self.consequences_after_action_bitmask
+        return self.consequences_after_action
+
+    ########################
+    ### CHECK CONDITIONS ###
+    ########################
+
+    def check_shared_interned_spaces(self, policy_data_point): # policy_data_point : PolicyDataPoint
+        return (self.interned and policy_data_point.interned and
+                (self.condition_space is policy_data_point.condition_space) and
+                (self.consequence_space is policy_data_point.consequence_space))
+
+    def check_same_dictionary_key(self, policy_data_point): # policy_data_point : PolicyDataPoint
+        # compare bitmasks if both data points share interned spaces
+        if self.check_shared_interned_spaces(policy_data_point):
+            return self.get_policy_data_point_dictionary_key() == policy_data_point.get_policy_data_point_dictionary_key()
+
+        # otherwise, compare names
+        return ((self.get_policy_data_point_condition_names() == policy_data_point.get_policy_data_point_condition_names()) and
+                (self.get_policy_data_point_consequences_before_action_names() == policy_data_point.get_policy_data_point_consequences_before_action_names()))
+
+    def check_same_consequences_after_action(self, policy_data_point): # policy_data_point : PolicyDataPoint
+        # compare bitmasks if both data points share interned spaces
+        if self.check_shared_interned_spaces(policy_data_point):
+            return self.get_policy_data_point_consequences_after_action_key() == policy_data_point.get_policy_data_point_consequences_after_action_key()
+
+        # otherwise, compare names
+        return self.get_policy_data_point_consequences_after_action_names() == policy_data_point.get_policy_data_point_consequences_after_action_names()
+
+    def check_data_point_conditions_subset(self, policy_data_point): # policy_data_point : PolicyDataPoint
+        # compare bitmasks if both data points share interned spaces
+        if (self.interned and policy_data_point.interned and
+            (self.condition_space is policy_data_point.condition_space)):
+            return InternedSpace.check_subset(self.condition_bitmask, policy_data_point.condition_bitmask)
+
+        # otherwise, compare condition names
+        return set(self.get_policy_data_point_condition_names()).issubset(policy_data_point.get_policy_data_point_condition_names())
+
     ############################################
     ### VALIDATE AGAINST STATE/ACTION SPACES ###
     ############################################
@@ -46,6 +112,14 @@ class PolicyDataPoint:
                 self.validate_data_point_consequence_space(consequence_space_names))
 
     def validate_data_point_state_space(self, state_space_names):
+        # interned conditions are checked against interned state space
+        if self.interned:
+            if not self.condition_space.check_in_space(self.condition_bitmask):
+                cond = self.condition_space.get_names_not_in_space(self.condition_bitmask)[0]
+                print("ERROR: condition " + cond + " not in state space: ", state_space_names)
+                return False
+            return True
+
         for cond in self.conditions:
             if cond not in state_space_names:
                 print("ERROR: condition " + cond + " not in state space: ", state_space_names)
@@ -61,6 +135,16 @@ class PolicyDataPoint:
         return True
 
     def validate_data_point_consequence_space(self, consequence_space_names):
+        # interned consequences are checked against interned consequence space
+        if self.interned:
+            if not self.consequence_space.check_in_space(self.consequences_before_action_bitmask):
+                conseq = self.consequence_space.get_names_not_in_space(self.consequences_before_action_bitmask)[0]
+                print("ERROR: consequence " + conseq + " not in consequence space: ", consequence_space_names)
+                return False
+            for conseq in self.consequence_space.get_names_not_in_space(self.consequences_after_action_bitmask):
+                print("ERROR: consequence " + conseq + " not in consequence space: ", consequence_space_names)
+            return True
+
         # check before action consequences
         for conseq in self.consequences_before_action:
             if conseq not in consequence_space_names:
@@ -0,0 +1,129 @@
+"""
+Policy Journal Class
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import os, json
+
+############################
+### POLICY JOURNAL CLASS ###
+############################
+
+class PolicyJournal:
+    """
+    Append-only JSON lines journal of new policy data points; each point is appended and synced to disk
+    when it is generated, and the journal is compacted into the policy YAML file (then cleared) at shutdown,
+    so saving a point costs constant time and points generated before a crash are replayed on restart
+    """
+
+    # journal file name ending, added to policy data file name without extension
+    journal_file_end = ".journal.jsonl"
+
+    def __init__(self, journal_file_path):
+        # set internal parameters
+        self.journal_file_path = journal_file_path
+
+        # journal file is opened for appending when first point is added
+        self.fo = None
+
+    @staticmethod
+    def get_journal_file_path(policy_file_path, environment):
+        # one journal per policy data file and environment
+        return os.path.splitext(policy_file_path)[0] + "_" + environment + PolicyJournal.journal_file_end
+
+    #######################
+    ### GETTERS/SETTERS ###
+    #######################
+
+    def check_journal_nonempty(self):
+        return os.path.exists(self.journal_file_path) and (os.path.getsize(self.journal_file_path) > 0)
+
+    ##############
+    ### APPEND ###
+    ##############
+
+    def append(self, point_dict, sync=True):
+        # open journal if needed, removing partially written last line so point starts on its own line
+        if self.fo is None:
+            self.truncate_partial_line()
+            self.fo = open(self.journal_file_path, 'a')
+
+        # write point as one line
+        self.fo.write(json.dumps(point_dict, separators=(',', ':')) + "\n")
+
+        # make sure point reaches disk, unless points are synced in batches
+        if sync:
+            self.sync()
+
+        return
+
+    def truncate_partial_line(self):
+        # last line may be partially written if process stopped while appending
+        if not self.check_journal_nonempty():
+            return
+        fo = open(self.journal_file_path, 'rb+')
+        fo.seek(-1, os.SEEK_END)
+        if fo.read(1) != b"\n":
+            # keep journal up to end of last complete line
+            print("WARNING: removing partially written last line of policy journal " + self.journal_file_path)
+            fo.seek(0)
+            fo.truncate(fo.read().rfind(b"\n") + 1)
+        fo.close()
+
+        return
+
+    def sync(self):
+        # write appended points to disk
+        if self.fo is not None:
+            self.fo.flush()
+            os.fsync(self.fo.fileno())
+
+        return
+
+    ############
+    ### READ ###
+    ############
+
+    def read_entries(self):
+        # no entries if journal does not exist
+        if not os.path.exists(self.journal_file_path):
+            return []
+
+        # read one point per line
+        entries = []
+        fo = open(self.journal_file_path)
+        lines = fo.readlines()
+        fo.close()
+        for i, line in enumerate(lines):
+            # skip blank lines
+            if len(line.strip()) == 0:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # last line may be partially written if process stopped while appending
+                if i == len(lines) - 1:
+                    print("WARNING: ignoring partially written last line of policy journal " + self.journal_file_path)
+                else:
+                    print("ERROR: ignoring malformed line " + str(i + 1) + " of policy journal " + self.journal_file_path)
+
+        return entries
+
+    #############
+    ### CLEAR ###
+    #############
+
+    def clear(self):
+        # close and remove journal once its points are compacted into policy file
+        self.close()
+        if os.path.exists(self.journal_file_path):
+            os.remove(self.journal_file_path)
+
+        return
+
+    def close(self):
+        if self.fo is not None:
+            self.fo.close()
+            self.fo = None
+
+        return
@@ -0,0 +1,366 @@
+"""
+Policy Store Classes
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+from interned_space import InternedSpace
+from policy_data_point import PolicyDataPoint
+from risk_mitigating_policy_data_point import RiskMitigatingPolicyDataPoint
+
+##########################
+### POLICY STORE CLASS ###
+##########################
+
+class PolicyStore:
+    """
+    Stores policy data points in contiguous arrays: condition and consequence sets as bitmasks over
+    interned state and consequence spaces, and actions as indices into an interned action space;
+    data points are read through lightweight views that provide the policy data point getters; bitmask
+    columns hold Python ints instead once a space has more names than fit in 64 bits
+    """
+
+    # largest number of interned names that fit in a uint64 bitmask column
+    max_bitmask_names = 64
+
+    # starting number of rows allocated
+    initial_capacity = 64
+
+    def __init__(self, condition_space : InternedSpace, consequence_space : InternedSpace, action_space : InternedSpace):
+        # set interned spaces
+        self.condition_space = condition_space
+        self.consequence_space = consequence_space
+        self.action_space = action_space
+
+        # use Python int bitmask columns if spaces are too large for uint64 bitmasks
+        bitmask_dtype = np.uint64
+        if max(condition_space.get_space_size(), consequence_space.get_space_size()) > PolicyStore.max_bitmask_names:
+            bitmask_dtype = object
+
+        # initialize columns
+        self.num_points = 0
+        self.conditions = np.zeros(PolicyStore.initial_capacity, dtype=bitmask_dtype)
+        self.consequences_before_action = np.zeros(PolicyStore.initial_capacity, dtype=bitmask_dtype)
+        self.actions = np.zeros(PolicyStore.initial_capacity, dtype=np.int32)
+        self.consequences_after_action = np.zeros(PolicyStore.initial_capacity, dtype=bitmask_dtype)
+
+    ###############
+    ### COLUMNS ###
+    ###############
+
+    def get_capacity(self):
+        return self.conditions.shape[0]
+
+    def reserve(self, capacity):
+        # grow columns so appends are amortized constant time
+        if capacity <= self.get_capacity():
+            return
+        capacity = max(capacity, 2 * self.get_capacity())
+        for col in ["conditions", "consequences_before_action", "actions", "consequences_after_action"]:
+            old_col = getattr(self, col)
+            new_col = np.zeros(capacity, dtype=old_col.dtype)
+            new_col[:self.num_points] = old_col[:self.num_points]
+            setattr(self, col, new_col)
+
+        return
+
+    def check_uint64_bitmasks(self):
+        return self.conditions.dtype == np.uint64
+
+    def convert_bitmasks_to_ints(self):
+        # hold bitmasks of any size as Python ints
+        for col in ["conditions", "consequences_before_action", "consequences_after_action"]:
+            setattr(self, col, getattr(self, col).astype(object))
+
+        return
+
+    def check_shared_spaces(self, policy_data_point : PolicyDataPoint):
+        return (policy_data_point.check_interned() and
+                (policy_data_point.condition_space is self.condition_space) and
+                (policy_data_point.consequence_space is self.consequence_space))
+
+    def encode_data_point(self, policy_data_point : PolicyDataPoint):
+        # use bitmasks directly if data point shares interned spaces
+        if self.check_shared_spaces(policy_data_point):
+            conds = policy_data_point.condition_bitmask
+            conseq_bef = policy_data_point.consequences_before_action_bitmask
+            conseq_aft = policy_data_point.consequences_after_action_bitmask
+        else:
+            conds = self.condition_space.get_bitmask(policy_data_point.get_policy_data_point_condition_names())
+            conseq_bef, conseq_aft = [self.consequence_space.get_bitmask(conseqs) for conseqs in policy_data_point.get_policy_data_point_consequence_names()]
+        act = self.action_space.intern(policy_data_point.get_policy_data_point_action_name())
+
+        # names interned outside spaces may not fit in uint64 columns; keep data point by switching to Python ints
+        if self.check_uint64_bitmasks() and (max(conds, conseq_bef, conseq_aft).bit_length() > PolicyStore.max_bitmask_names):
+            print("WARNING: more than " + str(PolicyStore.max_bitmask_names) + " conditions or consequences interned; storing bitmasks as Python ints")
+            self.convert_bitmasks_to_ints()
+
+        return conds, conseq_bef, act, conseq_aft
+
+    def find_encoded_data_point(self, policy_data_point : PolicyDataPoint):
+        # encode data point for lookups without interning names (None if a name is not interned, so data point is not stored)
+        if self.check_shared_spaces(policy_data_point):
+            conds = policy_data_point.condition_bitmask
+            conseq_bef = policy_data_point.consequences_before_action_bitmask
+            conseq_aft = policy_data_point.consequences_after_action_bitmask
+        else:
+            conds = self.condition_space.find_bitmask(policy_data_point.get_policy_data_point_condition_names())
+            conseq_bef, conseq_aft = [self.consequence_space.find_bitmask(conseqs) for conseqs in policy_data_point.get_policy_data_point_consequence_names()]
+        act = self.action_space.get_idx(policy_data_point.get_policy_data_point_action_name())
+
+        # check all names are interned
+        encoded_point = (conds, conseq_bef, act, conseq_aft)
+        if None in encoded_point:
+            return None
+
+        return encoded_point
+
+    def set_row(self, row, encoded_point):
+        self.conditions[row], self.consequences_before_action[row], self.actions[row], self.consequences_after_action[row] = encoded_point
+        return
+
+    def append_row(self, encoded_point):
+        # add row at end of columns
+        self.reserve(self.num_points + 1)
+        row = self.num_points
+        self.set_row(row, encoded_point)
+        self.num_points += 1
+
+        return row
+
+    def get_row_dictionary_key(self, row):
+        return (int(self.conditions[row]), int(self.consequences_before_action[row]))
+
+    def get_row_full_key(self, row):
+        return (int(self.conditions[row]), int(self.consequences_before_action[row]),
+                int(self.actions[row]), int(self.consequences_after_action[row]))
+
+    def get_view(self, row):
+        return PolicyDataPointView(self, row)
+
+    def get_condition_bitmasks(self):
+        # set of condition bitmasks of all data points
+        return set(self.conditions[:self.num_points].tolist())
+
+    def copy_columns_from(self, policy_store):
+        # copy used rows of each column
+        self.num_points = policy_store.num_points
+        for col in ["conditions", "consequences_before_action", "actions", "consequences_after_action"]:
+            setattr(self, col, getattr(policy_store, col).copy())
+
+        return
+
+
+
+###############################
+### POLICY STORE DICT CLASS ###
+###############################
+
+class PolicyStoreDict(PolicyStore, Mapping):
+    """
+    Policy store keyed by policy data point dictionary key (conditions and consequences before action),
+    used in place of a dictionary of policy data points; a hash index maps keys to rows
+    """
+
+    def __init__(self, condition_space, consequence_space, action_space):
+        # initialize super class
+        super(PolicyStoreDict, self).__init__(condition_space, consequence_space, action_space)
+
+        # initialize hash index of dictionary keys to rows
+        self.key_index = {}
+
+    @staticmethod
+    def from_policy(policy : Mapping, condition_space, consequence_space, action_space):
+        # create store from dictionary of policy data points
+        policy_store = PolicyStoreDict(condition_space, consequence_space, action_space)
+        policy_store.reserve(len(policy))
+        for policy_data_point in policy.values():
+            policy_store.add_data_point(policy_data_point)
+
+        return policy_store
+
+    def copy(self):
+        # copy columns and index without copying data point objects
+        policy_store = PolicyStoreDict(self.condition_space, self.consequence_space, self.action_space)
+        policy_store.copy_columns_from(self)
+        policy_store.key_index = self.key_index.copy()
+
+        return policy_store
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    #######################
+    ### KEYS AND ACCESS ###
+    #######################
+
+    def normalize_key(self, key):
+        # keys of data points that are not interned hold names; look up their bitmasks without interning names
+        conds, conseq_bef = key
+        if not isinstance(conds, int):
+            conds = self.condition_space.find_bitmask(conds)
+        if not isinstance(conseq_bef, int):
+            conseq_bef = self.consequence_space.find_bitmask(conseq_bef)
+
+        # key with names that are not interned is not in store
+        if (conds is None) or (conseq_bef is None):
+            return None
+
+        return (conds, conseq_bef)
+
+    def __getitem__(self, key):
+        row = self.key_index.get(self.normalize_key(key))
+        if row is None:
+            raise KeyError(key)
+
+        return self.get_view(row)
+
+    def __contains__(self, key):
+        return self.normalize_key(key) in self.key_index
+
+    def __iter__(self):
+        return iter(self.key_index)
+
+    def __len__(self):
+        return self.num_points
+
+    def add_data_point(self, policy_data_point : PolicyDataPoint):
+        # encode data point
+        encoded_point = self.encode_data_point(policy_data_point)
+
+        # replace data point with same key, otherwise add data point
+        key = encoded_point[:2]
+        row = self.key_index.get(key)
+        if row is None:
+            self.key_index[key] = self.append_row(encoded_point)
+        else:
+            self.set_row(row, encoded_point)
+
+        return True
+
+
+
+###############################
+### POLICY STORE LIST CLASS ###
+###############################
+
+class PolicyStoreList(PolicyStore, Sequence):
+    """
+    Policy store of data points in order they were added, used in place of a list of policy data points;
+    a hash index of full keys (conditions, consequences before action, action, consequences after action)
+    finds duplicated data points in constant time
+    """
+
+    def __init__(self, condition_space, consequence_space, action_space):
+        # initialize super class
+        super(PolicyStoreList, self).__init__(condition_space, consequence_space, action_space)
+
+        # initialize hash index of full keys of stored data points
+        self.full_key_index = set()
+
+    @staticmethod
+    def from_policy(policy : Sequence, condition_space, consequence_space, action_space, remove_duplicates=False):
+        # create store from list of policy data points
+        policy_store = PolicyStoreList(condition_space, consequence_space, action_space)
+        policy_store.add_data_points(policy, remove_duplicates)
+
+        return policy_store
+
+    def copy(self):
+        # copy columns and index without copying data point objects
+        policy_store = PolicyStoreList(self.condition_space, self.consequence_space, self.action_space)
+        policy_store.copy_columns_from(self)
+        policy_store.full_key_index = self.full_key_index.copy()
+
+        return policy_store
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    ##############
+    ### ACCESS ###
+    ##############
+
+    def __getitem__(self, idx):
+        # support slices and negative indices like list
+        if isinstance(idx, slice):
+            return [self.get_view(row) for row in range(*idx.indices(self.num_points))]
+        if idx < 0:
+            idx += self.num_points
+        if (idx < 0) or (idx >= self.num_points):
+            raise IndexError("policy store index out of range")
+
+        return self.get_view(idx)
+
+    def __len__(self):
+        return self.num_points
+
+    def check_data_point_in_store(self, policy_data_point : PolicyDataPoint):
+        # check if data point with same full key is stored
+        return self.find_encoded_data_point(policy_data_point) in self.full_key_index
+
+    def add_data_point(self, policy_data_point : PolicyDataPoint, remove_duplicates=False):
+        # encode data point
+        encoded_point = self.encode_data_point(policy_data_point)
+
+        # skip data point with same full key, if requested
+        if remove_duplicates and (encoded_point in self.full_key_index):
+            return False
+
+        # add data point at end of list
+        self.append_row(encoded_point)
+        self.full_key_index.add(encoded_point)
+
+        return True
+
+    def add_data_points(self, policy_data_points, remove_duplicates=False):
+        # allocate rows for all data points at once
+        policy_data_points = list(policy_data_points)
+        self.reserve(self.num_points + len(policy_data_points))
+
+        # add data points and count data points added
+        num_added = 0
+        for policy_data_point in policy_data_points:
+            if self.add_data_point(policy_data_point, remove_duplicates):
+                num_added += 1
+
+        return num_added
+
+
+
+####################################
+### POLICY DATA POINT VIEW CLASS ###
+####################################
+
+class PolicyDataPointView(RiskMitigatingPolicyDataPoint):
+    """
+    Policy data point that reads its conditions, consequences, and action from a row of a policy store,
+    so the policy data point getters and checks work without creating data point objects per row
+    """
+
+    def __init__(self, policy_store : PolicyStore, row : int):
+        # do not initialize super class; fields are read from store
+        self.policy_store = policy_store
+        self.row = row
+        self.condition_space = policy_store.condition_space
+        self.consequence_space = policy_store.consequence_space
+        self.interned = True
+
+    @property
+    def condition_bitmask(self):
+        return int(self.policy_store.conditions[self.row])
+
+    @property
+    def consequences_before_action_bitmask(self):
+        return int(self.policy_store.consequences_before_action[self.row])
+
+    @property
+    def consequences_after_action_bitmask(self):
+        return int(self.policy_store.consequences_after_action[self.row])
+
+    @property
+    def action(self):
+        return self.policy_store.action_space.names[self.policy_store.actions[self.row]]
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Red Team Batch Data Generation
+Emily Sheetz, NSTGRO VTE 2024
+
+Generates red teamed policy data headlessly: the Val / CLR domain-specific knowledge is used in-process
+instead of through ROS services, so no ROS master is needed, there is no rate limit, and data points are
+generated in batches that are journaled to disk after each batch:
+
+    $ rosrun safety_aware_reasoning red_team_batch_data_generation.py --env household --num_points 1000
+    $ rosrun safety_aware_reasoning red_team_batch_data_generation.py --env household --counter_factual --num_points 1000
+"""
+
+import sys, time, random, argparse
+
+# import red team data extension and domain-specific knowledge
+from red_team_data_extension import RedTeamDataExtension
+from val_clr_specific_knowledge import ValCLRSpecificKnowledge
+from scenario_enumerator import ScenarioEnumerator
+
+#####################
+### MAIN FUNCTION ###
+#####################
+
+if __name__ == '__main__':
+    # get command line arguments
+    parser = argparse.ArgumentParser(description="Generate red teamed policy data in batches without ROS services")
+    parser.add_argument("--robot", default="val_clr")
+    parser.add_argument("--env", default="lunar_habitat")
+    parser.add_argument("--num_points", type=int, default=100, help="number of new data points to generate")
+    parser.add_argument("--max_conds", type=int, default=-1, help="maximum number of conditions per risky scenario (-1 for no limit)")
+    parser.add_argument("--counter_factual", action="store_true", help="generate counter-factual data points instead of risky scenario data points")
+    parser.add_argument("--batch_size", type=int, default=1000, help="number of data points attempted between journal syncs")
+    parser.add_argument("--max_attempts", type=int, default=-1, help="maximum number of data points attempted (-1 for 100 times num_points)")
+    parser.add_argument("--scenario_order", default="permutation", choices=["random"] + ScenarioEnumerator.orders,
+                        help="order of risky scenarios; enumerated orders skip scenarios already in policy")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for reproducible scenarios")
+    parser.add_argument("--interned_spaces", action="store_true")
+    parser.add_argument("--no_journal", action="store_true", help="rewrite policy data file after each batch instead of journaling data points")
+    args, _ = parser.parse_known_args()
+
+    # set random seed
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    # create domain-specific knowledge without advertising services
+    knowledge = ValCLRSpecificKnowledge(robot=args.robot, environment=args.env, advertise_services=False)
+    if not knowledge.initialized:
+        print("ERROR: could not initialize domain-specific knowledge for robot " + args.robot + " in " + args.env + " environment", file=sys.stderr)
+        sys.exit(1)
+
+    # create red team data extension using in-process knowledge
+    red_team = RedTeamDataExtension(robot=args.robot, environment=args.env,
+                                    num_points=args.num_points,
+                                    max_conds=args.max_conds,
+                                    counter_factual_mode=args.counter_factual,
+                                    auto_gen_data=True,
+                                    interned_spaces=args.interned_spaces,
+                                    journal_policy_data=not args.no_journal,
+                                    domain_knowledge=knowledge,
+                                    verbose=False,
+                                    scenario_order=args.scenario_order,
+                                    scenario_seed=args.seed)
+    red_team.initialize_red_team()
+    if not (red_team.check_initialized() and red_team.check_valid_policy()):
+        print("ERROR: could not initialize red team data extension with valid policy", file=sys.stderr)
+        sys.exit(1)
+
+    # journaled data points are synced to disk once per batch
+    red_team.red_team.set_journal_sync_each_point(False)
+
+    # attempt batches of data points until enough points are generated or all possible points exist
+    max_attempts = args.max_attempts if (args.max_attempts != -1) else 100 * args.num_points
+    num_attempts = 0
+    start = time.perf_counter()
+    while (num_attempts < max_attempts and
+           not red_team.check_points_generated() and
+           not red_team.check_possible_points_generated() and
+           red_team.check_continue_data_generation()):
+        batch_size = min(args.batch_size, max_attempts - num_attempts)
+        red_team.generate_new_data_points(batch_size)
+        num_attempts += batch_size
+        print("Generated {} of {} new {} data points ({} of {} possible) after {} attempts in {:.2f}s".format(
+            red_team.get_points_generated(), args.num_points, red_team.get_mode_name(),
+            red_team.get_total_data_points(), red_team.get_num_possible_data_points(),
+            num_attempts, time.perf_counter() - start))
+
+    # write final policy to file
+    red_team.write_policy_to_file()
+
+    # report coverage of scenario space by number of conditions
+    coverage_index = red_team.red_team.get_coverage_index()
+    if coverage_index is not None:
+        for k, coverage in coverage_index.get_coverage_by_num_conds().items():
+            if not args.counter_factual:
+                covered, possible = coverage['scenarios_covered'], coverage['scenarios_possible']
+            else:
+                covered, possible = coverage['counter_factual_covered'], coverage['counter_factual_possible']
+            print("Scenarios with {} conditions: {} of {} covered".format(k, covered, possible))
+
+    sys.exit(0)
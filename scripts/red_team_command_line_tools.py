@@ -196,7 +196,9 @@ class UserInputActionProcessing:
         # create temporary policy data point
         temp_pol_point = RiskMitigatingPolicyDataPoint(conditions=red_team_conditions,
                                                        consequences_before_action=red_team_consequences,
-                                                       action=action)
+                                                       action=action,
+                                                       condition_space=red_team.get_condition_space(),
+                                                       consequence_space=red_team.get_consequence_space())
 
         # check for duplicates already in policy
         conflict, point_act, pol_act = temp_pol_point.check_and_get_conflicting_data_point_action(red_team.policy_data)
@@ -349,7 +351,9 @@ class UserInputConsequenceProcessing:
         temp_pol_point = RiskMitigatingPolicyDataPoint(conditions=red_team_conditions,
                                                        consequences_before_action=red_team_consequences,
                                                        action=action,
-                                                       consequences_after_action=conseqs)
+                                                       consequences_after_action=conseqs,
+                                                       condition_space=red_team.get_condition_space(),
+                                                       consequence_space=red_team.get_consequence_space())
 
         # check for duplicates already in policy
         conflict, point_conseqs, pol_conseqs = temp_pol_point.check_and_get_conflicting_data_point_consequences(red_team.policy_data)
@@ -7,7 +7,9 @@ Emily Sheetz, NSTGRO VTE 2024
 import rospy
 
 import os, sys
-import random, math
+import random, math, itertools
+
+import numpy as np
 
 from yaml_formatting_checks import YAMLChecks
 
@@ -28,6 +30,13 @@ from counter_factual_policy_data_reader import CounterFactualPolicyDataReader
 # import red team
 from red_team_policy import RedTeamPolicy
 
+# import scenario enumerator
+from scenario_enumerator import ScenarioEnumerator
+from counter_factual_sampler import CounterFactualSampler
+
+# import pipelined service client
+from pipelined_service_client import PipelinedServiceClient
+
 # import command line tools
 from red_team_command_line_tools import RedTeamCommandLinePrinting as CLP
 from red_team_command_line_tools import UserInputActionProcessing as UIAction
@@ -41,7 +50,11 @@ class RedTeamDataExtension:
     def __init__(self, robot="val", environment="lunar_habitat",
                        num_points=10, max_conds=-1, counter_factual_mode=False,
                        auto_gen_data=True,
-                       rs_auto_data_gen_service_name="", cf_auto_data_gen_service_name=""):
+                       rs_auto_data_gen_service_name="", cf_auto_data_gen_service_name="",
+                       interned_spaces=False, journal_policy_data=False,
+                       domain_knowledge=None, verbose=True,
+                       scenario_order="random", scenario_seed=None,
+                       num_outstanding_requests=1):
         # set internal parameters
         self.robot_name = robot
         self.environment_name = environment
@@ -52,12 +65,35 @@ class RedTeamDataExtension:
         self.rs_auto_data_gen_service_name = rs_auto_data_gen_service_name
         self.cf_auto_data_gen_service_name = cf_auto_data_gen_service_name
 
+        # domain-specific knowledge used in-process instead of service calls (headless, no ROS master needed);
+        # data points that cannot be generated automatically are skipped instead of requesting user input
+        self.domain_knowledge = domain_knowledge
+        self.verbose = verbose
+
+        # risky scenarios are drawn at random, or enumerated in order skipping scenarios already in policy
+        self.scenario_order = scenario_order
+        self.scenario_seed = scenario_seed
+        self.uncovered_scenarios = None
+
+        # counter-factual scenarios are drawn from pairs not yet in counter-factual policy (set during initialization)
+        self.cf_sampler = None
+
+        # service requests kept outstanding at once (more than one pipelines service calls through thread pool)
+        self.num_outstanding_requests = num_outstanding_requests
+        self.rs_pipeline = None
+        self.cf_pipeline = None
+
+        # in-process knowledge with batch queries generates batches of data points at once (set during initialization)
+        self.batch_knowledge = False
+
         # write policy to file after # of new policy points generated
         self.save_new_policy_points = 10
 
         # initialize red team
         self.red_team = RedTeamPolicy(robot=self.robot_name,
-                                      environment=self.environment_name)
+                                      environment=self.environment_name,
+                                      interned_spaces=interned_spaces,
+                                      journal_policy_data=journal_policy_data)
         self.num_starting_points = None
         self.continue_data_generation = False
 
@@ -107,6 +143,15 @@ class RedTeamDataExtension:
         return total
 
     def check_possible_points_generated(self):
+        # check coverage of scenario space, if indexed
+        coverage_index = self.red_team.get_coverage_index()
+        if coverage_index is not None:
+            if not self.cf_mode:
+                return coverage_index.check_scenarios_covered()
+            else:
+                return coverage_index.check_counter_factual_pairs_covered()
+
+        # otherwise, compare number of data points to number of possible data points
         total_points = self.get_num_possible_data_points()
         if not self.cf_mode:
             return self.red_team.get_num_red_team_policy_data() >= total_points
@@ -126,6 +171,9 @@ class RedTeamDataExtension:
     def check_continue_data_generation(self):
         return self.continue_data_generation
 
+    def check_pipelined_requests(self):
+        return (self.rs_pipeline is not None) and (self.cf_pipeline is not None)
+
     def get_mode_name(self):
         if not self.cf_mode:
             return "risky scenario"
@@ -148,15 +196,98 @@ class RedTeamDataExtension:
                 self.num_starting_points = self.red_team.get_num_counter_factual_policy_data()
             self.continue_data_generation = True
 
+            # initialize enumeration of risky scenarios not yet in policy
+            if not self.cf_mode:
+                self.initialize_scenario_enumerator()
+            else:
+                self.initialize_counter_factual_sampler()
+
         # create service clients
         self.initialize_auto_data_gen_service_clients()
 
+        # check if knowledge can answer batches of queries
+        if self.continue_data_generation:
+            self.initialize_batch_knowledge()
+
+        return
+
+    def initialize_scenario_enumerator(self):
+        # random scenarios do not need enumerator
+        if self.scenario_order == "random":
+            return
+        if not ScenarioEnumerator.check_valid_order(self.scenario_order):
+            rospy.logwarn("[Red Team Data Extension] Unknown scenario order %s, generating random scenarios", self.scenario_order)
+            self.scenario_order = "random"
+            return
+
+        # enumerate scenarios over interned state space, skipping condition sets already in red teamed policy
+        condition_space = self.red_team.condition_space
+        enumerator = ScenarioEnumerator(num_conditions=condition_space.get_space_size(),
+                                        max_conds=self.max_conds_per_point,
+                                        order=self.scenario_order,
+                                        seed=self.scenario_seed)
+        if (self.scenario_order == ScenarioEnumerator.gray_code_order) and enumerator.check_max_conds_limited():
+            rospy.logwarn("[Red Team Data Extension] Gray code order walks all %d condition sets of state space, not only scenarios with at most %d conditions",
+                          (1 << condition_space.get_space_size()) - 1, self.max_conds_per_point)
+        coverage_index = self.red_team.get_coverage_index()
+        if coverage_index is not None:
+            self.uncovered_scenarios = enumerator.get_uncovered_scenarios(coverage_index.check_scenario_covered)
+        else:
+            covered_bitmasks = self.red_team.get_red_team_policy_data().get_condition_bitmasks()
+            self.uncovered_scenarios = enumerator.get_uncovered_scenarios(covered_bitmasks.__contains__)
+
+        rospy.loginfo("[Red Team Data Extension] Enumerating %d risky scenarios in %s order, skipping scenarios already in policy",
+                      enumerator.get_num_scenarios(), self.scenario_order)
+        return
+
+    def initialize_counter_factual_sampler(self):
+        # check counter factual pairs against coverage index, or against counter factual policy store if not indexed
+        coverage_index = self.red_team.get_coverage_index()
+        if coverage_index is not None:
+            check_covered = coverage_index.check_counter_factual_pair_covered
+        else:
+            cf_policy_data = self.red_team.get_counter_factual_policy_data()
+            covered_pairs = set(zip(cf_policy_data.conditions[:cf_policy_data.num_points].tolist(),
+                                    cf_policy_data.actions[:cf_policy_data.num_points].tolist()))
+            check_covered = lambda conds, action: (conds, action) in covered_pairs
+
+        # draw counter factual pairs of red teamed policy data points
+        self.cf_sampler = CounterFactualSampler(self.red_team.get_red_team_policy_data(), check_covered, seed=self.scenario_seed)
+
+        rospy.loginfo("[Red Team Data Extension] Sampling %d counter-factual scenarios not yet in counter-factual policy",
+                      self.cf_sampler.get_num_uncovered_pairs())
+        return
+
+    def initialize_batch_knowledge(self):
+        # batch queries need in-process knowledge with batch API
+        if (not self.auto_gen_data) or (self.domain_knowledge is None):
+            return
+        if not hasattr(self.domain_knowledge, "get_knowledge_based_risky_scenario_outputs"):
+            return
+
+        # bitmasks and action indices are only shared if knowledge interns same spaces as red team policy
+        if ((self.domain_knowledge.condition_space.get_space_names() != self.red_team.condition_space.get_space_names()) or
+            (self.domain_knowledge.consequence_space.get_space_names() != self.red_team.consequence_space.get_space_names()) or
+            (self.domain_knowledge.action_space.get_space_names() != self.red_team.action_space.get_space_names())):
+            rospy.logwarn("[Red Team Data Extension] Domain-specific knowledge spaces differ from red team spaces, generating one data point at a time")
+            return
+
+        # batch queries hold bitmasks in uint64 arrays
+        if not self.red_team.get_red_team_policy_data().check_uint64_bitmasks():
+            rospy.logwarn("[Red Team Data Extension] Red team policy bitmasks do not fit in 64 bits, generating one data point at a time")
+            return
+
+        self.batch_knowledge = True
+        rospy.loginfo("[Red Team Data Extension] Generating batches of data points from domain-specific knowledge!")
         return
 
     def initialize_auto_data_gen_service_clients(self):
         if not self.auto_gen_data:
             rospy.loginfo("[Red Team Data Extension] Generating data from user input, not initializing service clients")
             return
+        if self.domain_knowledge is not None:
+            rospy.loginfo("[Red Team Data Extension] Generating data from in-process domain-specific knowledge, not initializing service clients")
+            return
 
         # wait until service servers have started up and started listening for requests, then create service client
         rospy.loginfo("[Red Team Data Extension] Waiting for service server %s...", self.rs_auto_data_gen_service_name)
@@ -169,6 +300,12 @@ class RedTeamDataExtension:
         rospy.loginfo("[Red Team Data Extension] ROS service %s is ready!", self.cf_auto_data_gen_service_name)
         self.cf_auto_data_gen_client = rospy.ServiceProxy(self.cf_auto_data_gen_service_name, CounterFactualDataGeneration)
 
+        # pipeline service calls to keep multiple requests outstanding
+        if self.num_outstanding_requests > 1:
+            self.rs_pipeline = PipelinedServiceClient(self.rs_auto_data_gen_service_name, RiskyScenarioDataGeneration, self.num_outstanding_requests)
+            self.cf_pipeline = PipelinedServiceClient(self.cf_auto_data_gen_service_name, CounterFactualDataGeneration, self.num_outstanding_requests)
+            rospy.loginfo("[Red Team Data Extension] Keeping up to %d service requests outstanding", self.num_outstanding_requests)
+
         rospy.loginfo("[Red Team Data Extension] ALL SERVICES READY!")
 
         return
@@ -191,11 +328,27 @@ class RedTeamDataExtension:
         # make sure conditions are in sorted order
         scenario.sort()
 
+        return scenario, self.get_scenario_consequences(scenario)
+
+    def get_next_red_teamed_scenario(self, state_space, consequence_space):
+        # draw random scenario unless enumerating scenarios
+        if self.uncovered_scenarios is None:
+            return self.get_random_red_teamed_scenario(state_space, consequence_space)
+
+        # get next scenario not yet in policy
+        bitmask = next(self.uncovered_scenarios, None)
+        if bitmask is None:
+            return None
+
+        # decode conditions in sorted order
+        scenario = list(self.red_team.condition_space.get_names(bitmask))
+
+        return scenario, self.get_scenario_consequences(scenario)
+
+    def get_scenario_consequences(self, scenario):
         # get all corresponding consequences
         conseq_set = set()
-        for condition_name in scenario:
-            # get condition
-            condition = self.red_team.get_risky_condition_with_name(condition_name)
+        for condition in self.red_team.get_risky_conditions_with_names(scenario):
             # get consequences
             consequences = condition.get_consequence_states()
             # add each consequence to set
@@ -208,29 +361,27 @@ class RedTeamDataExtension:
         # make sure consequences are in sorted order
         scenario_consequences.sort()
 
-        return scenario, scenario_consequences
+        return scenario_consequences
 
     ###########################################
     ### COUNTER FACTUAL SCENARIO GENERATION ###
     ###########################################
 
     def get_random_counter_factual_scenario_action(self, state_space, consequence_space, action_space):
-        # get random key from red-teamed policy dictionary
-        key = random.choice(list(self.red_team.policy_data.keys()))
-
-        # get factual policy point
-        pol_point = self.red_team.policy_data[key]
+        # draw factual policy point and counter factual action not yet in counter-factual policy
+        output = self.cf_sampler.draw()
+        if output is None:
+            return None
+        row, cf_action_idx = output
+        pol_point = self.red_team.get_red_team_policy_data().get_view(row)
 
         # get conditions, consequences, and action
         conditions = pol_point.get_policy_data_point_condition_names()
         consequences, f_conseqs = pol_point.get_policy_data_point_consequence_names()
         f_action = pol_point.get_policy_data_point_action_name()
 
-        # create counter factual action space by removing factual action
-        cf_action_space = [act for act in action_space if act != f_action]
-
-        # get random counter factual action
-        cf_action = random.choice(cf_action_space)
+        # get counter factual action name
+        cf_action = self.red_team.action_space.names[cf_action_idx]
 
         return conditions, consequences, f_action, f_conseqs, cf_action
 
@@ -245,6 +396,198 @@ class RedTeamDataExtension:
             self.__generate_new_counter_factual_data_point()
         return
 
+    def generate_new_data_points(self, num_attempts):
+        # generate batch of data points at once from enumerated or sampled scenarios, if possible
+        if self.batch_knowledge and (self.cf_mode or (self.uncovered_scenarios is not None)):
+            self.__generate_knowledge_based_data_points(num_attempts)
+            self.save_policy_points()
+            return
+
+        # keep multiple service requests outstanding, if pipelining service calls
+        if self.check_pipelined_requests():
+            self.__generate_pipelined_data_points(num_attempts)
+            self.save_policy_points()
+            return
+
+        # otherwise, attempt to generate batch of data points one at a time, stopping early if done
+        for _ in range(num_attempts):
+            if (self.check_points_generated() or
+                self.check_possible_points_generated() or
+                not self.check_continue_data_generation()):
+                break
+            self.generate_new_data_point()
+
+        # save batch of data points
+        self.save_policy_points()
+
+        return
+
+    def __generate_pipelined_data_points(self, num_attempts):
+        # only attempt as many data points as still needed
+        num_attempts = min(num_attempts, self.num_red_team_points - self.get_points_generated())
+        if (num_attempts <= 0) or self.check_possible_points_generated() or not self.check_continue_data_generation():
+            return
+
+        # get state and action space
+        state_space = sorted(self.red_team.get_state_space())
+        conseq_space = sorted(self.red_team.get_consequence_state_space())
+        action_space = sorted(self.red_team.get_action_space())
+
+        # request data points for scenarios while earlier requests are outstanding; responses come back in order
+        exhausted = []
+        scenarios = self.__get_pipelined_scenarios(num_attempts, state_space, conseq_space, action_space, exhausted)
+        pipeline = self.rs_pipeline if not self.cf_mode else self.cf_pipeline
+        results = pipeline.call_pipelined(scenarios, lambda scenario: scenario)
+        for scenario, res, error in results:
+            # stop if done or user quits
+            if self.check_points_generated() or not self.check_continue_data_generation():
+                break
+
+            # check service call
+            succ = False
+            if error is not None:
+                rospy.logwarn("[Red Team Data Extension] Data point generation service call failed: %s", error)
+                rospy.loginfo("[Red Team Data Extension] Requesting input from user")
+
+            # validate response against policy and add data point, otherwise get data point from user input
+            if not self.cf_mode:
+                conditions, consequences = scenario
+                if error is None:
+                    succ = self.__auto_generate_new_risky_scenario_data_point(conditions, consequences, response=res)
+                if not succ:
+                    self.__get_risky_scenario_data_point_from_user(conditions, consequences, conseq_space, action_space)
+            else:
+                conditions, consequences, f_action, f_conseqs, cf_action = scenario
+                if error is None:
+                    succ = self.__auto_generate_new_counter_factual_data_point(conditions, consequences, f_action, f_conseqs, cf_action, response=res)
+                if not succ:
+                    self.__get_counter_factual_data_point_from_user(conditions, consequences, cf_action, conseq_space)
+        results.close()
+
+        # stop if all enumerated or sampled scenarios have been considered
+        if len(exhausted) > 0:
+            rospy.loginfo("[Red Team Data Extension] All %s scenarios have been considered", self.get_mode_name())
+            self.continue_data_generation = False
+
+        return
+
+    def __get_pipelined_scenarios(self, num_attempts, state_space, conseq_space, action_space, exhausted):
+        # get scenarios as they are requested
+        for _ in range(num_attempts):
+            if not self.cf_mode:
+                output = self.get_next_red_teamed_scenario(state_space, conseq_space)
+            else:
+                output = self.get_random_counter_factual_scenario_action(state_space, conseq_space, action_space)
+
+            # mark if no scenarios left
+            if output is None:
+                exhausted.append(True)
+                return
+            yield output
+
+    def __generate_knowledge_based_data_points(self, num_attempts):
+        # only attempt as many data points as still needed
+        num_attempts = min(num_attempts, self.num_red_team_points - self.get_points_generated())
+        if (num_attempts <= 0) or self.check_possible_points_generated() or not self.check_continue_data_generation():
+            return
+
+        if not self.cf_mode:
+            self.__generate_knowledge_based_risky_scenario_data_points(num_attempts)
+        else:
+            self.__generate_knowledge_based_counter_factual_data_points(num_attempts)
+        return
+
+    def __generate_knowledge_based_risky_scenario_data_points(self, num_attempts):
+        # get next enumerated scenarios not yet in policy
+        condition_bitmasks = list(itertools.islice(self.uncovered_scenarios, num_attempts))
+        if len(condition_bitmasks) == 0:
+            rospy.loginfo("[Red Team Data Extension] All enumerated risky scenarios have been considered")
+            self.continue_data_generation = False
+            return
+
+        # get consequences, actions, and consequences after actions for all scenarios at once
+        pre_action_conseq_bitmasks = self.domain_knowledge.get_scenario_consequence_bitmasks(condition_bitmasks)
+        output = self.domain_knowledge.get_knowledge_based_risky_scenario_outputs(condition_bitmasks)
+        # unpack
+        success, action_idxs, post_action_conseq_bitmasks = output
+
+        # add each generated data point to policy
+        for i in np.flatnonzero(success):
+            conditions = self.red_team.condition_space.get_names(condition_bitmasks[i])
+            consequences = self.red_team.consequence_space.get_names(int(pre_action_conseq_bitmasks[i]))
+            action = self.red_team.action_space.names[action_idxs[i]]
+            conseqs = self.red_team.consequence_space.get_names(int(post_action_conseq_bitmasks[i]))
+            pol_point = RiskMitigatingPolicyDataPoint(conditions=conditions,
+                                                      consequences_before_action=consequences,
+                                                      action=action,
+                                                      consequences_after_action=conseqs,
+                                                      condition_space=self.red_team.get_condition_space(),
+                                                      consequence_space=self.red_team.get_consequence_space())
+            if self.verbose:
+                CLP.print_update_policy_message(conditions, consequences, action, conseqs)
+            self.red_team.update_policy(pol_point)
+
+        # report scenarios that could not be generated
+        num_failed = len(condition_bitmasks) - int(success.sum())
+        if num_failed > 0:
+            rospy.logwarn("[Red Team Data Extension] Automatic generation of %d of %d data points failed", num_failed, len(condition_bitmasks))
+
+        return
+
+    def __generate_knowledge_based_counter_factual_data_points(self, num_attempts):
+        # draw counter factual pairs not yet in counter factual policy
+        pairs = []
+        for _ in range(num_attempts):
+            pair = self.cf_sampler.draw()
+            if pair is None:
+                break
+            pairs.append(pair)
+        if len(pairs) == 0:
+            rospy.loginfo("[Red Team Data Extension] All counter-factual scenarios have been considered")
+            self.continue_data_generation = False
+            return
+
+        # get factual policy data points from red teamed policy store columns
+        policy_data = self.red_team.get_red_team_policy_data()
+        rows = np.array([row for row, _ in pairs], dtype=np.int64)
+        cf_action_idxs = np.array([action for _, action in pairs], dtype=np.int64)
+        condition_bitmasks = policy_data.conditions[rows]
+        pre_action_conseq_bitmasks = policy_data.consequences_before_action[rows]
+
+        # get counter factual consequences for all pairs at once
+        output = self.domain_knowledge.get_knowledge_based_counter_factual_outputs(pre_action_conseq_bitmasks,
+                                                                                   policy_data.actions[rows],
+                                                                                   policy_data.consequences_after_action[rows],
+                                                                                   cf_action_idxs)
+        # unpack
+        success, cf_post_action_conseq_bitmasks = output
+
+        # create generated data points
+        pol_points = []
+        for i in np.flatnonzero(success):
+            conditions = self.red_team.condition_space.get_names(int(condition_bitmasks[i]))
+            consequences = self.red_team.consequence_space.get_names(int(pre_action_conseq_bitmasks[i]))
+            cf_action = self.red_team.action_space.names[cf_action_idxs[i]]
+            cf_conseqs = self.red_team.consequence_space.get_names(int(cf_post_action_conseq_bitmasks[i]))
+            pol_points.append(CounterFactualPolicyDataPoint(conditions=conditions,
+                                                            consequences_before_action=consequences,
+                                                            action=cf_action,
+                                                            consequences_after_action=cf_conseqs,
+                                                            condition_space=self.red_team.get_condition_space(),
+                                                            consequence_space=self.red_team.get_consequence_space()))
+            if self.verbose:
+                CLP.print_update_policy_message(conditions, consequences, cf_action, cf_conseqs)
+
+        # add data points to counter factual policy
+        self.red_team.update_counter_factual_policy_data_points(pol_points)
+
+        # report pairs that could not be generated
+        num_failed = len(pairs) - int(success.sum())
+        if num_failed > 0:
+            rospy.logwarn("[Red Team Data Extension] Automatic generation of %d of %d data points failed", num_failed, len(pairs))
+
+        return
+
     def __generate_new_risky_scenario_data_point(self):
         # get state and action space
         state_space = self.red_team.get_state_space()
@@ -254,16 +597,29 @@ class RedTeamDataExtension:
         action_space = self.red_team.get_action_space()
         action_space = sorted(action_space)
 
-        # generate random scenario
-        red_team_conditions, red_team_consequences = self.get_random_red_teamed_scenario(state_space, conseq_space)
+        # generate random or next enumerated scenario
+        output = self.get_next_red_teamed_scenario(state_space, conseq_space)
+        # stop if all enumerated scenarios have been considered
+        if output is None:
+            rospy.loginfo("[Red Team Data Extension] All enumerated risky scenarios have been considered")
+            self.continue_data_generation = False
+            return
+        # unpack
+        red_team_conditions, red_team_consequences = output
 
         # check if auto-generating data
         if self.auto_gen_data:
             succ = self.__auto_generate_new_risky_scenario_data_point(red_team_conditions, red_team_consequences)
             # check if successfully auto-generated data point; otherwise, continue with data generation
-            if succ:
+            if succ or (self.domain_knowledge is not None):
                 return
 
+        # get data point from user input
+        self.__get_risky_scenario_data_point_from_user(red_team_conditions, red_team_consequences, conseq_space, action_space)
+
+        return
+
+    def __get_risky_scenario_data_point_from_user(self, red_team_conditions, red_team_consequences, conseq_space, action_space):
         # get action from user input and resolve conflicts (if necessary)
         output = UIAction.get_action_from_user_and_resolve_conflicts(self.red_team, red_team_conditions, red_team_consequences, action_space)
         # unpack
@@ -284,7 +640,9 @@ class RedTeamDataExtension:
         pol_point = RiskMitigatingPolicyDataPoint(conditions=red_team_conditions,
                                                   consequences_before_action=red_team_consequences,
                                                   action=action,
-                                                  consequences_after_action=conseqs)
+                                                  consequences_after_action=conseqs,
+                                                  condition_space=self.red_team.get_condition_space(),
+                                                  consequence_space=self.red_team.get_consequence_space())
 
         # update policy
         CLP.print_update_policy_message(red_team_conditions, red_team_consequences, action, conseqs)
@@ -292,7 +650,7 @@ class RedTeamDataExtension:
 
         # check if policy needs to be written to file
         if (self.get_points_generated() != 0) and ((self.get_points_generated() % self.save_new_policy_points) == 0):
-            self.write_policy_to_file()
+            self.save_policy_points()
 
         return
 
@@ -307,6 +665,11 @@ class RedTeamDataExtension:
 
         # get random counter factual scenario from policy
         output = self.get_random_counter_factual_scenario_action(state_space, conseq_space, action_space)
+        # stop if all counter factual scenarios have been considered
+        if output is None:
+            rospy.loginfo("[Red Team Data Extension] All counter-factual scenarios have been considered")
+            self.continue_data_generation = False
+            return
         # unpack
         conditions, consequences, f_action, f_conseqs, cf_action = output
 
@@ -314,9 +677,15 @@ class RedTeamDataExtension:
         if self.auto_gen_data:
             succ = self.__auto_generate_new_counter_factual_data_point(conditions, consequences, f_action, f_conseqs, cf_action)
             # check if successfully auto-generated data point; otherwise, continue with data generation
-            if succ:
+            if succ or (self.domain_knowledge is not None):
                 return
 
+        # get data point from user input
+        self.__get_counter_factual_data_point_from_user(conditions, consequences, cf_action, conseq_space)
+
+        return
+
+    def __get_counter_factual_data_point_from_user(self, conditions, consequences, cf_action, conseq_space):
         # get consequences from user input
         output = UIConseq.get_counter_factual_consequences_from_user(self.red_team, conditions, consequences, cf_action, conseq_space)
         # unpack
@@ -329,7 +698,9 @@ class RedTeamDataExtension:
         pol_point = CounterFactualPolicyDataPoint(conditions=conditions,
                                                   consequences_before_action=consequences,
                                                   action=cf_action,
-                                                  consequences_after_action=cf_conseqs)
+                                                  consequences_after_action=cf_conseqs,
+                                                  condition_space=self.red_team.get_condition_space(),
+                                                  consequence_space=self.red_team.get_consequence_space())
 
         # update policy
         CLP.print_update_policy_message(conditions, consequences, cf_action, cf_conseqs)
@@ -337,23 +708,32 @@ class RedTeamDataExtension:
 
         # check if policy needs to be written to file
         if (self.get_points_generated() != 0) and ((self.get_points_generated() % self.save_new_policy_points) == 0):
-            self.write_policy_to_file()
+            self.save_policy_points()
 
         return
 
     def __auto_generate_new_risky_scenario_data_point(self, condition_names,
-                                                            pre_action_consequence_names):
+                                                            pre_action_consequence_names,
+                                                            response=None):
         # initialize result
         res = RiskyScenarioDataGenerationResponse()
 
-        # try service call
-        try:
-            res = self.rs_auto_data_gen_client(condition_names,
-                                               pre_action_consequence_names)
-        except rospy.ServiceException as e:
-            rospy.logwarn("[Red Team Data Extension] Data point generation service call failed: %s", e)
-            rospy.loginfo("[Red Team Data Extension] Requesting input from user")
-            return False
+        # use response already received (pipelined service calls), in-process knowledge if available, otherwise try service call
+        if response is not None:
+            res = response
+        elif self.domain_knowledge is not None:
+            output = self.domain_knowledge.get_knowledge_based_risky_scenario_output(condition_names,
+                                                                                     pre_action_consequence_names)
+            # unpack
+            res.success, res.action_name, res.post_action_consequence_names = output
+        else:
+            try:
+                res = self.rs_auto_data_gen_client(condition_names,
+                                                   pre_action_consequence_names)
+            except rospy.ServiceException as e:
+                rospy.logwarn("[Red Team Data Extension] Data point generation service call failed: %s", e)
+                rospy.loginfo("[Red Team Data Extension] Requesting input from user")
+                return False
 
         # got result! check success
         if not res.success:
@@ -365,7 +745,9 @@ class RedTeamDataExtension:
         pol_point = RiskMitigatingPolicyDataPoint(conditions=condition_names,
                                                   consequences_before_action=pre_action_consequence_names,
                                                   action=res.action_name,
-                                                  consequences_after_action=res.post_action_consequence_names)
+                                                  consequences_after_action=res.post_action_consequence_names,
+                                                  condition_space=self.red_team.get_condition_space(),
+                                                  consequence_space=self.red_team.get_consequence_space())
 
         # check for conflicts
         if (pol_point.check_conflicting_data_point_action(self.red_team.policy_data) or
@@ -375,13 +757,14 @@ class RedTeamDataExtension:
             return False
 
         # update policy
-        rospy.loginfo("[Red Team Data Extension] Automatically generated new %s data point!", self.get_mode_name())
-        CLP.print_update_policy_message(condition_names, pre_action_consequence_names, res.action_name, res.post_action_consequence_names)
+        if self.verbose:
+            rospy.loginfo("[Red Team Data Extension] Automatically generated new %s data point!", self.get_mode_name())
+            CLP.print_update_policy_message(condition_names, pre_action_consequence_names, res.action_name, res.post_action_consequence_names)
         self.red_team.update_policy(pol_point)
 
         # check if policy needs to be written to file
         if (self.get_points_generated() != 0) and ((self.get_points_generated() % self.save_new_policy_points) == 0):
-            self.write_policy_to_file()
+            self.save_policy_points()
 
         return True
 
@@ -389,21 +772,33 @@ class RedTeamDataExtension:
                                                              pre_action_consequence_names,
                                                              factual_action_name,
                                                              factual_post_action_consequence_names,
-                                                             counter_factual_action_name):
+                                                             counter_factual_action_name,
+                                                             response=None):
         # initialize result
         res = CounterFactualDataGenerationResponse()
 
-        # try service call
-        try:
-            res = self.cf_auto_data_gen_client(condition_names,
-                                               pre_action_consequence_names,
-                                               factual_action_name,
-                                               factual_post_action_consequence_names,
-                                               counter_factual_action_name)
-        except rospy.ServiceException as e:
-            rospy.logwarn("[Red Team Data Extension] Data point generation service call failed: %s", e)
-            rospy.loginfo("[Red Team Data Extension] Requesting input from user")
-            return False
+        # use response already received (pipelined service calls), in-process knowledge if available, otherwise try service call
+        if response is not None:
+            res = response
+        elif self.domain_knowledge is not None:
+            output = self.domain_knowledge.get_knowledge_based_counter_factual_output(condition_names,
+                                                                                      pre_action_consequence_names,
+                                                                                      factual_action_name,
+                                                                                      factual_post_action_consequence_names,
+                                                                                      counter_factual_action_name)
+            # unpack
+            res.success, _, res.post_action_consequence_names = output
+        else:
+            try:
+                res = self.cf_auto_data_gen_client(condition_names,
+                                                   pre_action_consequence_names,
+                                                   factual_action_name,
+                                                   factual_post_action_consequence_names,
+                                                   counter_factual_action_name)
+            except rospy.ServiceException as e:
+                rospy.logwarn("[Red Team Data Extension] Data point generation service call failed: %s", e)
+                rospy.loginfo("[Red Team Data Extension] Requesting input from user")
+                return False
 
         # got result! check success
         if not res.success:
@@ -415,16 +810,19 @@ class RedTeamDataExtension:
         pol_point = CounterFactualPolicyDataPoint(conditions=condition_names,
                                                   consequences_before_action=pre_action_consequence_names,
                                                   action=counter_factual_action_name,
-                                                  consequences_after_action=res.post_action_consequence_names)
+                                                  consequences_after_action=res.post_action_consequence_names,
+                                                  condition_space=self.red_team.get_condition_space(),
+                                                  consequence_space=self.red_team.get_consequence_space())
 
         # update policy
-        rospy.loginfo("[Red Team Data Extension] Automatically generated new %s data point!", self.get_mode_name())
-        CLP.print_update_policy_message(condition_names, pre_action_consequence_names, counter_factual_action_name, res.post_action_consequence_names)
+        if self.verbose:
+            rospy.loginfo("[Red Team Data Extension] Automatically generated new %s data point!", self.get_mode_name())
+            CLP.print_update_policy_message(condition_names, pre_action_consequence_names, counter_factual_action_name, res.post_action_consequence_names)
         self.red_team.update_counter_factual_policy(pol_point)
 
         # check if policy needs to be written to file
         if (self.get_points_generated() != 0) and ((self.get_points_generated() % self.save_new_policy_points) == 0):
-            self.write_policy_to_file()
+            self.save_policy_points()
 
         return True
 
@@ -432,6 +830,21 @@ class RedTeamDataExtension:
     ### SAVE POLICY TO FILE ###
     ###########################
 
+    def save_policy_points(self):
+        # journaled data points only need to be synced to disk
+        if self.red_team.check_journal_policy_data():
+            self.red_team.sync_policy_journals()
+            return
+        self.write_policy_to_file()
+        return
+
+    def shutdown_service_clients(self):
+        # stop pipelined service call threads
+        if self.check_pipelined_requests():
+            self.rs_pipeline.shutdown()
+            self.cf_pipeline.shutdown()
+        return
+
     def write_policy_to_file(self):
         print("*** Writing policy to file...")
         if not self.cf_mode:
@@ -461,6 +874,11 @@ def run_red_team_data_extension_node():
     auto_gen_data = rospy.get_param(param_prefix + 'auto_gen_data', True)
     rs_auto_data_gen_service_name = rospy.get_param(param_prefix + 'auto_data_gen_service', "")
     cf_auto_data_gen_service_name = rospy.get_param(param_prefix + 'auto_cf_data_gen_service', "")
+    interned_spaces = rospy.get_param(param_prefix + 'interned_spaces', False)
+    journal_policy_data = rospy.get_param(param_prefix + 'journal_policy_data', True)
+    scenario_order = rospy.get_param(param_prefix + 'scenario_order', "random")
+    scenario_seed = rospy.get_param(param_prefix + 'scenario_seed', -1)
+    num_outstanding_requests = rospy.get_param(param_prefix + 'num_outstanding_requests', 1)
 
     # initialize node
     rospy.init_node(node_name)
@@ -473,7 +891,12 @@ def run_red_team_data_extension_node():
                                     counter_factual_mode=cf_mode,
                                     auto_gen_data=auto_gen_data,
                                     rs_auto_data_gen_service_name=rs_auto_data_gen_service_name,
-                                    cf_auto_data_gen_service_name=cf_auto_data_gen_service_name)
+                                    cf_auto_data_gen_service_name=cf_auto_data_gen_service_name,
+                                    interned_spaces=interned_spaces,
+                                    journal_policy_data=journal_policy_data,
+                                    scenario_order=scenario_order,
+                                    scenario_seed=scenario_seed if (scenario_seed != -1) else None,
+                                    num_outstanding_requests=num_outstanding_requests)
     rospy.loginfo("[Red Team Data Extension] Initializing human-robot red team data extension node...")
     red_team.initialize_red_team()
 
@@ -498,9 +921,15 @@ def run_red_team_data_extension_node():
           not red_team.check_points_generated() and \
           not red_team.check_possible_points_generated() and \
           red_team.check_continue_data_generation():
-        rospy.loginfo("[Red Team Data Extension] Generating new red teamed %s data point...", red_team.get_mode_name())
-        print()
-        red_team.generate_new_data_point()
+        if red_team.check_pipelined_requests():
+            # keep service requests outstanding between each save of policy data points
+            rospy.loginfo("[Red Team Data Extension] Generating new red teamed %s data points...", red_team.get_mode_name())
+            print()
+            red_team.generate_new_data_points(red_team.num_outstanding_requests * red_team.save_new_policy_points)
+        else:
+            rospy.loginfo("[Red Team Data Extension] Generating new red teamed %s data point...", red_team.get_mode_name())
+            print()
+            red_team.generate_new_data_point()
         rate.sleep()
 
     # check stopping conditions
@@ -518,6 +947,7 @@ def run_red_team_data_extension_node():
 
     # write final policy to file
     red_team.write_policy_to_file()
+    red_team.shutdown_service_clients()
 
     rospy.loginfo("[Red Team Data Extension] Node stopped, all done!")
     # exit with success
@@ -7,11 +7,11 @@ Emily Sheetz, NSTGRO VTE 2024
 import rospy
 
 import os, shutil
-from copy import deepcopy
-import yaml
+from collections.abc import Mapping, Sequence
 
 from yaml_formatting_checks import YAMLChecks
 from yaml_formatting_checks import YAMLPolicyDataChecks as YAMLPolicy
+from yaml_io import YAMLFileIO
 
 # import state space, consequence space, action space, and policy data readers
 from risky_condition_reader import RiskyConditionReader
@@ -20,12 +20,26 @@ from risk_mitigating_action_reader import RiskMitigatingActionReader
 from policy_data_point import PolicyDataPoint
 from risk_mitigating_policy_data_reader import RiskMitigatingPolicyDataReader
 from counter_factual_policy_data_reader import CounterFactualPolicyDataReader
+from interned_space import InternedSpace
+from policy_store import PolicyStoreDict, PolicyStoreList
+from policy_journal import PolicyJournal
+from coverage_index import CoverageIndex
+from risk_mitigating_policy_data_point import RiskMitigatingPolicyDataPoint
+from counter_factual_policy_data_point import CounterFactualPolicyDataPoint
 
 class RedTeamPolicy:
-    def __init__(self, robot="val", environment="lunar_habitat"):
+    def __init__(self, robot="val", environment="lunar_habitat", interned_spaces=False, journal_policy_data=False):
         # set internal parameters
         self.robot_name = robot
         self.environment_name = environment
+        self.interned_spaces = interned_spaces
+        self.journal_policy_data = journal_policy_data
+        self.journal_sync_each_point = True
+
+        # initialize interned state, consequence, and action spaces (set during initialization)
+        self.condition_space = InternedSpace()
+        self.consequence_space = InternedSpace()
+        self.action_space = InternedSpace()
 
         # initialize readers
         self.state_space_reader = RiskyConditionReader(robot=self.robot_name,
@@ -47,9 +61,16 @@ class RedTeamPolicy:
         self.red_team_data_full_path = self.red_team_policy_reader.get_risk_mitigating_policy_data_file_path()
         self.counter_factual_data_full_path = self.cf_policy_reader.get_counter_factual_policy_data_file_path()
 
-        # initialize dictionary for policy data and list for counter factual policy data
-        self.policy_data = {}
-        self.cf_policy_data = []
+        # initialize journals of new policy data points (used if journaling policy data)
+        self.policy_journal = PolicyJournal(PolicyJournal.get_journal_file_path(self.red_team_data_full_path, self.environment_name))
+        self.cf_policy_journal = PolicyJournal(PolicyJournal.get_journal_file_path(self.counter_factual_data_full_path, self.environment_name))
+
+        # initialize policy store for policy data and policy store list for counter factual policy data
+        self.policy_data = PolicyStoreDict(self.condition_space, self.consequence_space, self.action_space)
+        self.cf_policy_data = PolicyStoreList(self.condition_space, self.consequence_space, self.action_space)
+
+        # initialize coverage index of scenario space (set during initialization, if state space is small enough)
+        self.coverage_index = None
 
         # initialize flags
         self.valid_policy = False
@@ -71,18 +92,47 @@ class RedTeamPolicy:
     def get_risky_condition_with_name(self, condition_name):
         return self.state_space_reader.get_risky_condition_with_name(condition_name)
 
+    def get_risky_conditions_with_names(self, condition_names):
+        return self.state_space_reader.get_risky_conditions_with_names(condition_names)
+
     def get_consequence_state_space(self):
         return self.consequence_state_space_reader.get_consequence_state_names()
 
     def get_consequence_state_with_name(self, consequence_name):
         return self.consequence_state_space_reader.get_consequence_state_with_name(consequence_name)
 
+    def get_consequence_states_with_names(self, consequence_names):
+        return self.consequence_state_space_reader.get_consequence_states_with_names(consequence_names)
+
     def get_action_space(self):
         return self.action_space_reader.get_risk_mitigating_action_names()
 
     def get_risk_mitigating_action_with_name(self, action_name):
         return self.action_space_reader.get_risk_mitigating_action_with_name(action_name)
 
+    def get_risk_mitigating_actions_with_names(self, action_names):
+        return self.action_space_reader.get_risk_mitigating_actions_with_names(action_names)
+
+    def get_condition_space(self):
+        # new policy data points only use interned spaces if requested
+        if not self.interned_spaces:
+            return None
+        return self.condition_space
+
+    def get_consequence_space(self):
+        # new policy data points only use interned spaces if requested
+        if not self.interned_spaces:
+            return None
+        return self.consequence_space
+
+    def check_journal_policy_data(self):
+        return self.journal_policy_data
+
+    def set_journal_sync_each_point(self, journal_sync_each_point):
+        # if false, journaled data points reach disk when journals are synced
+        self.journal_sync_each_point = journal_sync_each_point
+        return
+
     def get_red_team_data_file_path(self):
         return self.red_team_data_full_path
 
@@ -98,6 +148,9 @@ class RedTeamPolicy:
     def get_num_counter_factual_policy_data(self):
         return len(self.cf_policy_data)
 
+    def get_coverage_index(self):
+        return self.coverage_index
+
     ######################
     ### INITIALIZATION ###
     ######################
@@ -110,6 +163,7 @@ class RedTeamPolicy:
         self.__initialize_consequence_state_space()
         self.__initialize_state_space()
         self.__initialize_action_space()
+        self.__initialize_interned_spaces()
         self.__initialize_policies()
 
         # error check state space against consequence state space
@@ -122,12 +176,23 @@ class RedTeamPolicy:
 
         # make sure human-generated policy data is in red teamed policy
         if valid_policies:
-            # deep copy red teamed risky scenario policy data
-            self.policy_data = deepcopy(self.red_team_policy_reader.get_risk_mitigating_policy_data())
+            # store red teamed risky scenario policy data
+            self.policy_data = PolicyStoreDict.from_policy(self.red_team_policy_reader.get_risk_mitigating_policy_data(),
+                                                           self.condition_space, self.consequence_space, self.action_space)
             # make sure human-generated policy data is in red teamed policy
             self.valid_policy = self.__red_team_policy_includes_human_policy()
-            # deep copy counter factual policy data
-            self.cf_policy_data = deepcopy(self.cf_policy_reader.get_counter_factual_policy_data())
+            # store counter factual policy data, removing duplicated data points
+            cf_policy_data = self.cf_policy_reader.get_counter_factual_policy_data()
+            self.cf_policy_data = PolicyStoreList.from_policy(cf_policy_data, self.condition_space, self.consequence_space,
+                                                              self.action_space, remove_duplicates=True)
+            num_duplicates = len(cf_policy_data) - len(self.cf_policy_data)
+            if num_duplicates > 0:
+                rospy.logwarn("[Red Team] Removed %d duplicated counter-factual policy data points", num_duplicates)
+            # recover policy data points journaled but not written to file before last shutdown (even if not journaling now)
+            if self.valid_policy:
+                self.__replay_policy_journals()
+            # index which scenarios and counter factual pairs are covered
+            self.__initialize_coverage_index()
 
         return
 
@@ -136,20 +201,43 @@ class RedTeamPolicy:
     ##########################
 
     def update_policy(self, policy_data_point):
-        # create dictionary key
-        point_key = policy_data_point.get_policy_data_point_dictionary_key()
-        # add data point to policy
-        self.policy_data[point_key] = policy_data_point
+        # add data point to policy, replacing data point with same dictionary key
+        added = self.policy_data.add_data_point(policy_data_point)
+        # mark scenario as covered
+        if added and (self.coverage_index is not None):
+            conds, _, action, _ = self.policy_data.encode_data_point(policy_data_point)
+            self.coverage_index.add_scenario(conds, action)
+        # journal new data point
+        if added and self.journal_policy_data:
+            self.policy_journal.append(YAMLPolicy.format_policy_point_as_yaml_dict(policy_data_point), self.journal_sync_each_point)
         return
 
     def update_counter_factual_policy(self, policy_data_point):
-        # check for duplicated data point
-        if self.__check_policy_point_in_policy_list(policy_data_point, self.cf_policy_data):
-            # no need to add a duplicate point
-            return
-
-        # add data point to counter factual policy
-        self.cf_policy_data.append(policy_data_point)
+        # add data point to counter factual policy; no need to add a duplicate point
+        added = self.cf_policy_data.add_data_point(policy_data_point, remove_duplicates=True)
+        # mark counter factual pair as covered
+        if added and (self.coverage_index is not None):
+            conds, _, action, _ = self.cf_policy_data.encode_data_point(policy_data_point)
+            self.coverage_index.add_counter_factual_pair(conds, action)
+        # journal new data point
+        if added and self.journal_policy_data:
+            self.cf_policy_journal.append(YAMLPolicy.format_policy_point_as_yaml_dict(policy_data_point), self.journal_sync_each_point)
+        return added
+
+    def update_counter_factual_policy_data_points(self, policy_data_points):
+        # add data points to counter factual policy, skipping duplicate points
+        policy_data_points = list(policy_data_points)
+        self.cf_policy_data.reserve(len(self.cf_policy_data) + len(policy_data_points))
+        num_added = 0
+        for policy_data_point in policy_data_points:
+            if self.update_counter_factual_policy(policy_data_point):
+                num_added += 1
+        return num_added
+
+    def sync_policy_journals(self):
+        # write journaled data points to disk
+        self.policy_journal.sync()
+        self.cf_policy_journal.sync()
         return
 
     #################################
@@ -161,17 +249,17 @@ class RedTeamPolicy:
         yaml_policy_list = YAMLPolicy.format_policy_as_yaml_list(self.policy_data)
 
         # open YAML file in read mode and load dict
-        fo = open(self.red_team_data_full_path, 'r')
-        yaml_dict = yaml.load(fo, Loader=yaml.FullLoader)
-        fo.close()
+        yaml_dict = YAMLFileIO.load_file(self.red_team_data_full_path)
 
         # modify dictionary with policy data
         yaml_dict[self.environment_name]['policy_data'] = yaml_policy_list
 
         # open YAML file in write mode and dump dict
-        fo = open(self.red_team_data_full_path, 'w')
-        yaml.dump(yaml_dict, fo, default_flow_style=False, sort_keys=False)
-        fo.close()
+        YAMLFileIO.dump_file(yaml_dict, self.red_team_data_full_path)
+
+        # journaled data points are now in file
+        if self.journal_policy_data:
+            self.policy_journal.clear()
 
         return
 
@@ -187,9 +275,7 @@ class RedTeamPolicy:
             fo.close()
 
         # open YAML file in read mode and load dict
-        fo = open(self.counter_factual_data_full_path, 'r')
-        yaml_dict = yaml.load(fo, Loader=yaml.FullLoader)
-        fo.close()
+        yaml_dict = YAMLFileIO.load_file(self.counter_factual_data_full_path)
 
         # check if dict exists
         if yaml_dict is None:
@@ -208,9 +294,11 @@ class RedTeamPolicy:
         yaml_dict[self.environment_name]['policy_data'] = yaml_policy_list
 
         # open YAML file in write mode and dump dict
-        fo = open(self.counter_factual_data_full_path, 'w')
-        yaml.dump(yaml_dict, fo, default_flow_style=False, sort_keys=False)
-        fo.close()
+        YAMLFileIO.dump_file(yaml_dict, self.counter_factual_data_full_path)
+
+        # journaled data points are now in file
+        if self.journal_policy_data:
+            self.cf_policy_journal.clear()
 
         return
 
@@ -248,6 +336,24 @@ class RedTeamPolicy:
             rospy.loginfo("[Red Team] Successfully initialized action space!")
         return
 
+    def __initialize_interned_spaces(self):
+        # intern state, consequence, and action spaces for policy stores
+        self.condition_space = self.state_space_reader.get_risky_condition_space()
+        self.consequence_space = self.consequence_state_space_reader.get_consequence_state_space()
+        self.action_space = InternedSpace(self.action_space_reader.get_risk_mitigating_action_names())
+
+        # check if policy data points hold conditions and consequences as bitmasks
+        if not self.interned_spaces:
+            return
+
+        # policy data points read from files share interned spaces
+        self.policy_starter_reader.set_interned_spaces(self.condition_space, self.consequence_space)
+        self.red_team_policy_reader.set_interned_spaces(self.condition_space, self.consequence_space)
+        self.cf_policy_reader.set_interned_spaces(self.condition_space, self.consequence_space)
+
+        rospy.loginfo("[Red Team] Using interned state and consequence spaces for policy data points!")
+        return
+
     def __initialize_policies(self):
         self.__initialize_human_generated_policy()
         self.__initialize_red_team_generated_policy()
@@ -299,6 +405,67 @@ class RedTeamPolicy:
             rospy.loginfo("[Red Team] Successfully initialized counter-factual policy data points!")
         return
 
+    def __initialize_coverage_index(self):
+        # bitmaps over every scenario are only kept for small enough state spaces
+        num_conditions = self.condition_space.get_space_size()
+        if not CoverageIndex.check_bitmap_size(num_conditions):
+            rospy.logwarn("[Red Team] State space of %d risky conditions is too large for coverage index (at most %d)",
+                          num_conditions, CoverageIndex.max_bitmap_conditions)
+            return
+
+        # mark policy data points as covered
+        self.coverage_index = CoverageIndex.from_policy_stores(self.policy_data, self.cf_policy_data,
+                                                               num_conditions, self.action_space.get_space_size())
+        rospy.loginfo("[Red Team] Policy data covers %d of %d risky scenarios and %d of %d counter-factual scenarios",
+                      self.coverage_index.get_num_scenarios_covered(), self.coverage_index.get_num_possible_scenarios(),
+                      self.coverage_index.get_num_counter_factual_pairs_covered(), self.coverage_index.get_num_possible_counter_factual_pairs())
+        return
+
+    def __replay_policy_journals(self):
+        # replay red teamed policy journal, then compact it into file and clear it (even if no points were recovered)
+        if self.policy_journal.check_journal_nonempty():
+            num_replayed = self.__replay_policy_journal(self.policy_journal, self.policy_data, RiskMitigatingPolicyDataPoint)
+            rospy.logwarn("[Red Team] Recovered %d red team generated policy data points from journal '%s'",
+                          num_replayed, self.policy_journal.journal_file_path)
+            self.write_policy_to_file()
+            self.policy_journal.clear()
+
+        # replay counter factual policy journal, then compact it into file and clear it
+        if self.cf_policy_journal.check_journal_nonempty():
+            num_replayed = self.__replay_policy_journal(self.cf_policy_journal, self.cf_policy_data, CounterFactualPolicyDataPoint)
+            rospy.logwarn("[Red Team] Recovered %d counter-factual policy data points from journal '%s'",
+                          num_replayed, self.cf_policy_journal.journal_file_path)
+            self.write_counter_factual_policy_to_file()
+            self.cf_policy_journal.clear()
+
+        return
+
+    def __replay_policy_journal(self, journal, policy, data_point_class):
+        # get spaces to validate journaled data points against
+        state_space_names = self.state_space_reader.get_risky_condition_names()
+        consequence_state_space_names = self.consequence_state_space_reader.get_consequence_state_names()
+        action_space_names = self.action_space_reader.get_risk_mitigating_action_names()
+
+        # add each journaled data point to policy in order it was generated
+        num_replayed = 0
+        for entry in journal.read_entries():
+            pol_data_point = data_point_class(conditions=entry['conditions'],
+                                              consequences_before_action=entry['consequences_before_action'],
+                                              action=entry['action'],
+                                              consequences_after_action=entry['consequences_after_action'],
+                                              condition_space=self.get_condition_space(),
+                                              consequence_space=self.get_consequence_space())
+            if not pol_data_point.validate_data_point(state_space_names, action_space_names, consequence_state_space_names):
+                rospy.logerr("[Red Team] Skipping journaled policy data point not in state/action spaces")
+                continue
+            if isinstance(policy, PolicyStoreDict):
+                policy.add_data_point(pol_data_point)
+            else:
+                policy.add_data_point(pol_data_point, remove_duplicates=True)
+            num_replayed += 1
+
+        return num_replayed
+
     def __check_state_space_against_consequence_space(self):
         # get names of consequences
         consequence_state_space_names = self.consequence_state_space_reader.get_consequence_state_names()
@@ -357,7 +524,7 @@ class RedTeamPolicy:
                                                          action_space : list,
                                                          conseq_space : list):
         # check policy type
-        if type(policy) == dict:
+        if isinstance(policy, Mapping):
             # look through policy
             for conds in policy.keys():
                 # get policy data point
@@ -366,7 +533,7 @@ class RedTeamPolicy:
                 valid_data_point = self.__check_policy_point_against_state_action_spaces(policy_nickname, pol_data_point, state_space, action_space, conseq_space)
                 if not valid_data_point:
                     return False
-        elif type(policy) == list:
+        elif isinstance(policy, Sequence):
             # look through policy
             for pol_data_point in policy:
                 # check data point against state and action spaces
@@ -416,27 +583,3 @@ class RedTeamPolicy:
         # if we get here, human-generated policy included in red teamed policy
         rospy.loginfo("[Red Team] Human-generated and red team generated policies agree!")
         return True
-
-    def __check_policy_point_in_policy_list(self, pol_data_point : PolicyDataPoint,
-                                                  policy : list):
-        # look through policy
-        for pol_point in policy:
-            # compare all fields of policy points
-            if (pol_data_point.get_policy_data_point_condition_names() != pol_point.get_policy_data_point_condition_names()):
-                # condition names not equal, keep checking against points in policy
-                continue
-            elif (pol_data_point.get_policy_data_point_consequences_before_action_names() != pol_point.get_policy_data_point_consequences_before_action_names()):
-                # consequences before action not equal, keep checking against points in policy
-                continue
-            elif (pol_data_point.get_policy_data_point_action_name() != pol_point.get_policy_data_point_action_name()):
-                # actions not equal, keep checking against points in policy
-                continue
-            elif (pol_data_point.get_policy_data_point_consequences_after_action_names() != pol_point.get_policy_data_point_consequences_after_action_names()):
-                # consequences after action not equal, keep checking against points in policy
-                continue
-            else:
-                # all fields match
-                return True
-
-        # if we get here, must not be in policy
-        return False
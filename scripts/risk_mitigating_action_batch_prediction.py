@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Risk Mitigating Action Batch Prediction
+Emily Sheetz, NSTGRO VTE 2024
+
+Scores sets of conditions with a saved model, reading one set of condition names per line
+(separated by commas or whitespace) from a file or stdin, or scoring every non-empty set of
+conditions in the environment; writes the predicted action and the probability of every
+action for each set as CSV:
+
+    $ rosrun safety_aware_reasoning risk_mitigating_action_batch_prediction.py --all_combinations
+    $ echo "human_enters_workspace, object_falls" | rosrun safety_aware_reasoning risk_mitigating_action_batch_prediction.py
+"""
+
+import sys, csv, argparse
+from itertools import islice
+
+import numpy as np
+
+# import model
+from risk_mitigating_action_model import RiskMitigatingActionModel
+
+##############################################
+### RISK MITIGATING ACTION BATCH PREDICTOR ###
+##############################################
+
+class RiskMitigatingActionBatchPredictor:
+    """
+    Streams sets of conditions through a saved model in fixed-size chunks and writes the
+    predictions as CSV rows
+    """
+
+    def __init__(self, robot="val_clr", environment="lunar_habitat", model_name="cond_risk_state_conseq", chunk_size=4096):
+        # set internal parameters
+        self.chunk_size = chunk_size
+
+        # load model once
+        self.model = RiskMitigatingActionModel(robot=robot, environment=environment, model_name=model_name)
+
+    ###############
+    ### HELPERS ###
+    ###############
+
+    @staticmethod
+    def parse_condition_names(line):
+        return line.replace(',', ' ').split()
+
+    def get_header(self):
+        return ["conditions", "action", "probability"] + self.model.class_action_names
+
+    def get_bitmasks_from_lines(self, lines):
+        # convert lines to condition set bitmasks, skipping comments, blank lines, and unknown conditions
+        bitmasks = []
+        for line in lines:
+            condition_names = RiskMitigatingActionBatchPredictor.parse_condition_names(line)
+            if (len(condition_names) == 0) or line.lstrip().startswith('#'):
+                continue
+            unknown_names = self.model.get_unknown_condition_names(condition_names)
+            if len(unknown_names) > 0:
+                print("ERROR: skipping line with unrecognized conditions: ", unknown_names, file=sys.stderr)
+                continue
+            bitmasks.append(self.model.get_condition_bitmask(condition_names))
+
+        return np.array(bitmasks, dtype=np.int64)
+
+    ###############
+    ### SCORING ###
+    ###############
+
+    def write_predictions(self, writer, bitmasks):
+        # score chunks and write one row per condition set
+        for chunk, probabilities in self.model.predict_probabilities_for_bitmasks(bitmasks, self.chunk_size):
+            best_idxs = probabilities.argmax(axis=1)
+            for bitmask, best_idx, probs in zip(chunk, best_idxs, probabilities):
+                writer.writerow([" ".join(self.model.get_condition_names_from_bitmask(bitmask)),
+                                 self.model.class_action_names[best_idx],
+                                 probs[best_idx]] + probs.tolist())
+
+        return
+
+    def score_lines(self, lines, output):
+        # write header
+        writer = csv.writer(output)
+        writer.writerow(self.get_header())
+
+        # read and score input one chunk at a time
+        lines = iter(lines)
+        while True:
+            chunk_lines = list(islice(lines, self.chunk_size))
+            if len(chunk_lines) == 0:
+                break
+            self.write_predictions(writer, self.get_bitmasks_from_lines(chunk_lines))
+
+        return
+
+    def score_all_combinations(self, output):
+        # write header
+        writer = csv.writer(output)
+        writer.writerow(self.get_header())
+
+        # score every non-empty set of conditions
+        self.write_predictions(writer, self.model.get_all_condition_bitmasks())
+
+        return
+
+
+
+#####################
+### MAIN FUNCTION ###
+#####################
+
+if __name__ == '__main__':
+    # get command line arguments
+    parser = argparse.ArgumentParser(description="Score sets of conditions with a saved risk mitigating action model")
+    parser.add_argument("--robot", default="val_clr")
+    parser.add_argument("--env", default="lunar_habitat")
+    parser.add_argument("--model_name", default="cond_risk_state_conseq")
+    parser.add_argument("--input", default="-", help="file with one set of conditions per line ('-' for stdin)")
+    parser.add_argument("--output", default="-", help="CSV file for predictions ('-' for stdout)")
+    parser.add_argument("--chunk_size", type=int, default=4096)
+    parser.add_argument("--all_combinations", action="store_true", help="score every non-empty set of conditions instead of input")
+    parser.add_argument("--compile_lookup_table", action="store_true", help="write lookup table of predictions for every set of conditions instead of scoring")
+    parser.add_argument("--lookup_table_file", default=None, help="lookup table file (defaults to file next to saved model)")
+    args, _ = parser.parse_known_args()
+
+    # create batch predictor
+    predictor = RiskMitigatingActionBatchPredictor(robot=args.robot, environment=args.env,
+                                                   model_name=args.model_name, chunk_size=args.chunk_size)
+    if not predictor.model.model_loaded:
+        sys.exit(1)
+
+    # compile lookup table
+    if args.compile_lookup_table:
+        lookup_table_file = args.lookup_table_file
+        if lookup_table_file is None:
+            lookup_table_file = predictor.model.info.get_lookup_table_full_path(args.robot, args.env, args.model_name)
+        if not predictor.model.compile_lookup_table(lookup_table_file, args.chunk_size):
+            sys.exit(1)
+        print("Saved lookup table to file! Lookup table location: {}".format(lookup_table_file))
+        sys.exit(0)
+
+    # open output
+    output = sys.stdout if args.output == "-" else open(args.output, 'w', newline='')
+
+    # score conditions
+    if args.all_combinations:
+        predictor.score_all_combinations(output)
+    else:
+        input_file = sys.stdin if args.input == "-" else open(args.input)
+        predictor.score_lines(input_file, output)
+        if input_file is not sys.stdin:
+            input_file.close()
+
+    # close output
+    if output is not sys.stdout:
+        output.close()
+
+    sys.exit(0)
@@ -0,0 +1,155 @@
+"""
+Risk Mitigating Action Lookup Table Class
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import os, json, struct
+
+import numpy as np
+
+#################################################
+### RISK MITIGATING ACTION LOOKUP TABLE CLASS ###
+#################################################
+
+class RiskMitigatingActionLookupTable:
+    """
+    Memory-mapped table of a model's predictions for every set of conditions, indexed by the set's
+    condition bitmask (bit i set if condition i is present), storing the most probable action, its
+    probability, and the state risk; answers lookups without loading the model, pandas, or statsmodels
+    """
+
+    # file identifier and layout: identifier, header length, JSON header, then one array per field
+    file_magic = b"RMALUT01"
+    header_length_format = "<Q"
+    field_alignment = 8
+    field_dtypes = {
+        "action" : np.dtype("<u1"),
+        "probability" : np.dtype("<f4"),
+        "state_risk" : np.dtype("<f4")
+    }
+
+    # action index stored for the empty set of conditions
+    no_action = 255
+
+    def __init__(self, file_name):
+        # set internal parameters
+        self.file_name = file_name
+
+        # read header and map fields
+        self.loaded = self.initialize_table()
+
+    ######################
+    ### INITIALIZATION ###
+    ######################
+
+    def initialize_table(self):
+        # check file exists
+        if not os.path.exists(self.file_name):
+            print("ERROR: lookup table file " + self.file_name + " does not exist")
+            return False
+
+        # read header
+        fo = open(self.file_name, 'rb')
+        magic = fo.read(len(RiskMitigatingActionLookupTable.file_magic))
+        if magic != RiskMitigatingActionLookupTable.file_magic:
+            fo.close()
+            print("ERROR: file " + self.file_name + " is not a lookup table")
+            return False
+        (header_length,) = struct.unpack(RiskMitigatingActionLookupTable.header_length_format,
+                                         fo.read(struct.calcsize(RiskMitigatingActionLookupTable.header_length_format)))
+        header = json.loads(fo.read(header_length).decode())
+        fo.close()
+
+        # set table information from header
+        self.robot_name = header["robot"]
+        self.environment_name = header["environment"]
+        self.model_name = header["model_name"]
+        self.cond_names = header["condition_names"]
+        self.action_names = header["action_names"]
+        self.num_entries = header["num_entries"]
+        self.cond_idxs = {cond_name : i for i, cond_name in enumerate(self.cond_names)}
+
+        # map each field without reading it into memory
+        offset = RiskMitigatingActionLookupTable.get_data_offset(header_length)
+        self.fields = {}
+        for field, dtype in RiskMitigatingActionLookupTable.field_dtypes.items():
+            self.fields[field] = np.memmap(self.file_name, dtype=dtype, mode='r', offset=offset, shape=(self.num_entries,))
+            offset += RiskMitigatingActionLookupTable.get_aligned_size(self.num_entries * dtype.itemsize)
+
+        # keep direct references for lookups
+        self.actions = self.fields["action"]
+        self.probabilities = self.fields["probability"]
+        self.state_risks = self.fields["state_risk"]
+
+        return True
+
+    ###############
+    ### HELPERS ###
+    ###############
+
+    @staticmethod
+    def get_aligned_size(size):
+        alignment = RiskMitigatingActionLookupTable.field_alignment
+        return ((size + alignment - 1) // alignment) * alignment
+
+    @staticmethod
+    def get_data_offset(header_length):
+        size = len(RiskMitigatingActionLookupTable.file_magic)
+        size += struct.calcsize(RiskMitigatingActionLookupTable.header_length_format)
+        return RiskMitigatingActionLookupTable.get_aligned_size(size + header_length)
+
+    def get_condition_bitmask(self, condition_names):
+        # bit i of mask is set if condition i is present
+        bitmask = 0
+        for cond_name in condition_names:
+            if cond_name not in self.cond_idxs:
+                print("ERROR: unrecognized condition " + str(cond_name))
+                return None
+            bitmask |= 1 << self.cond_idxs[cond_name]
+
+        return bitmask
+
+    ##############
+    ### LOOKUP ###
+    ##############
+
+    def lookup(self, bitmask):
+        # get most probable action index, its probability, and state risk for set of conditions
+        return int(self.actions[bitmask]), float(self.probabilities[bitmask]), float(self.state_risks[bitmask])
+
+    def lookup_action(self, condition_names):
+        # get bitmask of conditions
+        bitmask = self.get_condition_bitmask(condition_names)
+        if (bitmask is None) or (bitmask == 0):
+            return None, None, None
+
+        # get most probable action name, its probability, and state risk
+        action_idx, probability, state_risk = self.lookup(bitmask)
+
+        return self.action_names[action_idx], probability, state_risk
+
+    #############
+    ### WRITE ###
+    #############
+
+    @staticmethod
+    def write_table(file_name, header, fields):
+        # encode header
+        header_bytes = json.dumps(header).encode()
+        data_offset = RiskMitigatingActionLookupTable.get_data_offset(len(header_bytes))
+
+        # write table to temporary file and move into place so readers never see partial tables
+        tmp_file = "{}.{}.tmp".format(file_name, os.getpid())
+        fo = open(tmp_file, 'wb')
+        fo.write(RiskMitigatingActionLookupTable.file_magic)
+        fo.write(struct.pack(RiskMitigatingActionLookupTable.header_length_format, len(header_bytes)))
+        fo.write(header_bytes)
+        fo.write(b"\0" * (data_offset - fo.tell()))
+        for field, dtype in RiskMitigatingActionLookupTable.field_dtypes.items():
+            field_bytes = np.ascontiguousarray(fields[field], dtype=dtype).tobytes()
+            fo.write(field_bytes)
+            fo.write(b"\0" * (RiskMitigatingActionLookupTable.get_aligned_size(len(field_bytes)) - len(field_bytes)))
+        fo.close()
+        os.replace(tmp_file, file_name)
+
+        return
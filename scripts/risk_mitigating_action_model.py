@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Risk Mitigating Action Model Class
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import os, pickle
+
+import numpy as np
+
+# dataset classes
+from data_processing import DatasetInfo, DataPreprocessing
+
+# lookup table of predictions
+from risk_mitigating_action_lookup_table import RiskMitigatingActionLookupTable
+
+##########################################
+### RISK MITIGATING ACTION MODEL CLASS ###
+##########################################
+
+class RiskMitigatingActionModel:
+    """
+    Loads a saved multinomial logistic regression model once and predicts risk mitigating actions
+    directly from its coefficient matrix: conditions are encoded into the dataset feature vector,
+    the model's exogenous variables are selected (or multiplied for interaction terms), and a
+    softmax over the logits gives the probability of each action
+    """
+
+    # name of intercept and separator of interaction terms in exogenous variable names
+    intercept_name = "Intercept"
+    interaction_separator = "_INT_"
+
+    # largest number of conditions for which lookup tables are compiled (2^n entries)
+    max_lookup_table_conditions = 24
+
+    def __init__(self, robot="val_clr", environment="lunar_habitat", model_name="cond_risk_state_conseq"):
+        # set internal parameters
+        self.robot_name = robot
+        self.environment_name = environment
+        self.model_name = model_name
+
+        # initialize data info and encoding of conditions into dataset features
+        self.info = DatasetInfo()
+        self.data_preprocess = DataPreprocessing(self.robot_name, self.environment_name)
+        self.col_info = self.data_preprocess.col_info
+
+        # initialize condition and consequence positions in indicator matrices
+        self.cond_idxs = self.col_info.get_condition_index_map()
+        self.conseq_idxs = self.col_info.get_consequence_index_map()
+        self.cond_names = list(self.cond_idxs.keys())
+
+        # bit position of each condition in condition set bitmasks
+        self.cond_bit_shifts = np.arange(len(self.cond_names), dtype=np.int64)
+
+        # indicator matrices reused across batches (allocated on first batch)
+        self.batch_size = 0
+
+        # load model and prepare feature encoding
+        self.model_loaded = self.initialize_model()
+        if self.model_loaded:
+            self.model_loaded = self.initialize_feature_encoding()
+
+    ######################
+    ### INITIALIZATION ###
+    ######################
+
+    def initialize_model(self):
+        # get model file
+        model_file_name = self.info.get_model_full_path(self.robot_name, self.environment_name, self.model_name)
+        if not os.path.exists(model_file_name):
+            print("ERROR: model file " + model_file_name + " does not exist")
+            return False
+
+        # load model
+        fo = open(model_file_name, 'rb')
+        logit_model = pickle.load(fo)
+        fo.close()
+
+        # get exogenous variable names in order of coefficient rows
+        self.exog_names = list(logit_model.model.exog_names)
+
+        # coefficients are given for all classes but the first; the first class has zero logit
+        params = np.asarray(logit_model.params, dtype=float)
+        self.coefficients = np.hstack([np.zeros((params.shape[0], 1)), params])
+
+        # get action name predicted by each coefficient column
+        action_names = {code : act for act, code in self.data_preprocess.action_encoding.items()}
+        ynames_map = logit_model.model._ynames_map
+        self.class_action_names = [action_names[int(float(ynames_map[j]))] for j in range(self.coefficients.shape[1])]
+
+        return True
+
+    def initialize_feature_encoding(self):
+        # get positions of dataset features; an extra column of ones follows the features
+        feature_col_names = self.col_info.get_feature_col_names()
+        feature_idxs = {col : i for i, col in enumerate(feature_col_names)}
+        ones_idx = len(feature_col_names)
+
+        # position of state risk in dataset features
+        self.state_risk_idx = feature_idxs[self.col_info.get_col_name_for_state_risk()]
+
+        # each exogenous variable is the product of two (extended) feature columns
+        self.exog_first_idxs = np.zeros(len(self.exog_names), dtype=int)
+        self.exog_second_idxs = np.zeros(len(self.exog_names), dtype=int)
+        for i, exog_name in enumerate(self.exog_names):
+            # intercept is one times one
+            if exog_name == RiskMitigatingActionModel.intercept_name:
+                factors = []
+            else:
+                factors = exog_name.split(RiskMitigatingActionModel.interaction_separator)
+
+            # check factors are dataset features
+            if (len(factors) > 2) or any(factor not in feature_idxs for factor in factors):
+                print("ERROR: cannot encode model variable " + exog_name + " from dataset features")
+                return False
+
+            # single features are multiplied by one
+            factor_idxs = [feature_idxs[factor] for factor in factors] + [ones_idx] * (2 - len(factors))
+            self.exog_first_idxs[i], self.exog_second_idxs[i] = factor_idxs
+
+            # consequences after the action are not known when the action is predicted
+            for factor in factors:
+                if self.col_info.check_col_name_for_consequence(factor, pre_action=False):
+                    print("WARNING: model variable " + exog_name + " uses consequences after action; these are encoded as absent")
+
+        return True
+
+    ################
+    ### ENCODING ###
+    ################
+
+    def encode_condition_indicators(self, condition_names, pre_action_conseq_names=[]):
+        # initialize indicator vectors
+        cond_ind = np.zeros((1, len(self.cond_idxs)), dtype=int)
+        pre_conseq_ind = np.zeros((1, len(self.conseq_idxs)), dtype=int)
+        post_conseq_ind = np.zeros((1, len(self.conseq_idxs)), dtype=int)
+
+        # set conditions present
+        for cond_name in condition_names:
+            if cond_name not in self.cond_idxs:
+                print("ERROR: unrecognized condition " + str(cond_name))
+                return None
+            cond_ind[0, self.cond_idxs[cond_name]] = 1
+
+        # set consequences present before action
+        for conseq_name in pre_action_conseq_names:
+            if conseq_name not in self.conseq_idxs:
+                print("ERROR: unrecognized consequence " + str(conseq_name))
+                return None
+            pre_conseq_ind[0, self.conseq_idxs[conseq_name]] = 1
+
+        return cond_ind, pre_conseq_ind, post_conseq_ind
+
+    def get_unknown_condition_names(self, condition_names):
+        return [cond_name for cond_name in condition_names if cond_name not in self.cond_idxs]
+
+    def get_condition_bitmask(self, condition_names):
+        # bit i of mask is set if condition i (in dataset column order) is present
+        bitmask = 0
+        for cond_name in condition_names:
+            bitmask |= 1 << self.cond_idxs[cond_name]
+
+        return bitmask
+
+    def get_condition_names_from_bitmask(self, bitmask):
+        return [cond_name for i, cond_name in enumerate(self.cond_names) if (bitmask >> i) & 1]
+
+    def get_all_condition_bitmasks(self):
+        # every non-empty set of conditions
+        return np.arange(1, 2**len(self.cond_names), dtype=np.int64)
+
+    def initialize_batch_indicators(self, batch_size):
+        # allocate indicator matrices once and reuse them for every batch of this size or smaller
+        if batch_size > self.batch_size:
+            self.batch_size = batch_size
+            self.batch_cond_ind = np.zeros((batch_size, len(self.cond_idxs)), dtype=np.int64)
+            self.batch_pre_conseq_ind = np.zeros((batch_size, len(self.conseq_idxs)), dtype=np.int64)
+            self.batch_post_conseq_ind = np.zeros((batch_size, len(self.conseq_idxs)), dtype=np.int64)
+
+        return
+
+    def encode_condition_bitmasks(self, bitmasks):
+        # fill preallocated condition indicators from bitmasks; consequences are encoded as absent
+        n = len(bitmasks)
+        self.initialize_batch_indicators(n)
+        np.bitwise_and(np.right_shift(bitmasks[:,None], self.cond_bit_shifts), 1, out=self.batch_cond_ind[:n])
+
+        return self.batch_cond_ind[:n], self.batch_pre_conseq_ind[:n], self.batch_post_conseq_ind[:n]
+
+    def encode_model_inputs(self, cond_ind, pre_conseq_ind, post_conseq_ind):
+        # compute dataset features
+        features = self.data_preprocess.compute_feature_matrix(cond_ind, pre_conseq_ind, post_conseq_ind)
+
+        return self.get_model_inputs_from_features(features)
+
+    def get_model_inputs_from_features(self, features):
+        # extend features with column of ones
+        features = np.hstack([features, np.ones((features.shape[0], 1))])
+
+        # multiply feature columns to get exogenous variables
+        return features[:, self.exog_first_idxs] * features[:, self.exog_second_idxs]
+
+    ##################
+    ### PREDICTION ###
+    ##################
+
+    @staticmethod
+    def softmax(logits):
+        # shift logits for numerical stability
+        exp_logits = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp_logits / exp_logits.sum(axis=1, keepdims=True)
+
+    def predict_probabilities(self, model_inputs):
+        return RiskMitigatingActionModel.softmax(model_inputs @ self.coefficients)
+
+    def predict_ranked_actions(self, condition_names, pre_action_conseq_names=[]):
+        # check model can be used
+        if not self.model_loaded:
+            print("ERROR: model " + self.model_name + " is not loaded")
+            return None, None
+
+        # encode conditions
+        indicators = self.encode_condition_indicators(condition_names, pre_action_conseq_names)
+        if indicators is None:
+            return None, None
+
+        # compute probability of each action
+        probabilities = self.predict_probabilities(self.encode_model_inputs(*indicators))[0]
+
+        # rank actions from most to least probable
+        ranking = np.argsort(-probabilities, kind='stable')
+        action_names = [self.class_action_names[j] for j in ranking]
+
+        return action_names, probabilities[ranking]
+
+    def predict_probabilities_for_bitmasks(self, bitmasks, chunk_size=4096):
+        # check model can be used
+        if not self.model_loaded:
+            print("ERROR: model " + self.model_name + " is not loaded")
+            return
+
+        # score condition sets in chunks, with one matrix multiply and softmax per chunk
+        bitmasks = np.asarray(bitmasks, dtype=np.int64)
+        for start in range(0, len(bitmasks), chunk_size):
+            chunk = bitmasks[start:start+chunk_size]
+            model_inputs = self.encode_model_inputs(*self.encode_condition_bitmasks(chunk))
+            yield chunk, self.predict_probabilities(model_inputs)
+
+        return
+
+    ####################
+    ### LOOKUP TABLE ###
+    ####################
+
+    def compile_lookup_table(self, file_name, chunk_size=4096):
+        # check model can be used
+        if not self.model_loaded:
+            print("ERROR: model " + self.model_name + " is not loaded")
+            return False
+
+        # check table size
+        if len(self.cond_names) > RiskMitigatingActionModel.max_lookup_table_conditions:
+            print("ERROR: cannot compile lookup table for " + str(len(self.cond_names)) + " conditions; maximum is " + str(RiskMitigatingActionModel.max_lookup_table_conditions))
+            return False
+        if len(self.class_action_names) >= RiskMitigatingActionLookupTable.no_action:
+            print("ERROR: cannot compile lookup table for " + str(len(self.class_action_names)) + " actions")
+            return False
+
+        # initialize table entries; the empty set of conditions (bitmask 0) has no action
+        num_entries = 2**len(self.cond_names)
+        actions = np.full(num_entries, RiskMitigatingActionLookupTable.no_action, dtype=np.uint8)
+        probabilities = np.zeros(num_entries, dtype=np.float32)
+        state_risks = np.zeros(num_entries, dtype=np.float32)
+
+        # evaluate model on every non-empty set of conditions in chunks
+        for start in range(1, num_entries, chunk_size):
+            chunk = np.arange(start, min(start + chunk_size, num_entries), dtype=np.int64)
+            features = self.data_preprocess.compute_feature_matrix(*self.encode_condition_bitmasks(chunk))
+            chunk_probabilities = self.predict_probabilities(self.get_model_inputs_from_features(features))
+
+            # keep most probable action
+            best_idxs = chunk_probabilities.argmax(axis=1)
+            actions[chunk] = best_idxs
+            probabilities[chunk] = chunk_probabilities[np.arange(len(chunk)), best_idxs]
+            state_risks[chunk] = features[:, self.state_risk_idx]
+
+        # write table
+        header = {
+            "robot" : self.robot_name,
+            "environment" : self.environment_name,
+            "model_name" : self.model_name,
+            "condition_names" : self.cond_names,
+            "action_names" : self.class_action_names,
+            "num_entries" : num_entries
+        }
+        fields = {"action" : actions, "probability" : probabilities, "state_risk" : state_risks}
+        RiskMitigatingActionLookupTable.write_table(file_name, header, fields)
+
+        return True
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Risk Mitigating Action Prediction Node
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import rospy
+
+import sys
+
+# import model
+from risk_mitigating_action_model import RiskMitigatingActionModel
+
+from safety_aware_reasoning.srv import RiskMitigatingActionPrediction, RiskMitigatingActionPredictionRequest, RiskMitigatingActionPredictionResponse
+
+###############################################
+### RISK MITIGATING ACTION PREDICTION CLASS ###
+###############################################
+
+class RiskMitigatingActionPredictor:
+    """
+    Serves predictions of risk mitigating actions for given conditions from a saved model
+    """
+
+    def __init__(self, robot="val_clr", environment="lunar_habitat", model_name="cond_risk_state_conseq"):
+        # set node name
+        self.node_name = "Risk Mitigating Action Prediction"
+
+        # set internal paramters
+        self.robot_name = robot
+        self.environment_name = environment
+        self.model_name = model_name
+
+        # set service name
+        self.prediction_service_name = "risk_mitigating_action_prediction"
+
+        # load model once
+        self.model = RiskMitigatingActionModel(robot=self.robot_name,
+                                               environment=self.environment_name,
+                                               model_name=self.model_name)
+        self.initialized = self.model.model_loaded
+
+        # advertise services
+        if self.initialized:
+            self.advertise_services()
+
+    ##########################
+    ### ADVERTISE SERVICES ###
+    ##########################
+
+    def advertise_services(self):
+        self.prediction_service = rospy.Service(self.prediction_service_name,
+                                                RiskMitigatingActionPrediction,
+                                                self.prediction_callback)
+
+        rospy.loginfo("[%s] Providing service for risk mitigating action prediction!", self.node_name)
+
+        return
+
+    #########################
+    ### SERVICE CALLBACKS ###
+    #########################
+
+    def prediction_callback(self, req : RiskMitigatingActionPredictionRequest) -> RiskMitigatingActionPredictionResponse:
+        # initialize response
+        res = RiskMitigatingActionPredictionResponse()
+
+        # attempt to predict actions for given scenario
+        action_names, probabilities = self.model.predict_ranked_actions(req.condition_names,
+                                                                         req.pre_action_consequence_names)
+
+        # set response
+        if action_names is not None:
+            res.success = True
+            res.action_names = action_names
+            res.probabilities = probabilities.tolist()
+        else:
+            rospy.logwarn("[%s] Could not predict actions for conditions: %s", self.node_name, str(req.condition_names))
+            res.success = False
+            res.action_names = []
+            res.probabilities = []
+
+        # return result
+        return res
+
+
+
+#####################
+### MAIN FUNCTION ###
+#####################
+
+if __name__ == '__main__':
+    # set node name
+    node_name = "RiskMitigatingActionPredictionNode"
+    param_prefix = "/" + node_name + "/"
+
+    # get ROS parameters
+    robot_name = rospy.get_param(param_prefix + 'robot', "val_clr")
+    env_name = rospy.get_param(param_prefix + 'environment', "lunar_habitat")
+    model_name = rospy.get_param(param_prefix + 'model_name', "cond_risk_state_conseq")
+
+    # initialize node
+    rospy.init_node(node_name)
+
+    # create server node
+    server_node = RiskMitigatingActionPredictor(robot=robot_name, environment=env_name, model_name=model_name)
+
+    if not server_node.initialized:
+        rospy.logerr("[%s] Could not initialize risk mitigating action prediction node", server_node.node_name)
+        # exit with error
+        sys.exit(1)
+    else:
+        rospy.loginfo("[%s] Successfully initialized risk mitigating action prediction node with model %s for robot %s in %s environment!",
+                      server_node.node_name, server_node.model_name,
+                      server_node.robot_name.upper(), server_node.environment_name.upper())
+
+    # run node, wait for requests
+    while not rospy.is_shutdown():
+        rospy.spin()
+
+    rospy.loginfo("[%s] Node stopped, all done!", server_node.node_name)
+    # exit with success
+    sys.exit(0)
@@ -9,9 +9,9 @@ Emily Sheetz, NSTGRO VTE 2024
 import rospy
 
 import os
-import yaml
 
 from yaml_formatting_checks import YAMLActionSpaceChecks as YAMLChecks
+from yaml_io import YAMLConfigCache
 
 from risk_mitigating_action import RiskMitigatingAction
 
@@ -31,6 +31,11 @@ class RiskMitigatingActionReader:
         # initialize list of risk mitigating actions
         self.risk_mitigating_actions = []
 
+        # initialize risk mitigating action names and indices of names to actions and to integer ids (position in list)
+        self.risk_mitigating_action_names = []
+        self.risk_mitigating_actions_by_name = {}
+        self.risk_mitigating_action_idxs = {}
+
         # initialize flag for valid actions
         self.valid_actions = False
 
@@ -51,16 +56,19 @@ class RiskMitigatingActionReader:
         return self.risk_mitigating_actions
 
     def get_risk_mitigating_action_names(self):
-        return [act.get_action_name() for act in self.risk_mitigating_actions]
+        return list(self.risk_mitigating_action_names)
 
     def get_risk_mitigating_action_with_name(self, action_name):
-        # look through actions
-        for act in self.risk_mitigating_actions:
-            # check name
-            if act.get_action_name() == action_name:
-                return act
-        # if we get here, no action in list has given name
-        return None
+        return self.risk_mitigating_actions_by_name.get(action_name)
+
+    def get_risk_mitigating_actions_with_names(self, action_names):
+        return [self.risk_mitigating_actions_by_name.get(name) for name in action_names]
+
+    def get_risk_mitigating_action_id(self, action_name):
+        return self.risk_mitigating_action_idxs.get(action_name)
+
+    def get_risk_mitigating_action_ids(self, action_names):
+        return [self.risk_mitigating_action_idxs.get(name) for name in action_names]
 
     def get_num_risk_mitigating_actions(self):
         return len(self.risk_mitigating_actions)
@@ -70,8 +78,11 @@ class RiskMitigatingActionReader:
     #######################################
 
     def process_risk_mitigating_actions(self):
-        # clear out risk mitigating actions list
+        # clear out risk mitigating actions list and indices
         self.risk_mitigating_actions = []
+        self.risk_mitigating_action_names = []
+        self.risk_mitigating_actions_by_name = {}
+        self.risk_mitigating_action_idxs = {}
 
         # verify YAML file exists
         valid_path = YAMLChecks.check_yaml_existence(self.risk_mitigating_action_full_path)
@@ -80,9 +91,8 @@ class RiskMitigatingActionReader:
             self.valid_actions = False
             return
 
-        # open YAML file and load dict
-        fo = open(self.risk_mitigating_action_full_path)
-        yaml_dict = yaml.load(fo, Loader=yaml.FullLoader)
+        # load dict from YAML file, parsing file only if not already cached
+        yaml_dict = YAMLConfigCache.load(self.risk_mitigating_action_full_path)
 
         # error check YAML file formatting
         valid_yaml = YAMLChecks.check_risk_mitigating_action_yaml_formatting(yaml_dict, self.environment_name)
@@ -112,8 +122,11 @@ class RiskMitigatingActionReader:
             # add risk mitigating action to list
             self.risk_mitigating_actions.append(risk_act)
 
-        # close file
-        fo.close()
+            # index risk mitigating action by name and id, keeping first risk mitigating action with each name
+            name = risk_act.get_action_name()
+            self.risk_mitigating_action_names.append(name)
+            self.risk_mitigating_actions_by_name.setdefault(name, risk_act)
+            self.risk_mitigating_action_idxs.setdefault(name, len(self.risk_mitigating_actions) - 1)
 
         return
 
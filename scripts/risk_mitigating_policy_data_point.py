@@ -3,18 +3,24 @@ Risk Mitigating Policy Data Point Class
 Emily Sheetz, NSTGRO VTE 2024
 """
 
+from collections.abc import Mapping
+
 from policy_data_point import PolicyDataPoint
 
 class RiskMitigatingPolicyDataPoint(PolicyDataPoint):
     def __init__(self, conditions=[],
                        consequences_before_action=[],
                        action="unnamed_action",
-                       consequences_after_action=[]):
+                       consequences_after_action=[],
+                       condition_space=None,
+                       consequence_space=None):
         # initialize super class
         super(RiskMitigatingPolicyDataPoint, self).__init__(conditions,
                                                             consequences_before_action,
                                                             action,
-                                                            consequences_after_action)
+                                                            consequences_after_action,
+                                                            condition_space,
+                                                            consequence_space)
 
     ################################################################
     ### CHECK DUPLICATED CONDITIONS / CONSEQUENCES BEFORE ACTION ###
@@ -22,12 +28,12 @@ class RiskMitigatingPolicyDataPoint(PolicyDataPoint):
 
     def check_data_point_duplicated(self, policy):
         # check policy type
-        if type(policy) == dict:
+        if isinstance(policy, Mapping):
             return self.__check_data_point_in_policy(policy)
-        elif type(policy) == RiskMitigatingPolicyDataPoint:
+        elif isinstance(policy, RiskMitigatingPolicyDataPoint):
             return self.__check_data_point_conditions(policy)
         else:
-            print("WARN: unrecognized policy type: " + type(policy) + " ; assuming no duplicated conditions")
+            print("WARN: unrecognized policy type: " + str(type(policy)) + " ; assuming no duplicated conditions")
             return False
 
     #################################
@@ -36,22 +42,22 @@ class RiskMitigatingPolicyDataPoint(PolicyDataPoint):
 
     def check_and_get_conflicting_data_point_action(self, policy):
         # check policy type
-        if type(policy) == dict:
+        if isinstance(policy, Mapping):
             return self.__check_and_get_conflicting_data_point_action_policy(policy)
-        elif type(policy) == RiskMitigatingPolicyDataPoint:
+        elif isinstance(policy, RiskMitigatingPolicyDataPoint):
             return self.__check_and_get_conflicting_data_point_action(policy)
         else:
-            print("WARN: unrecognized policy type: " + type(policy) + " ; assuming no conflicting actions to get")
+            print("WARN: unrecognized policy type: " + str(type(policy)) + " ; assuming no conflicting actions to get")
             return False, None, None
 
     def check_conflicting_data_point_action(self, policy):
         # check policy type
-        if type(policy) == dict:
+        if isinstance(policy, Mapping):
             return self.__check_conflicting_data_point_action_policy(policy)
-        elif type(policy) == RiskMitigatingPolicyDataPoint:
+        elif isinstance(policy, RiskMitigatingPolicyDataPoint):
             return self.__check_conflicting_data_point_action(policy)
         else:
-            print("WARN: unrecognized policy type: " + type(policy) + " ; assuming no conflicting actions")
+            print("WARN: unrecognized policy type: " + str(type(policy)) + " ; assuming no conflicting actions")
             return False
 
     ###################################################
@@ -60,22 +66,22 @@ class RiskMitigatingPolicyDataPoint(PolicyDataPoint):
 
     def check_and_get_conflicting_data_point_consequences(self, policy):
         # check policy type
-        if type(policy) == dict:
+        if isinstance(policy, Mapping):
             return self.__check_and_get_conflicting_data_point_consequences_policy(policy)
-        elif type(policy) == RiskMitigatingPolicyDataPoint:
+        elif isinstance(policy, RiskMitigatingPolicyDataPoint):
             return self.__check_and_get_conflicting_data_point_consequences(policy)
         else:
-            print("WARN: unrecognized policy type: " + type(policy) + " ; assuming no conflicting consequences to get")
+            print("WARN: unrecognized policy type: " + str(type(policy)) + " ; assuming no conflicting consequences to get")
             return False, None, None
 
     def check_conflicting_data_point_consequences(self, policy):
         # check policy type
-        if type(policy) == dict:
+        if isinstance(policy, Mapping):
             return self.__check_conflicting_data_point_consequences_policy(policy)
-        elif type(policy) == RiskMitigatingPolicyDataPoint:
+        elif isinstance(policy, RiskMitigatingPolicyDataPoint):
             return self.__check_conflicting_data_point_consequences(policy)
         else:
-            print("WARN: unrecognized policy type: " + type(policy) + " ; assuming no conflicting consequences")
+            print("WARN: unrecognized policy type: " + str(type(policy)) + " ; assuming no conflicting consequences")
             return False
 
     ##########################################################
@@ -88,7 +94,7 @@ class RiskMitigatingPolicyDataPoint(PolicyDataPoint):
 
     def __check_data_point_conditions(self, policy_data_point): # policy_data_point : RiskMitigatingPolicyDataPoint
         # check if conditions are the same
-        return self.get_policy_data_point_dictionary_key() == policy_data_point.get_policy_data_point_dictionary_key()
+        return self.check_same_dictionary_key(policy_data_point)
 
     ########################################################
     ### PRIVATE HELPERS FOR CHECKING CONFLICTING ACTIONS ###
@@ -145,7 +151,7 @@ class RiskMitigatingPolicyDataPoint(PolicyDataPoint):
         if conflict:
             # return conflicting consequences
             return (conflict,
-                    self.consequences_after_action,
+                    self.get_policy_data_point_consequences_after_action_names(),
                     policy[self.get_policy_data_point_dictionary_key()].get_policy_data_point_consequences_after_action_names())
         else:
             # no conflicting consequences
@@ -154,13 +160,13 @@ class RiskMitigatingPolicyDataPoint(PolicyDataPoint):
     def __check_and_get_conflicting_data_point_consequences(self, policy_data_point): # policy_data_point : RiskMitigatingPolicyDataPoint
         # check if data point has same key but different consequences from given data point
         conflict = (self.__check_data_point_conditions(policy_data_point) and
-                    (self.consequences_after_action != policy_data_point.get_policy_data_point_consequences_after_action_names()))
+                    (not self.check_same_consequences_after_action(policy_data_point)))
 
         # check conflict and return consequences accordingly
         if conflict:
             # return conflicting consequences
             return (conflict,
-                    self.consequences_after_action,
+                    self.get_policy_data_point_consequences_after_action_names(),
                     policy_data_point.get_policy_data_point_consequences_after_action_names())
         else:
             # no conflicting consequences
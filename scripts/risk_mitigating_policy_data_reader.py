@@ -9,18 +9,21 @@ Emily Sheetz, NSTGRO VTE 2024
 import rospy
 
 import os
-import yaml
 
 from yaml_formatting_checks import YAMLPolicyDataChecks as YAMLChecks
+from yaml_io import YAMLConfigCache
 
 from risk_mitigating_policy_data_point import RiskMitigatingPolicyDataPoint
 
 class RiskMitigatingPolicyDataReader:
-    def __init__(self, robot="val", environment="lunar_habitat", human_gen_data=True):
+    def __init__(self, robot="val", environment="lunar_habitat", human_gen_data=True, condition_space=None, consequence_space=None):
         # set internal parameters
         self.robot_name = robot
         self.environment_name = environment
 
+        # set interned spaces for compact policy data points (optional)
+        self.set_interned_spaces(condition_space, consequence_space)
+
         # get path of this script
         script_path = os.path.abspath(os.path.dirname( __file__ ))
 
@@ -59,6 +62,10 @@ class RiskMitigatingPolicyDataReader:
     def get_num_risk_mitigating_policy_data(self):
         return len(self.risk_mitigating_policy.keys())
 
+    def set_interned_spaces(self, condition_space, consequence_space):
+        self.condition_space = condition_space
+        self.consequence_space = consequence_space
+
     ###########################################
     ### PROCESS RISK MITIGATING POLICY DATA ###
     ###########################################
@@ -74,9 +81,8 @@ class RiskMitigatingPolicyDataReader:
             self.valid_policy = False
             return
 
-        # open YAML file and load dict
-        fo = open(self.risk_mitigating_policy_data_full_path)
-        yaml_dict = yaml.load(fo, Loader=yaml.FullLoader)
+        # load dict from YAML file, parsing file only if not already cached
+        yaml_dict = YAMLConfigCache.load(self.risk_mitigating_policy_data_full_path)
 
         # error check YAML file formatting
         valid_yaml = YAMLChecks.check_policy_data_yaml_formatting(yaml_dict, self.environment_name, "risk mitigating policy data")
@@ -104,7 +110,9 @@ class RiskMitigatingPolicyDataReader:
             risk_pol = RiskMitigatingPolicyDataPoint(conditions=pol['conditions'],
                                                      consequences_before_action=pol['consequences_before_action'],
                                                      action=pol['action'],
-                                                     consequences_after_action=pol['consequences_after_action'])
+                                                     consequences_after_action=pol['consequences_after_action'],
+                                                     condition_space=self.condition_space,
+                                                     consequence_space=self.consequence_space)
             risk_conds = risk_pol.get_policy_data_point_condition_names()
             risk_act = risk_pol.get_policy_data_point_action_name()
             risk_conseq_bef, risk_conseq_aft = risk_pol.get_policy_data_point_consequence_names()
@@ -124,9 +132,6 @@ class RiskMitigatingPolicyDataReader:
             # add policy data to dictionary
             self.risk_mitigating_policy[risk_pol.get_policy_data_point_dictionary_key()] = risk_pol
 
-        # close file
-        fo.close()
-
         return
 
     def check_valid_policy(self):
@@ -9,11 +9,12 @@ Emily Sheetz, NSTGRO VTE 2024
 import rospy
 
 import os
-import yaml
 
 from yaml_formatting_checks import YAMLStateSpaceChecks as YAMLChecks
+from yaml_io import YAMLConfigCache
 
 from risky_condition import RiskyCondition
+from interned_space import InternedSpace
 
 class RiskyConditionReader:
     def __init__(self, robot="val", environment="lunar_habitat"):
@@ -31,6 +32,11 @@ class RiskyConditionReader:
         # initialize list of risky conditions
         self.risky_conditions = []
 
+        # initialize risky condition names and indices of names to conditions and to integer ids (position in list)
+        self.risky_condition_names = []
+        self.risky_conditions_by_name = {}
+        self.risky_condition_idxs = {}
+
         # initialize flag for valid conditions
         self.valid_conditions = False
 
@@ -51,16 +57,22 @@ class RiskyConditionReader:
         return self.risky_conditions
 
     def get_risky_condition_names(self):
-        return [cond.get_condition_name() for cond in self.risky_conditions]
+        return list(self.risky_condition_names)
+
+    def get_risky_condition_space(self):
+        return InternedSpace(self.get_risky_condition_names())
 
     def get_risky_condition_with_name(self, condition_name):
-        # look through risky conditions
-        for cond in self.risky_conditions:
-            # check name
-            if cond.get_condition_name() == condition_name:
-                return cond
-        # if we get here, no condition in list has given name
-        return None
+        return self.risky_conditions_by_name.get(condition_name)
+
+    def get_risky_conditions_with_names(self, condition_names):
+        return [self.risky_conditions_by_name.get(name) for name in condition_names]
+
+    def get_risky_condition_id(self, condition_name):
+        return self.risky_condition_idxs.get(condition_name)
+
+    def get_risky_condition_ids(self, condition_names):
+        return [self.risky_condition_idxs.get(name) for name in condition_names]
 
     def get_num_risky_conditions(self):
         return len(self.risky_conditions)
@@ -70,8 +82,11 @@ class RiskyConditionReader:
     ################################
 
     def process_risky_conditions(self):
-        # clear out risky conditions list
+        # clear out risky conditions list and indices
         self.risky_conditions = []
+        self.risky_condition_names = []
+        self.risky_conditions_by_name = {}
+        self.risky_condition_idxs = {}
 
         # verify YAML file exists
         valid_path = YAMLChecks.check_yaml_existence(self.risky_condition_full_path)
@@ -80,9 +95,8 @@ class RiskyConditionReader:
             self.valid_conditions = False
             return
 
-        # open YAML file and load dict
-        fo = open(self.risky_condition_full_path)
-        yaml_dict = yaml.load(fo, Loader=yaml.FullLoader)
+        # load dict from YAML file, parsing file only if not already cached
+        yaml_dict = YAMLConfigCache.load(self.risky_condition_full_path)
 
         # error check YAML file formatting
         valid_yaml = YAMLChecks.check_risky_condition_yaml_formatting(yaml_dict, self.environment_name)
@@ -115,8 +129,11 @@ class RiskyConditionReader:
             # add risky condition to list
             self.risky_conditions.append(risky_cond)
 
-        # close file
-        fo.close()
+            # index risky condition by name and id, keeping first risky condition with each name
+            name = risky_cond.get_condition_name()
+            self.risky_condition_names.append(name)
+            self.risky_conditions_by_name.setdefault(name, risky_cond)
+            self.risky_condition_idxs.setdefault(name, len(self.risky_conditions) - 1)
 
         return
 
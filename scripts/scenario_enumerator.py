@@ -0,0 +1,139 @@
+"""
+Scenario Enumerator Class
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import random, math, itertools
+
+#################################
+### SCENARIO ENUMERATOR CLASS ###
+#################################
+
+class ScenarioEnumerator:
+    """
+    Enumerates every risky scenario (non-empty set of at most max_conds conditions) exactly once as a
+    condition bitmask over an interned state space, so scenarios already in a policy can be skipped
+    directly instead of re-drawing random scenarios until an unseen one comes up
+    """
+
+    # supported orders of enumerated scenarios
+    lexicographic_order = "lexicographic"   # by number of conditions, then lexicographic condition indices
+    gray_code_order = "gray_code"           # consecutive scenarios differ by one condition (walks all 2^n condition sets)
+    permutation_order = "permutation"       # seeded random permutation of all scenarios
+    orders = [lexicographic_order, gray_code_order, permutation_order]
+
+    # rounds of seeded bit mixing in permutation order
+    num_permutation_rounds = 4
+
+    def __init__(self, num_conditions, max_conds=-1, order="lexicographic", seed=None):
+        # set internal parameters
+        self.num_conditions = num_conditions
+        self.max_conds = max_conds if (max_conds != -1) else num_conditions
+        self.max_conds = min(self.max_conds, num_conditions)
+        self.order = order
+        self.seed = seed
+
+        # count scenarios with each number of conditions, used to rank and unrank scenarios
+        self.num_scenarios_with_k_conds = [math.comb(num_conditions, k) for k in range(self.max_conds + 1)]
+
+    #######################
+    ### GETTERS/SETTERS ###
+    #######################
+
+    def get_num_scenarios(self):
+        # number of non-empty scenarios
+        return sum(self.num_scenarios_with_k_conds[1:])
+
+    def check_max_conds_limited(self):
+        return self.max_conds < self.num_conditions
+
+    @staticmethod
+    def check_valid_order(order):
+        return order in ScenarioEnumerator.orders
+
+    ###############
+    ### RANKING ###
+    ###############
+
+    def get_scenario_with_rank(self, rank):
+        # find number of conditions of scenario with rank (lexicographic order)
+        k = 1
+        while rank >= self.num_scenarios_with_k_conds[k]:
+            rank -= self.num_scenarios_with_k_conds[k]
+            k += 1
+
+        # unrank lexicographic combination of k condition indices
+        bitmask = 0
+        idx = 0
+        while k > 0:
+            # count combinations that start with condition idx
+            count = math.comb(self.num_conditions - idx - 1, k - 1)
+            if rank < count:
+                bitmask |= 1 << idx
+                k -= 1
+            else:
+                rank -= count
+            idx += 1
+
+        return bitmask
+
+    ###################
+    ### ENUMERATION ###
+    ###################
+
+    def get_scenarios(self):
+        if self.order == ScenarioEnumerator.lexicographic_order:
+            return self.__get_lexicographic_scenarios()
+        elif self.order == ScenarioEnumerator.gray_code_order:
+            return self.__get_gray_code_scenarios()
+        elif self.order == ScenarioEnumerator.permutation_order:
+            return self.__get_permutation_scenarios()
+        else:
+            print("ERROR: unknown scenario order " + str(self.order) + ", expected one of " + str(ScenarioEnumerator.orders))
+            return iter([])
+
+    def get_uncovered_scenarios(self, check_covered):
+        # skip scenarios with condition bitmasks already covered (e.g., by a policy), checked when scenario comes up
+        for bitmask in self.get_scenarios():
+            if not check_covered(bitmask):
+                yield bitmask
+
+    def __get_lexicographic_scenarios(self):
+        # scenarios with fewer conditions first
+        for k in range(1, self.max_conds + 1):
+            for idxs in itertools.combinations(range(self.num_conditions), k):
+                bitmask = 0
+                for idx in idxs:
+                    bitmask |= 1 << idx
+                yield bitmask
+
+    def __get_gray_code_scenarios(self):
+        # reflected binary Gray code visits every non-empty bitmask once; skip scenarios with too many conditions
+        # (all 2^n bitmasks are still walked, so with a small max_conds this takes time in size of full space)
+        for i in range(1, 1 << self.num_conditions):
+            bitmask = i ^ (i >> 1)
+            if bin(bitmask).count("1") <= self.max_conds:
+                yield bitmask
+
+    def __get_permutation_scenarios(self):
+        # seeded random bijection of power of two sized domain, computed per scenario so ranks are never stored
+        num_scenarios = self.get_num_scenarios()
+        num_bits = max((num_scenarios - 1).bit_length(), 1)
+        rng = random.Random(self.seed)
+        rounds = [(rng.getrandbits(num_bits) | 1, rng.getrandbits(num_bits)) for _ in range(ScenarioEnumerator.num_permutation_rounds)]
+
+        # walk domain, skipping values that are not ranks (fewer than half of domain)
+        for i in range(1 << num_bits):
+            rank = ScenarioEnumerator.permute_bits(i, num_bits, rounds)
+            if rank < num_scenarios:
+                yield self.get_scenario_with_rank(rank)
+
+    @staticmethod
+    def permute_bits(x, num_bits, rounds):
+        # each step is invertible modulo 2^num_bits: multiply by odd number, add offset, xor with shifted bits
+        mask = (1 << num_bits) - 1
+        for multiplier, offset in rounds:
+            x = ((x * multiplier) + offset) & mask
+            x ^= x >> ((num_bits + 1) // 2)
+
+        return x
@@ -9,6 +9,8 @@ import rospy
 import sys
 from copy import deepcopy
 
+import numpy as np
+
 # import base class
 from domain_specific_knowledge import DomainSpecificKnowledge
 
@@ -18,6 +20,7 @@ from consequence_state_reader import ConsequenceStateReader
 from risk_mitigating_action_reader import RiskMitigatingActionReader
 from policy_data_point import PolicyDataPoint
 from risk_mitigating_policy_data_reader import RiskMitigatingPolicyDataReader
+from interned_space import InternedSpace
 
 from safety_aware_reasoning.srv import RiskyScenarioDataGeneration, RiskyScenarioDataGenerationRequest, RiskyScenarioDataGenerationResponse
 from safety_aware_reasoning.srv import CounterFactualDataGeneration, CounterFactualDataGenerationRequest, CounterFactualDataGenerationResponse
@@ -27,10 +30,11 @@ from safety_aware_reasoning.srv import CounterFactualDataGeneration, CounterFact
 #########################################################
 
 class ValCLRSpecificKnowledge(DomainSpecificKnowledge):
-    def __init__(self, robot="val", environment="lunar_habitat"):
+    def __init__(self, robot="val", environment="lunar_habitat", advertise_services=True):
         # initialize super class
         super(ValCLRSpecificKnowledge, self).__init__(node_name="Val / CLR Specific Knowledge",
-                                                      service_name_stub="val_clr")
+                                                      service_name_stub="val_clr",
+                                                      advertise_services=advertise_services)
 
         # set internal paramters
         self.robot_name = robot
@@ -54,6 +58,10 @@ class ValCLRSpecificKnowledge(DomainSpecificKnowledge):
         self.__initialize_action_space()
         self.__initialize_policy_starter()
 
+        # compile knowledge-based rules into lookup tables
+        if self.initialized:
+            self.__compile_lookup_tables()
+
     #######################################
     ### INITIALIZATION HELPER FUNCTIONS ###
     #######################################
@@ -98,6 +106,69 @@ class ValCLRSpecificKnowledge(DomainSpecificKnowledge):
             rospy.loginfo("[%s] Successfully initialized human-generated policy data points!", self.node_name)
         return
 
+    def __compile_lookup_tables(self):
+        # intern state, consequence, and action spaces for batch queries over bitmasks and action indices
+        self.condition_space = self.state_space_reader.get_risky_condition_space()
+        self.consequence_space = self.consequence_state_space_reader.get_consequence_state_space()
+        self.action_space = InternedSpace(self.action_space_reader.get_risk_mitigating_action_names())
+        num_conditions = self.condition_space.get_space_size()
+        num_actions = self.action_space.get_space_size()
+
+        # action for each single condition (conditions without single condition policy data point have no action)
+        self.condition_actions = {}
+        self.condition_action_idxs = np.full(num_conditions, -1, dtype=np.int64)
+        self.condition_consequence_bitmasks = np.zeros(num_conditions, dtype=np.uint64)
+        condition_names = self.condition_space.get_space_names()
+        for i, (cond_name, cond) in enumerate(zip(condition_names, self.state_space_reader.get_risky_conditions_with_names(condition_names))):
+            # get condition consequences
+            consequences = cond.get_consequence_states()
+            self.condition_consequence_bitmasks[i] = self.consequence_space.get_bitmask(consequences)
+
+            # find single condition in policy
+            temp_key = PolicyDataPoint(conditions=[cond_name], consequences_before_action=consequences).get_policy_data_point_dictionary_key()
+            pol_point = self.policy_starter_reader.risk_mitigating_policy.get(temp_key)
+            if pol_point is None:
+                continue
+
+            # get action
+            act = pol_point.get_policy_data_point_action_name()
+            self.condition_actions[cond_name] = act
+            self.condition_action_idxs[i] = self.action_space.intern(act)
+
+        # collect consequences after each action and consequences resolved by each action in one pass through policy
+        post_action_conseqs = {}
+        resolved_conseqs = {}
+        for temp_pol_point in self.policy_starter_reader.risk_mitigating_policy.values():
+            # get action and before and after consequences
+            act = temp_pol_point.get_policy_data_point_action_name()
+            bef_conseq, aft_conseq = temp_pol_point.get_policy_data_point_consequence_names()
+
+            # add to lists of consequences
+            post_action_conseqs.setdefault(act, []).append(temp_pol_point.get_policy_data_point_consequences_after_action_names())
+            resolved_conseqs.setdefault(act, []).append([conseq for conseq in bef_conseq if conseq not in aft_conseq])
+
+        # only keep unique set of consequences for each action (None if action has no unique knowledge-based set)
+        self.action_post_consequences = {}
+        self.action_resolved_consequences = {}
+        for act in self.action_space.get_space_names():
+            consequences = post_action_conseqs.get(act, [])
+            self.action_post_consequences[act] = consequences[0] if self.check_all_list_elems_equal(consequences) else None
+            consequences = resolved_conseqs.get(act, [])
+            self.action_resolved_consequences[act] = consequences[0] if self.check_all_list_elems_equal(consequences) else None
+
+        # array tables indexed by action
+        self.action_autonomy_levels = np.array([act.get_action_autonomy_level() for act in
+                                                self.action_space_reader.get_risk_mitigating_actions_with_names(self.action_space.get_space_names())],
+                                               dtype=np.float64)
+        self.action_post_valid = np.array([self.action_post_consequences[act] is not None for act in self.action_space.get_space_names()], dtype=bool)
+        self.action_post_bitmasks = np.array([self.consequence_space.get_bitmask(self.action_post_consequences[act] or [])
+                                              for act in self.action_space.get_space_names()], dtype=np.uint64)
+        self.action_resolved_valid = np.array([self.action_resolved_consequences[act] is not None for act in self.action_space.get_space_names()], dtype=bool)
+        self.action_resolved_bitmasks = np.array([self.consequence_space.get_bitmask(self.action_resolved_consequences[act] or [])
+                                                  for act in self.action_space.get_space_names()], dtype=np.uint64)
+
+        return
+
     #########################
     ### SERVICE CALLBACKS ###
     #########################
@@ -235,32 +306,10 @@ class ValCLRSpecificKnowledge(DomainSpecificKnowledge):
     ##############################
 
     def get_risky_scenario_action_space(self, condition_names, pre_action_conseq_names):
-        # initialize action space
+        # get action for each single condition
         action_space_set = set()
-
-        # loop through condition names
         for cond_name in condition_names:
-            # get condition from state space
-            cond = self.state_space_reader.get_risky_condition_with_name(cond_name)
-
-            # get condition consequences
-            consequences = cond.get_consequence_states()
-
-            # create temporary policy data point
-            temp_pol_point = PolicyDataPoint(conditions=[cond_name],
-                                             consequences_before_action=consequences)
-
-            # get key to find condition in policy
-            temp_key = temp_pol_point.get_policy_data_point_dictionary_key()
-
-            # get action for single single condition
-            pol_point = self.policy_starter_reader.risk_mitigating_policy[temp_key]
-
-            # get action
-            act = pol_point.get_policy_data_point_action_name()
-
-            # add to set
-            action_space_set.add(act)
+            action_space_set.add(self.condition_actions[cond_name])
 
         return list(action_space_set)
 
@@ -269,10 +318,8 @@ class ValCLRSpecificKnowledge(DomainSpecificKnowledge):
         lowest_action = []
         lowest_autonomy_level = float('inf')
 
-        # loop through actions
-        for act_name in action_names:
-            # get action from action space
-            act = self.action_space_reader.get_risk_mitigating_action_with_name(act_name)
+        # loop through actions and actions from action space
+        for act_name, act in zip(action_names, self.action_space_reader.get_risk_mitigating_actions_with_names(action_names)):
 
             # get action autonomy level
             autonomy_level = act.get_action_autonomy_level()
@@ -298,68 +345,86 @@ class ValCLRSpecificKnowledge(DomainSpecificKnowledge):
         return lowest_action[0]
 
     def get_consequences_after_action_from_policy(self, action_name):
-        # initialize consequences
-        consequences = []
-
-        # loop through policy data
-        for temp_key in self.policy_starter_reader.risk_mitigating_policy.keys():
-            # get policy data point
-            temp_pol_point = self.policy_starter_reader.risk_mitigating_policy[temp_key]
-
-            # check if action matches
-            if action_name == temp_pol_point.get_policy_data_point_action_name():
-                # add to list of consequences
-                consequences.append(temp_pol_point.get_policy_data_point_consequences_after_action_names())
-
-        # verify only one set of consequences found
-        if len(consequences) != 1:
-            # check if all consequence sets are equal
-            all_equal = self.check_all_list_elems_equal(consequences)
-            if not all_equal:
-                rospy.logwarn("[%s] Found multiple sets of possible consequences after taking action %s; cannot determine unique knowledge-based set of consequences", self.node_name, action_name)
-                return None
-            # otherwise, all must be equal, so we still found knowledge-based set of consequences
-
-        # return single set of consequences
-        return consequences[0]
+        # get unique set of consequences after action
+        consequences = self.action_post_consequences.get(action_name)
+        if consequences is None:
+            rospy.logwarn("[%s] Found multiple sets of possible consequences after taking action %s; cannot determine unique knowledge-based set of consequences", self.node_name, action_name)
+            return None
+
+        return consequences
 
     ###############################
     ### COUNTER-FACTUAL HELPERS ###
     ###############################
 
     def get_consequences_resolved_by_action_from_policy(self, action_name):
-        # initialize consequences
-        consequences = []
-
-        # loop through policy data
-        for temp_key in self.policy_starter_reader.risk_mitigating_policy.keys():
-            # get policy data point
-            temp_pol_point = self.policy_starter_reader.risk_mitigating_policy[temp_key]
-
-            # check if action matches
-            if action_name == temp_pol_point.get_policy_data_point_action_name():
-                # get before and after consequences
-                bef_conseq, aft_conseq = temp_pol_point.get_policy_data_point_consequence_names()
-
-                # get consequences resolved by action
-                conseqs = [conseq for conseq in bef_conseq if conseq not in aft_conseq]
-                # equivalent to set difference:
-                #     conseqs = bef_conseq - aft_conseq
-
-                # add to list of consequences
-                consequences.append(conseqs)
-
-        # verify only one set of consequences found
-        if len(consequences) != 1:
-            # check if all consequence sets are equal
-            all_equal = self.check_all_list_elems_equal(consequences)
-            if not all_equal:
-                rospy.logwarn("[%s] Found multiple sets of possible consequences resolved by action %s; cannot determine unique knowledge-based set of consequences", self.node_name, action_name)
-                return None
-            # othwerise, all must be equal, so we still found knowledge-based set of consequences
-
-        # return single set of resolved consequences
-        return consequences[0]
+        # get unique set of consequences resolved by action
+        consequences = self.action_resolved_consequences.get(action_name)
+        if consequences is None:
+            rospy.logwarn("[%s] Found multiple sets of possible consequences resolved by action %s; cannot determine unique knowledge-based set of consequences", self.node_name, action_name)
+            return None
+
+        return consequences
+
+    #####################
+    ### BATCH QUERIES ###
+    #####################
+
+    def get_condition_indicators(self, condition_bitmasks):
+        # indicator of each condition in each scenario (one row per scenario)
+        condition_bitmasks = np.asarray(condition_bitmasks, dtype=np.uint64)
+        shifts = np.arange(self.condition_space.get_space_size(), dtype=np.uint64)
+        return ((condition_bitmasks[:, np.newaxis] >> shifts) & np.uint64(1)).astype(bool)
+
+    def get_scenario_consequence_bitmasks(self, condition_bitmasks):
+        # union of consequences of conditions in each scenario
+        conds = self.get_condition_indicators(condition_bitmasks)
+        return np.bitwise_or.reduce(np.where(conds, self.condition_consequence_bitmasks, np.uint64(0)), axis=1)
+
+    def get_knowledge_based_risky_scenario_outputs(self, condition_bitmasks):
+        # get conditions in each scenario, and action and autonomy level for each single condition
+        conds = self.get_condition_indicators(condition_bitmasks)
+        acts = self.condition_action_idxs
+        levels = np.where(acts >= 0, self.action_autonomy_levels[np.maximum(acts, 0)], np.inf)
+
+        # every condition needs a knowledge-based action
+        success = conds.any(axis=1) & ~(conds & (acts < 0)).any(axis=1)
+
+        # get actions of conditions with lowest autonomy level in each scenario, which must be a single action
+        min_levels = np.where(conds, levels, np.inf).min(axis=1)
+        lowest = conds & (levels == min_levels[:, np.newaxis])
+        min_acts = np.where(lowest, acts, len(self.action_autonomy_levels)).min(axis=1)
+        max_acts = np.where(lowest, acts, -1).max(axis=1)
+        success &= (min_acts == max_acts)
+        action_idxs = np.where(success, min_acts, -1)
+
+        # get consequences for chosen action
+        success &= self.action_post_valid[np.maximum(action_idxs, 0)]
+        action_idxs = np.where(success, action_idxs, -1)
+        post_action_conseq_bitmasks = np.where(success, self.action_post_bitmasks[np.maximum(action_idxs, 0)], np.uint64(0))
+
+        return success, action_idxs, post_action_conseq_bitmasks
+
+    def get_knowledge_based_counter_factual_outputs(self, pre_action_conseq_bitmasks, f_action_idxs, f_post_action_conseq_bitmasks, cf_action_idxs):
+        # get autonomy levels and effects (consequences resolved) of counter-factual actions
+        pre_action_conseq_bitmasks = np.asarray(pre_action_conseq_bitmasks, dtype=np.uint64)
+        f_post_action_conseq_bitmasks = np.asarray(f_post_action_conseq_bitmasks, dtype=np.uint64)
+        f_levels = self.action_autonomy_levels[f_action_idxs]
+        cf_levels = self.action_autonomy_levels[cf_action_idxs]
+        cf_action_effects = self.action_resolved_bitmasks[cf_action_idxs]
+
+        # equal autonomy keeps factual consequences, less autonomy removes resolved consequences from factual consequences,
+        # and more autonomy removes resolved consequences from initial condition consequences
+        cf_post_action_conseq_bitmasks = np.where(cf_levels == f_levels, f_post_action_conseq_bitmasks,
+                                                  np.where(cf_levels < f_levels,
+                                                           f_post_action_conseq_bitmasks & ~cf_action_effects,
+                                                           pre_action_conseq_bitmasks & ~cf_action_effects))
+
+        # effects are only needed if autonomy levels differ
+        success = (cf_levels == f_levels) | self.action_resolved_valid[cf_action_idxs]
+        cf_post_action_conseq_bitmasks = np.where(success, cf_post_action_conseq_bitmasks, np.uint64(0))
+
+        return success, cf_post_action_conseq_bitmasks
 
     ####################
     ### LIST HELPERS ###
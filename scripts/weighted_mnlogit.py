@@ -0,0 +1,75 @@
+"""
+Weighted Multinomial Logistic Regression Class
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import numpy as np
+from statsmodels.discrete.discrete_model import MNLogit
+
+#########################################
+### WEIGHTED MULTINOMIAL LOGIT CLASS ###
+#########################################
+
+class WeightedMNLogit(MNLogit):
+    """
+    Multinomial logit model with frequency weights, where an observation with weight w contributes
+    to the likelihood as if it appeared w times in the dataset (weights do not need to be integers);
+    the number of observations reported by results (and used in BIC) is the number of dataset rows
+    """
+
+    def __init__(self, endog, exog, freq_weights=None, **kwargs):
+        # frequency weights are handled with other data arrays so they follow any dropped rows
+        if freq_weights is None:
+            freq_weights = np.ones(len(endog))
+        super().__init__(endog, exog, freq_weights=freq_weights, **kwargs)
+
+    def initialize(self):
+        super().initialize()
+        self.freq_weights = np.asarray(self.freq_weights, dtype=float)
+
+        return
+
+    def _check_kwargs(self, kwargs, keys_extra=None, **kwds):
+        # allow frequency weights as model keyword
+        return super()._check_kwargs(kwargs, ["freq_weights"] + list(keys_extra or []), **kwds)
+
+    ##################
+    ### LIKELIHOOD ###
+    ##################
+
+    def loglike(self, params):
+        return np.sum(self.loglikeobs(params))
+
+    def loglikeobs(self, params):
+        return self.freq_weights[:, None] * super().loglikeobs(params)
+
+    def loglike_and_score(self, params):
+        return self.loglike(params), self.score(params)
+
+    def score(self, params):
+        params = params.reshape(self.K, -1, order="F")
+        firstterm = self.wendog[:, 1:] - self.cdf(np.dot(self.exog, params))[:, 1:]
+        return np.dot((self.freq_weights[:, None] * firstterm).T, self.exog).flatten()
+
+    def score_obs(self, params):
+        return self.freq_weights[:, None] * super().score_obs(params)
+
+    def hessian(self, params):
+        # weighting each observation's outer product of exog weights its contribution to the hessian
+        params = params.reshape(self.K, -1, order="F")
+        X = self.exog
+        WX = self.freq_weights[:, None] * X
+        pr = self.cdf(np.dot(X, params))
+        J = self.J
+        K = self.K
+        partials = []
+        for i in range(J - 1):
+            for j in range(J - 1):
+                if i == j:
+                    partials.append(-np.dot(((pr[:, i + 1] * (1 - pr[:, j + 1]))[:, None] * WX).T, X))
+                else:
+                    partials.append(-np.dot(((pr[:, i + 1] * -pr[:, j + 1])[:, None] * WX).T, X))
+        H = np.array(partials)
+        H = np.transpose(H.reshape(J - 1, J - 1, K, K), (0, 2, 1, 3)).reshape((J - 1) * K, (J - 1) * K)
+
+        return H
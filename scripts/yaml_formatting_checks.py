@@ -4,6 +4,7 @@ Emily Sheetz, NSTGRO VTE 2024
 """
 
 import os
+from collections.abc import Mapping, Sequence
 
 from likelihood_consequence_risk import LikelihoodLevels, ConsequenceClasses
 
@@ -225,9 +226,9 @@ class YAMLPolicyDataChecks(YAMLChecks):
     @staticmethod
     def format_policy_as_yaml_list(policy):
         # check type
-        if type(policy) == dict:
+        if isinstance(policy, Mapping):
             return YAMLPolicyDataChecks.format_policy_dict_as_yaml_list(policy)
-        elif type(policy) == list:
+        elif isinstance(policy, Sequence):
             return YAMLPolicyDataChecks.format_policy_list_as_yaml_list(policy)
         else:
             print("ERROR: unrecognized policy type " + str(type(policy)) + ", but expected type is dict or list; returning None")
@@ -0,0 +1,118 @@
+"""
+YAML Input/Output Helper Classes
+Emily Sheetz, NSTGRO VTE 2024
+"""
+
+import os
+import threading
+import yaml
+
+####################
+### YAML FILE IO ###
+####################
+
+class YAMLFileIO:
+    """
+    Loads and dumps YAML files with libyaml's C loader and dumper when PyYAML was built with libyaml,
+    falling back to the pure-Python safe loader and dumper otherwise; files hold only plain YAML types
+    """
+
+    # use C implementations if available
+    libyaml_available = getattr(yaml, "__with_libyaml__", False)
+    loader = yaml.CSafeLoader if libyaml_available else yaml.SafeLoader
+    dumper = yaml.CSafeDumper if libyaml_available else yaml.SafeDumper
+
+    ###############
+    ### LOADING ###
+    ###############
+
+    @staticmethod
+    def load(stream, loader=None):
+        return yaml.load(stream, Loader=(YAMLFileIO.loader if loader is None else loader))
+
+    @staticmethod
+    def load_file(yaml_file_path, loader=None):
+        fo = open(yaml_file_path)
+        yaml_dict = YAMLFileIO.load(fo, loader)
+        fo.close()
+        return yaml_dict
+
+    ###############
+    ### DUMPING ###
+    ###############
+
+    @staticmethod
+    def dump(yaml_dict, stream=None, dumper=None):
+        return yaml.dump(yaml_dict, stream, Dumper=(YAMLFileIO.dumper if dumper is None else dumper),
+                         default_flow_style=False, sort_keys=False)
+
+    @staticmethod
+    def dump_file(yaml_dict, yaml_file_path, dumper=None):
+        # write to temporary file and move into place so a crash never leaves a partially written file
+        tmp_file = "{}.{}.tmp".format(yaml_file_path, os.getpid())
+        fo = open(tmp_file, 'w')
+        YAMLFileIO.dump(yaml_dict, fo, dumper)
+        fo.flush()
+        os.fsync(fo.fileno())
+        fo.close()
+        os.replace(tmp_file, yaml_file_path)
+        return
+
+
+
+#########################
+### YAML CONFIG CACHE ###
+#########################
+
+class YAMLConfigCache:
+    """
+    Process-wide cache of parsed YAML files shared by all readers, so each file is parsed once per process;
+    entries are validated against the file's modification time, size, and inode, so edited files are re-parsed.
+    Cached dictionaries are shared between callers and must not be modified
+    """
+
+    # parsed files: full path -> (file signature, parsed YAML)
+    cache = {}
+    lock = threading.Lock()
+
+    # number of times a file was parsed (cache misses)
+    num_parses = 0
+
+    ###############
+    ### HELPERS ###
+    ###############
+
+    @staticmethod
+    def get_file_signature(yaml_file_path):
+        stat = os.stat(yaml_file_path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    ###############
+    ### LOADING ###
+    ###############
+
+    @staticmethod
+    def load(yaml_file_path):
+        # get full path and current file signature
+        full_path = os.path.realpath(yaml_file_path)
+        signature = YAMLConfigCache.get_file_signature(full_path)
+
+        # return cached YAML if file is unchanged
+        with YAMLConfigCache.lock:
+            entry = YAMLConfigCache.cache.get(full_path)
+            if (entry is not None) and (entry[0] == signature):
+                return entry[1]
+
+        # parse file and cache YAML
+        yaml_dict = YAMLFileIO.load_file(full_path)
+        with YAMLConfigCache.lock:
+            YAMLConfigCache.cache[full_path] = (signature, yaml_dict)
+            YAMLConfigCache.num_parses += 1
+
+        return yaml_dict
+
+    @staticmethod
+    def clear():
+        with YAMLConfigCache.lock:
+            YAMLConfigCache.cache = {}
+        return